@@ -0,0 +1,59 @@
+"""
+What the mobile client pays per poll of the feed: scraping the HTML page (today), the JSON
+API page built from the database (first request after a change), read from the listing
+cache, and the poll answered 304 Not Modified from its ETag. Response sizes next to the times.
+
+    $ python benchmarks/bench_api.py --posts 5000
+"""
+import argparse
+
+from common import report, test_database, timed
+
+from django.test import Client
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.services import page_cache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        authors = User.objects.bulk_create(User(username=f"author{i}", email=f"author{i}@example.com") for i in range(50))
+        Post.objects.bulk_create(
+            Post(post_title=f"title {i}", post_text="text " * 40, post_example="example " * 20,
+                 author=authors[i % len(authors)], publish_date=timezone.now())
+            for i in range(args.posts)
+        )
+        client = Client()
+
+        def fresh(url):
+            page_cache.bump_version()
+            return client.get(url)
+
+        html = client.get("/posts/")
+        api = client.get("/api/v1/posts/")
+
+        rows = [
+            ("HTML feed page, rendered", timed(lambda: fresh("/posts/"), args.repeat), len(html.content)),
+            ("HTML feed page, cached fragment", timed(lambda: client.get("/posts/"), args.repeat), len(html.content)),
+            ("API page, from the database", timed(lambda: fresh("/api/v1/posts/"), args.repeat), len(api.content)),
+        ]
+        api = client.get("/api/v1/posts/")
+        etag = api["ETag"]
+        rows += [
+            ("API page, cached", timed(lambda: client.get("/api/v1/posts/"), args.repeat), len(api.content)),
+            ("API poll, 304 Not Modified",
+             timed(lambda: client.get("/api/v1/posts/", HTTP_IF_NONE_MATCH=etag), args.repeat), 0),
+        ]
+
+        report(f"feed polling, {args.posts} posts (HTML 10, API 20 posts per page)",
+               [(name, f"{ms:7.3f} ms  {size:7d} bytes") for name, ms, size in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Throughput of the public read views (feed pages, searches, random posts) under load:
+gunicorn with the previous sync workers against the same number of UvicornWorker
+(ASGI) processes, so both use the same memory. Every query can be delayed to stand in
+for a database on another host, the case where sync workers sit idle waiting.
+
+    $ python benchmarks/bench_asgi.py --workers 2 --clients 32 --db-latency-ms 5
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import report, test_database
+
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Post, User
+
+PORT = 8765
+
+SERVERS = [
+    ("before (sync workers, WSGI)", ["project.wsgi:application", "-k", "sync"]),
+    ("after (UvicornWorker, ASGI)", ["project.asgi:application", "-k", "uvicorn_worker.UvicornWorker"]),
+]
+
+# imported by the servers instead of project.settings, points them to the test database
+SETTINGS = """
+import time
+from django.db.backends.signals import connection_created
+from project.settings import *
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+DATABASES["default"]["NAME"] = {name!r}
+
+def _delay(execute, sql, params, many, context):
+    time.sleep({latency})
+    return execute(sql, params, many, context)
+
+def _connected(sender, connection, **kwargs):
+    # the same connection object reconnects on every request of a sync worker
+    if _delay not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_delay)
+
+if {latency}:
+    connection_created.connect(_connected)
+"""
+
+
+def seed(count):
+    authors = User.objects.bulk_create(User(username=f"author{i}", email=f"author{i}@example.com") for i in range(50))
+    Post.objects.bulk_create(
+        Post(post_title=f"title {i}", post_text=f"text word{i % 500} " * 40, post_example="example " * 20,
+             author=authors[i % len(authors)], publish_date=timezone.now())
+        for i in range(count)
+    )
+
+
+def paths(client, count):
+    """Request mix of one client: feed pages, searches (mostly cache misses) and random posts"""
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            yield f"/posts/?page={i % 20 + 1}"
+        elif kind == 1:
+            yield f"/posts/search/?search=word{(client * count + i) % 500}"
+        else:
+            yield "/posts/random_post/"
+
+
+def wait_for_port(timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", PORT), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def load(clients, requests):
+    latencies, errors = [], []
+
+    def client(index):
+        conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=60)
+        for path in paths(index, requests):
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status not in (200, 302):
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(e)
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=60)
+            latencies.append((time.perf_counter() - start) * 1000)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[int(len(latencies) * 0.95)], len(errors)
+
+
+def serve(app_args, workers, settings_dir):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="bench_settings",
+               PYTHONPATH=os.pathsep.join([settings_dir, os.getcwd(), os.environ.get("PYTHONPATH", "")]))
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", *app_args, "-w", str(workers), "--bind", f"127.0.0.1:{PORT}",
+         "--log-level", "warning"],
+        env=env,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=30, help="requests per client")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--posts", type=int, default=5000)
+    args = parser.parse_args()
+
+    with test_database(), tempfile.TemporaryDirectory() as settings_dir:
+        seed(args.posts)
+        with open(os.path.join(settings_dir, "bench_settings.py"), "w") as f:
+            f.write(SETTINGS.format(name=connection.settings_dict["NAME"], latency=args.db_latency_ms / 1000))
+        # the servers need their own connections to the test database
+        connection.close()
+
+        rows = []
+        for name, app_args in SERVERS:
+            server = serve(app_args, args.workers, settings_dir)
+            try:
+                wait_for_port()
+                load(4, 5)  # warm up the workers and the page cache
+                per_second, p95, errors = load(args.clients, args.requests)
+            finally:
+                server.terminate()
+                server.wait()
+            rows.append((name, f"{per_second:7.1f} req/s  p95 {p95:7.1f} ms  {errors} errors"))
+
+        report(f"{args.clients} clients, {args.workers} workers, {args.db_latency_ms:g} ms per query", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Blocked email domain check of one registration that is allowed (the worst case for the
+previous scan): any(email.endswith(d)) over a list, against the label walk over a
+frozenset used by is_blocked_email. Also times import_blocked_domains of the list and
+loading it back into a frozenset.
+
+    $ python benchmarks/bench_blocked_domains.py --domains 100000
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from common import report, test_database, timed
+
+from django.core.management import call_command
+
+from posts.services import blocked_email_domains
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domains", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    word = lambda: "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+    domains = [f"{word()}.{rng.choice(['com', 'net', 'org', 'xyz', 'io'])}" for _ in range(args.domains)]
+    email = "someone@mail.students.example.sk"
+
+    listed = list(domains)
+    before = timed(lambda: any(email.endswith(d) for d in listed), args.repeat)
+    frozen = frozenset(domains)
+    with patch.object(blocked_email_domains, "get_blocked_domains", lambda: frozen):
+        after = timed(lambda: blocked_email_domains.is_blocked_email(email), args.repeat)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(domains))
+    try:
+        with test_database():
+            imported = timed(lambda: call_command("import_blocked_domains", f.name, stdout=StringIO()))
+            loaded = timed(blocked_email_domains._fetch_from_db)
+    finally:
+        os.unlink(f.name)
+
+    report(f"{args.domains} blocked domains, {email}", [
+        ("before (endswith scan of a list)", f"{before * 1000:9.1f} us"),
+        ("after (label walk, frozenset)", f"{after * 1000:9.1f} us  ({before / after:.0f}x)"),
+        ("import_blocked_domains", f"{imported:9.0f} ms"),
+        ("load into frozenset", f"{loaded:9.0f} ms"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Refreshes of the first feed page by visitors who keep the page they got last, with a reaction
+landing every --reaction-every requests: every refresh answered with the full page (before)
+against conditional GETs answered 304 while nothing changed. Reports the mean latency, the
+bytes sent and the 304 hit ratio counted by services.conditional_get.
+
+    $ python benchmarks/bench_conditional_get.py --requests 2000 --reaction-every 50
+"""
+import argparse
+
+from common import report, test_database, timed
+
+from django.test import Client
+from django.utils import timezone
+
+from posts.models import Post, Reaction, User
+from posts.services import conditional_get, reactions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--visitors", type=int, default=20)
+    parser.add_argument("--reaction-every", type=int, default=50)
+    args = parser.parse_args()
+
+    with test_database():
+        authors = User.objects.bulk_create(User(username=f"author{i}", email=f"author{i}@example.com") for i in range(50))
+        posts = Post.objects.bulk_create(
+            Post(post_title=f"title {i}", post_text="text " * 40, post_example="example " * 20,
+                 author=authors[i % len(authors)], publish_date=timezone.now())
+            for i in range(args.posts)
+        )
+        client = Client()
+
+        def run(conditional):
+            etags = [None] * args.visitors
+            sent = 0
+            state = {"request": 0}
+
+            def refresh():
+                nonlocal sent
+                number = state["request"]
+                state["request"] += 1
+                if number % args.reaction_every == 0:
+                    reactions.toggle_reaction(authors[number % len(authors)].id, posts[number % 10].id,
+                                              Reaction.ReactionType.LIKE)
+                visitor = number % args.visitors
+                headers = {"HTTP_IF_NONE_MATCH": etags[visitor]} if conditional and etags[visitor] else {}
+                response = client.get("/posts/", **headers)
+                if response.status_code == 200:
+                    etags[visitor] = response["ETag"]
+                sent += len(response.content)
+
+            conditional_get.reset_stats()
+            ms = timed(refresh, args.requests)
+            return ms, sent / args.requests
+
+        before_ms, before_bytes = run(conditional=False)
+        after_ms, after_bytes = run(conditional=True)
+        not_modified, full = conditional_get.get_stats()
+
+        report(f"{args.requests} feed refreshes by {args.visitors} visitors, a reaction every {args.reaction_every}", [
+            ("before (full page every time)", f"{before_ms:7.3f} ms  {before_bytes:8.0f} bytes per request"),
+            ("conditional GET", f"{after_ms:7.3f} ms  {after_bytes:8.0f} bytes per request"),
+            ("304 hit ratio", f"{not_modified / (not_modified + full) * 100:6.1f} %"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Per request latency of the public read views (feed page, search, random post) through the
+WSGI handler, so connections are opened and closed as in a worker: a new connection per
+request (the previous setup), the psycopg pool (DB_POOL=True) and the pool with server
+side binding and prepared statements (DB_SERVER_SIDE_BINDING=True).
+
+    $ python benchmarks/bench_db_pool.py --requests 300
+"""
+import argparse
+from wsgiref.util import setup_testing_defaults
+
+from common import report, test_database, timed
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Post, User
+
+POOL = {"min_size": 2, "max_size": 4}
+
+MODES = [
+    ("before (connection per request)", {}),
+    ("pool", {"pool": POOL}),
+    ("pool + server side binding", {"pool": POOL, "server_side_binding": True, "prepare_threshold": 5}),
+]
+
+
+def seed(count):
+    authors = User.objects.bulk_create(User(username=f"author{i}", email=f"author{i}@example.com") for i in range(50))
+    Post.objects.bulk_create(
+        Post(post_title=f"title {i}", post_text=f"text word{i % 500} " * 40, post_example="example " * 20,
+             author=authors[i % len(authors)], publish_date=timezone.now())
+        for i in range(count)
+    )
+
+
+def environ(path, query):
+    env = {"PATH_INFO": path, "QUERY_STRING": query, "HTTP_HOST": "localhost"}
+    setup_testing_defaults(env)
+    return env
+
+
+def run(app, requests):
+    """Runs the request mix, returns the mean latency of one request in milliseconds"""
+    environs = [
+        environ(*[("/posts/", f"page={i % 20 + 1}"), ("/posts/search/", f"search=word{i % 500}"),
+                  ("/posts/random_post/", "")][i % 3])
+        for i in range(requests)
+    ]
+    iterator = iter(environs)
+
+    def request():
+        response = app(next(iterator), lambda status, headers: None)
+        b"".join(response)
+        response.close()  # sends request_finished, the connection is closed or returned
+
+    return timed(request, requests)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--posts", type=int, default=5000)
+    args = parser.parse_args()
+
+    with test_database():
+        seed(args.posts)
+        app = WSGIHandler()
+        rows = []
+        for name, options in MODES:
+            connection.close()
+            connection.close_pool()
+            connection.settings_dict["OPTIONS"] = options
+            connection.settings_dict["CONN_HEALTH_CHECKS"] = True
+            run(app, 30)  # warm up
+            rows.append((name, f"{run(app, args.requests):6.2f} ms per request"))
+        connection.close_pool()
+        connection.settings_dict["OPTIONS"] = {}
+
+        report(f"{args.requests} requests (feed page, search, random post)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Rendering of one 10 post feed page (feed_posts.html): the previous listing queryset
+without select_related and no card cache, against select_related('author') with warm
+{% cache post_card %} fragments.
+
+    $ python benchmarks/bench_post_cards.py --repeat 500
+"""
+import argparse
+
+from common import report, test_database, timed
+
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from posts.models import Post, User
+
+DUMMY_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+def page(queryset):
+    return render_to_string("feed_posts.html", {"page_obj": list(queryset.order_by("-publish_date", "-id")[:10])})
+
+
+def measure(queryset, repeat):
+    with CaptureQueriesContext(connection) as ctx:
+        page(queryset)
+    return timed(lambda: page(queryset), repeat), len(ctx.captured_queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    with test_database():
+        for i in range(10):
+            author = User.objects.create(username=f"author{i}", email=f"author{i}@example.com")
+            Post.objects.create(post_title=f"title {i}", post_text="text " * 150, post_example="example " * 100,
+                                author=author, publish_date=timezone.now())
+
+        with override_settings(CACHES=DUMMY_CACHE):
+            before_ms, before_queries = measure(Post.objects.all(), args.repeat)
+            joined_ms, joined_queries = measure(Post.objects.select_related("author"), args.repeat)
+        cache.clear()
+        page(Post.objects.select_related("author"))
+        after_ms, after_queries = measure(Post.objects.select_related("author"), args.repeat)
+
+        report("10 post feed page", [
+            ("before (N+1 authors, no card cache)", f"{before_ms:6.2f} ms  {before_queries} queries"),
+            ("select_related, no card cache", f"{joined_ms:6.2f} ms  {joined_queries} queries"),
+            ("after (select_related, warm cards)", f"{after_ms:6.2f} ms  {after_queries} queries"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
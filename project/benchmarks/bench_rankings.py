@@ -0,0 +1,89 @@
+"""
+First page of the ranked listings over a large table: ranking the posts in the query (the
+score computed from the counters and sorted per request) against the precomputed score
+columns and the top of the week / month views read in index order, plus a page deep in
+the listing reached by its cursor.
+
+    $ python benchmarks/bench_rankings.py --posts 200000
+"""
+import argparse
+import random
+
+from common import report, test_database, timed
+
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.services import rankings
+from posts.services.pagination import KeysetPaginator
+
+PER_PAGE = 10
+
+
+def seed(count):
+    author = User.objects.create(username="author", email="author@example.com")
+    now = timezone.now()
+    rng = random.Random(1)
+    for start in range(0, count, 10000):
+        # the trigger computes the scores on insert
+        Post.objects.bulk_create(
+            Post(post_title=f"title {i}", post_text="text", post_example="example", author=author,
+                 publish_date=now - timezone.timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+                 like_count=rng.randrange(50), dislike_count=rng.randrange(20))
+            for i in range(start, min(start + 10000, count))
+        )
+    rankings.refresh_period_rankings()
+
+
+def per_request(period=None):
+    """The ranking computed by the query, as without the score columns"""
+    posts = Post.objects.select_related("author").annotate(net_votes=F("like_count") - F("dislike_count"))
+    if period:
+        posts = posts.filter(publish_date__gte=timezone.now() - timezone.timedelta(days=period))
+    return lambda: list(posts.order_by("-net_votes", "-id")[:PER_PAGE])
+
+
+def indexed(listing, depth):
+    """First page and the page after depth cursor hops of a services.rankings listing"""
+    posts, keys = listing
+    paginator = KeysetPaginator(posts, PER_PAGE, keys)
+    page = paginator.get_page(None, 1)
+    for _ in range(depth):
+        page = paginator.get_page(page.next_cursor)
+    cursor = page.next_cursor
+    return (lambda: list(paginator._descending()[:PER_PAGE]),
+            lambda: list(paginator.get_page(cursor)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=50, help="cursor hops to the deep page")
+    args = parser.parse_args()
+
+    with test_database():
+        seed(args.posts)
+
+        rows = []
+        for name, before, listing in [
+            ("top (all time)", per_request(), rankings.top_posts("all")),
+            ("top of the month", per_request(30), rankings.top_posts("month")),
+            ("top of the week", per_request(7), rankings.top_posts("week")),
+            ("hot", None, rankings.hot_posts()),
+            ("controversial", None, rankings.controversial_posts()),
+        ]:
+            first, deep = indexed(listing, args.depth)
+            if before:
+                rows.append((f"{name}, ranked per request", f"{timed(before, args.repeat):8.3f} ms"))
+            rows.append((f"{name}, first page", f"{timed(first, args.repeat):8.3f} ms"))
+            rows.append((f"{name}, page {args.depth + 2}", f"{timed(deep, args.repeat):8.3f} ms"))
+
+        refresh_ms = timed(rankings.refresh_period_rankings, 3)
+        report(f"{args.posts} posts, {PER_PAGE} per page", rows)
+        report("scheduled work", [("refresh of the week and month views", f"{refresh_ms:8.1f} ms")])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Feed reaction overlay query (user_id = ? AND post_id IN (<page>)) on the previous
+Reaction layout (varchar type, separate user_id / post_id indexes) against the current
+one (smallint type, unique (user_id, post_id) INCLUDE (type)).
+
+    $ python benchmarks/bench_reaction_overlay.py --users 2000 --per-user 100
+"""
+import argparse
+import random
+
+from common import report, test_database, timed
+
+from django.db import connection
+
+LEGACY_TABLE = """
+CREATE TABLE bench_reaction_legacy (
+    id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    post_id bigint NOT NULL,
+    user_id bigint NOT NULL,
+    type varchar(8) NOT NULL
+);
+CREATE INDEX bench_reaction_legacy_post_id ON bench_reaction_legacy (post_id);
+CREATE INDEX bench_reaction_legacy_user_id ON bench_reaction_legacy (user_id);
+"""
+
+
+def populate(users, posts, per_user):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO posts_user (password, is_superuser, username, first_name, last_name, email,
+                                    is_staff, is_active, date_joined)
+            SELECT '', false, 'bench' || i, '', '', 'bench' || i || '@example.com', false, true, now()
+            FROM generate_series(1, %s) i
+        """, [users])
+        cursor.execute("""
+            INSERT INTO posts_post (post_title, post_text, post_example, publish_date, author_id, like_count, dislike_count)
+            SELECT 'title ' || i, 'text', 'example', now() - i * interval '1 minute', (SELECT min(id) FROM posts_user), 0, 0
+            FROM generate_series(1, %s) i
+        """, [posts])
+        cursor.execute("""
+            INSERT INTO posts_reaction (user_id, post_id, type)
+            SELECT u.id, m.first_id + floor(random() * %s)::int, 1 + (random() < 0.2)::int
+            FROM posts_user u, generate_series(1, %s), (SELECT min(id) AS first_id FROM posts_post) m
+            ON CONFLICT DO NOTHING
+        """, [posts, per_user])
+        cursor.execute(LEGACY_TABLE)
+        cursor.execute("""
+            INSERT INTO bench_reaction_legacy (post_id, user_id, type)
+            SELECT post_id, user_id, CASE type WHEN 1 THEN 'like' ELSE 'dislike' END FROM posts_reaction
+        """)
+        cursor.execute("VACUUM ANALYZE posts_reaction")
+        cursor.execute("VACUUM ANALYZE bench_reaction_legacy")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--per-user", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    with test_database():
+        # VACUUM can not run inside a transaction
+        connection.set_autocommit(True)
+        populate(args.users, args.posts, args.per_user)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id FROM posts_user")
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT id FROM posts_post ORDER BY publish_date DESC LIMIT 200")
+            recent = [row[0] for row in cursor.fetchall()]
+        rng = random.Random(1)
+        workload = [(rng.choice(user_ids), rng.sample(recent, 10)) for _ in range(args.queries)]
+
+        rows = []
+        for name, table in (("before (varchar, 2 indexes)", "bench_reaction_legacy"),
+                            ("after (smallint, unique covering)", "posts_reaction")):
+            sql = f"SELECT post_id, type FROM {table} WHERE user_id = %s AND post_id = ANY(%s)"
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN {sql}", workload[0])
+                plan = cursor.fetchone()[0].split("  ")[0]
+                cursor.execute("SELECT pg_relation_size(%s), pg_indexes_size(%s)", [table, table])
+                heap, indexes = (size / 1024 / 1024 for size in cursor.fetchone())
+
+                def run():
+                    for params in workload:
+                        cursor.execute(sql, params)
+                        cursor.fetchall()
+
+                ms = timed(run) / len(workload)
+            rows.append((name, f"{ms * 1000:7.1f} us/query  heap {heap:5.1f} MB  indexes {indexes:5.1f} MB  {plan}"))
+        report(f"reaction overlay, {len(workload)} feed pages", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Throughput of reaction clicks on a single viral post with concurrent clients.
+
+Compares the previous ORM read-modify-write toggle (get, select_for_update, full
+post.save(), refresh_from_db) with the single statement services.reactions.toggle_reaction.
+
+    $ python benchmarks/bench_reactions.py --clients 16 --seconds 5
+"""
+import argparse
+import threading
+import time
+
+from common import report, test_database
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts.models import Post, Reaction, User
+from posts.services.reactions import toggle_reaction
+
+
+def legacy_toggle(user, post_id, type):
+    post = Post.objects.get(id=post_id)
+    with transaction.atomic():
+        try:
+            reaction = Reaction.objects.select_for_update().get(user=user, post=post)
+            reaction.delete()
+            if type == Reaction.ReactionType.LIKE:
+                post.like_count -= 1
+            else:
+                post.dislike_count -= 1
+        except Reaction.DoesNotExist:
+            Reaction.objects.create(user=user, post=post, type=type)
+            if type == Reaction.ReactionType.LIKE:
+                post.like_count += 1
+            else:
+                post.dislike_count += 1
+        finally:
+            post.save()
+    post.refresh_from_db(fields=['like_count', 'dislike_count'])
+
+
+def run(clients, seconds, post_id, users, click):
+    stop = time.perf_counter() + seconds
+    counts = [0] * clients
+    errors = [0] * clients
+
+    def client(i):
+        user = users[i]
+        while time.perf_counter() < stop:
+            try:
+                click(user, post_id)
+                counts[i] += 1
+            except Exception:
+                errors[i] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with test_database():
+        users = [User.objects.create(username=f"bench{i}", email=f"bench{i}@example.com") for i in range(args.clients)]
+        rows = []
+        for name, click in (
+            ("legacy ORM toggle", lambda user, post_id: legacy_toggle(user, post_id, "like")),
+            ("single statement toggle", lambda user, post_id: toggle_reaction(user.id, post_id, "like")),
+        ):
+            post = Post.objects.create(post_title="viral", post_text="text", post_example="example",
+                                       author=users[0], publish_date=timezone.now())
+            throughput, errors = run(args.clients, args.seconds, post.id, users, click)
+            post.refresh_from_db()
+            likes = Reaction.objects.filter(post=post).count()
+            rows.append((name, f"{throughput:8.0f} clicks/s  errors={errors}  "
+                               f"like_count={post.like_count} reactions={likes}"))
+        report(f"{args.clients} clients, one post, {args.seconds}s", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+One 50 000 URL file of the posts sitemap: the plain django.contrib.sitemaps Sitemap over the
+Post table (COUNT, OFFSET to the page, every row turned into a dict and rendered by the
+template) against services.sitemap, rendered from a streamed id range and gzipped on a miss,
+then read from the shared cache (another worker rendered it) and from process memory.
+
+    $ python benchmarks/bench_sitemap.py --posts 200000
+"""
+import argparse
+
+from common import report, test_database, timed
+
+from django.contrib.sitemaps import Sitemap
+from django.contrib.sites.models import Site
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.services import sitemap
+from posts.services.tiered_cache import TieredCache
+
+BASE_URL = "https://urbandicionary.sk"
+
+
+class PostSitemap(Sitemap):
+    limit = sitemap.CHUNK_SIZE
+    protocol = "https"
+
+    def items(self):
+        return Post.objects.order_by("id")
+
+    def lastmod(self, post):
+        return post.publish_date
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database():
+        author = User.objects.create(username="author", email="author@example.com")
+        for start in range(0, args.posts, 10000):
+            Post.objects.bulk_create(
+                Post(post_title=f"title {i}", post_text="text", post_example="example", author=author,
+                     publish_date=timezone.now())
+                for i in range(start, min(start + 10000, args.posts))
+            )
+        site = Site.objects.get_current()
+        # the last full chunk (the very last one may be short), the same rows as page chunk + 1 of PostSitemap
+        last = max(sitemap.chunk_count() - 2, 0)
+
+        def plain():
+            urls = PostSitemap().get_urls(page=last + 1, site=site)
+            render_to_string("sitemap.xml", {"urlset": urls})
+
+        plain_ms = timed(plain, args.repeat)
+        miss_ms = timed(lambda: sitemap._render_chunk(BASE_URL, last), args.repeat)
+        size = len(sitemap._render_chunk(BASE_URL, last))
+
+        # a fresh tier per worker: worker1 renders the chunk, worker2 finds it in L2
+        sitemap.get_chunk(BASE_URL, last)
+        worker2 = TieredCache(f"sitemap_posts:{last}", l1_max_entries=4)
+        l2_ms = timed(lambda: (worker2.clear_local(), sitemap._chunks.__setitem__(last, worker2),
+                               sitemap.get_chunk(BASE_URL, last)), args.repeat)
+        l1_ms = timed(lambda: sitemap.get_chunk(BASE_URL, last), 100)
+
+        report(f"sitemap file {last} of {args.posts} posts", [
+            ("before (Sitemap paginator + template)", f"{plain_ms:9.2f} ms"),
+            ("miss (streamed + gzipped)", f"{miss_ms:9.2f} ms"),
+            ("L2 hit (shared DB cache)", f"{l2_ms:9.2f} ms"),
+            ("L1 hit (process memory)", f"{l1_ms:9.3f} ms"),
+            ("cached size (gzip)", f"{size / 1024:9.1f} KiB"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Bytes sent and compression time per response of the project's static assets: compressed on
+the fly (nginx gzip, comp level 1) against the .gz / .br siblings collectstatic writes once
+(posts.storage.CompressedManifestStaticFilesStorage), which nginx sends as they are.
+
+    $ python benchmarks/bench_static.py
+"""
+import argparse
+import gzip
+
+import brotli
+from common import report, timed
+
+from django.conf import settings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = []
+    for directory in settings.STATICFILES_DIRS:
+        for path in sorted(directory.rglob("*")):
+            if not path.is_file():
+                continue
+            data = path.read_bytes()
+            on_the_fly_ms = timed(lambda: gzip.compress(data, compresslevel=1), args.repeat)
+            rows.append((str(path.relative_to(directory)),
+                         f"{len(data):7d} B  on the fly {len(gzip.compress(data, compresslevel=1)):6d} B "
+                         f"({on_the_fly_ms:6.3f} ms per response)  .gz {len(gzip.compress(data, compresslevel=9)):6d} B  "
+                         f".br {len(brotli.compress(data, quality=11)):6d} B  (0 ms)"))
+
+    report("static assets", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Costs of the two tier cache: the freshness check every worker makes once per second, the
+previous version stamp of blocked_email_domains (COUNT + MAX over the table) against the
+generation row of TieredCache, and a feed fragment read from L1, from L2 (another worker
+rendered it) and rendered on a miss.
+
+    $ python benchmarks/bench_tiered_cache.py --domains 100000
+"""
+import argparse
+
+from common import report, test_database, timed
+
+from django.db.models import Count, Max
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts import views
+from posts.models import BlockedEmailDomain, Post, User
+from posts.services.tiered_cache import TieredCache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domains", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        BlockedEmailDomain.objects.bulk_create(
+            (BlockedEmailDomain(domain=f"domain{i}.com") for i in range(args.domains)), batch_size=10000)
+        author = User.objects.create(username="author", email="author@example.com")
+        Post.objects.bulk_create(Post(post_title=f"title {i}", post_text="text " * 150, post_example="example " * 60,
+                                      author=author, publish_date=timezone.now()) for i in range(50))
+
+        stamp_ms = timed(lambda: BlockedEmailDomain.objects.aggregate(count=Count("id"), last_id=Max("id")), args.repeat)
+        tier = TieredCache("bench", check_interval=0)
+        generation_ms = timed(tier.generation, args.repeat)
+
+        request = RequestFactory().get("/posts/")
+        render = views._posts_renderer(request, Post.objects.select_related("author").order_by("-publish_date", "-id"),
+                                       True, {})
+        worker1, worker2 = TieredCache("page_bench"), TieredCache("page_bench")
+        # every key once per worker: worker1 renders it, worker2 finds it in L2
+        keys1, keys2 = iter(range(args.repeat)), iter(range(args.repeat))
+        miss_ms = timed(lambda: worker1.get_or_set(next(keys1), render), args.repeat)
+        l2_ms = timed(lambda: worker2.get_or_set(next(keys2), render), args.repeat)
+        l1_ms = timed(lambda: worker1.get_or_set(0, render), args.repeat)
+
+        report(f"freshness check, {args.domains} blocked domains", [
+            ("before (COUNT + MAX version stamp)", f"{stamp_ms:8.3f} ms"),
+            ("after (generation row)", f"{generation_ms:8.3f} ms"),
+        ])
+        report("feed fragment (10 posts)", [
+            ("miss (query + render)", f"{miss_ms:8.3f} ms"),
+            ("L2 hit (shared DB cache)", f"{l2_ms:8.3f} ms"),
+            ("L1 hit (process memory)", f"{l1_ms:8.3f} ms"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+from django import forms
 from django.contrib import admin
 from posts.models import *
+from posts.services.spam_safety import check_pattern
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -17,6 +19,24 @@ class PostUnverifiedAdmin(admin.ModelAdmin):
 class BlockedEmailDomainAdmin(admin.ModelAdmin):
     pass
 
+class SpamRegExAdminForm(forms.ModelForm):
+    class Meta:
+        model = SpamRegEx
+        fields = '__all__'
+
+    def clean_pattern(self):
+        pattern = self.cleaned_data['pattern']
+        error = check_pattern(pattern)
+        if error:
+            raise forms.ValidationError(error)
+        return pattern
+
 @admin.register(SpamRegEx)
 class SpamRegExAdmin(admin.ModelAdmin):
+    form = SpamRegExAdminForm
     list_display = ('pattern', 'description')
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'subject', 'created_at', 'attempts', 'sent_at')
+    list_filter = ('sent_at',)
@@ -0,0 +1,116 @@
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import User
+from .serializers import PostSerializer
+from .services import page_cache, reaction_buffer
+from .services.pagination import InvalidCursor, KeysetPaginator
+
+# Read only JSON API for the mobile client, mounted under /api/v1/ (api_urls.py). Anonymous,
+# no session is read. Responses are stored in the shared listing cache (services.page_cache)
+# and carry an ETag derived from its generation: a client polling with If-None-Match gets
+# 304 Not Modified without a single query until a post or a counter changes.
+PAGE_SIZE = 20
+# seconds a client or proxy may reuse a response without asking again
+MAX_AGE = 10
+
+
+def _etag(request, *args, **kwargs):
+    return md5(f"{page_cache.get_version()}:{request.get_host()}{request.get_full_path()}".encode("utf-8")).hexdigest()
+
+
+def _cacheable(view):
+    """Answers If-None-Match with 304 before the view runs, marks responses as publicly cacheable"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, public=True, max_age=MAX_AGE)
+        return response
+    return condition(etag_func=_etag)(wrapper)
+
+
+def _cached(request, name, load):
+    # the host is part of the key, the pagination links are absolute
+    return page_cache.get_or_load(f"api_{name}:{request.get_host()}{request.path}", request.GET, load)
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(f"{request.path}?{urlencode({**request.GET.dict(), 'cursor': cursor})}")
+
+
+def _serialize(posts):
+    if settings.REACTION_COUNTER_BUFFER:
+        reaction_buffer.apply_pending(posts)
+    # plain lists and dicts, cached values are pickled
+    return list(PostSerializer(posts, many=True).data)
+
+
+def _paginated(request, posts, keys=("publish_date", "id")):
+    """One page of posts by the cursor parameter, posts must have an index in the descending order of keys"""
+    try:
+        page = KeysetPaginator(posts, PAGE_SIZE, keys).get_page(request.GET.get("cursor"), strict=True)
+    except InvalidCursor:
+        raise ValidationError({"cursor": "Neplatný kurzor."})
+    return {
+        "results": _serialize(page.object_list),
+        "next": _link(request, page.next_cursor),
+        "previous": _link(request, page.previous_cursor),
+    }
+
+
+@_cacheable
+@api_view(["GET"])
+def feed(request):
+    return Response(_cached(request, "feed", lambda: _paginated(request, PostSerializer.queryset())))
+
+
+@_cacheable
+@api_view(["GET"])
+def search(request):
+    text = request.GET.get("q", "").strip()
+    if not text:
+        raise ValidationError({"q": "Zadajte hľadaný výraz."})
+
+    def load():
+        query = SearchQuery(text)
+        # ts_rank is a real, its text form would not round trip through the cursor
+        posts = PostSerializer.queryset()\
+            .filter(search_vector=query)\
+            .annotate(rank=Cast(SearchRank(F("search_vector"), query), FloatField()))
+        return _paginated(request, posts, keys=("rank", "id"))
+
+    return Response(_cached(request, "search", load))
+
+
+@_cacheable
+@api_view(["GET"])
+def post_detail(request, post_id):
+    def load():
+        return _serialize([get_object_or_404(PostSerializer.queryset(), id=post_id)])[0]
+
+    return Response(_cached(request, "post", load))
+
+
+@_cacheable
+@api_view(["GET"])
+def user_posts(request, username):
+    def load():
+        author = get_object_or_404(User.objects.only("id"), username=username)
+        # post_author_publish_date_idx
+        return _paginated(request, PostSerializer.queryset().filter(author=author))
+
+    return Response(_cached(request, "user_posts", load))
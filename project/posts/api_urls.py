@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import api
+
+# version 1 of the read only JSON API, mounted under api/v1/ (project/urls.py)
+urlpatterns = [
+    path('posts/', api.feed, name = 'api_feed'),
+    path('posts/search/', api.search, name = 'api_search'),
+    path('posts/<int:post_id>/', api.post_detail, name = 'api_post_detail'),
+    path('users/<str:username>/posts/', api.user_posts, name = 'api_user_posts'),
+]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'posts'
+
+    def ready(self):
+        # connects the signal receivers of the cached services in every process, management commands too
+        from .services import blocked_email_domains, page_cache, sitemap, spam_detection  # noqa: F401
@@ -0,0 +1,6 @@
+from .services import page_cache
+
+
+def post_cards(request):
+    # a callable, only templates using it read the generation
+    return {'card_version': page_cache.card_version}
@@ -2,7 +2,7 @@ from django import forms
 from posts.models import User, Post, PostUnverified
 from django.core.exceptions import ValidationError
 
-from .services.blocked_email_domains import get_blocked_domains
+from .services.blocked_email_domains import is_blocked_email
 from .services.spam_detection import is_spam_text
 
 class UserLoginForm(forms.Form):
@@ -27,7 +27,7 @@ class UserRegistrationForm(forms.ModelForm):
         email = cleaned_data.get("email")
         username = cleaned_data.get('username')
 
-        if email and any(email.endswith(d) for d in get_blocked_domains()):
+        if email and is_blocked_email(email):
             self.add_error('email', 'Nepovolený email')
 
         if username.startswith('Anon_'):
@@ -74,7 +74,7 @@ class CreatePostFormGuest(CreatePostForm):
         cleaned_data = super().clean()  # this calls the clean method of CreatePostForm which includes spam detection
         email = cleaned_data.get("email_for_verification")
 
-        if email and any(email.endswith(d) for d in get_blocked_domains()):
+        if email and is_blocked_email(email):
             self.add_error('email_for_verification', 'Nepovolený email')
         
         return cleaned_data
\ No newline at end of file
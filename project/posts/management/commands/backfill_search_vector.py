@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Func, Q
+from django.db.models.functions import Lower
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Fills Post.search_vector and Post.title_normalized for rows that were created before the search trigger existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--all", action="store_true", help="recompute every row, not only empty ones")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        posts = Post.objects.all() if options["all"] else Post.objects.filter(Q(search_vector__isnull=True) | Q(title_normalized__isnull=True))
+
+        # walk the primary key so every batch is a short index range update holding few row locks
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(posts.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            updated += Post.objects.filter(id__in=ids).update(
+                search_vector=Post.weighted_search_vector(),
+                title_normalized=Lower(Func("post_title", function="unaccent")),
+            )
+            last_id = ids[-1]
+            self.stdout.write(f"Updated {updated} posts (last id {last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {updated} posts updated"))
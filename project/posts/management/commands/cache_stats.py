@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.services.tiered_cache import TieredCache
+
+
+class Command(BaseCommand):
+    help = "Shows the hit rates of the two tier caches summed over all workers, or starts a new generation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("namespaces", nargs="*", help="default all")
+        parser.add_argument("--reset", action="store_true", help="reset the counters after printing them")
+        parser.add_argument("--invalidate", action="store_true",
+                            help="make every worker reload, e.g. after editing the tables by hand")
+
+    def handle(self, *args, **options):
+        unknown = set(options["namespaces"]) - set(TieredCache.instances)
+        if unknown:
+            raise CommandError(f"Unknown namespaces: {', '.join(sorted(unknown))}")
+
+        for namespace in options["namespaces"] or sorted(TieredCache.instances):
+            tier = TieredCache.instances[namespace]
+            if options["invalidate"]:
+                tier.invalidate()
+                self.stdout.write(f"{namespace} invalidated")
+                continue
+            stats = tier.get_stats()
+            total = sum(stats.values())
+            rate = (stats["l1_hits"] + stats["l2_hits"]) / total * 100 if total else 0
+            self.stdout.write(f"{namespace} l1_hits={stats['l1_hits']} l2_hits={stats['l2_hits']} "
+                              f"misses={stats['misses']} hit_rate={rate:.1f}%")
+            if options["reset"]:
+                tier.reset_stats()
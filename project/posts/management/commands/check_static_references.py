@@ -0,0 +1,37 @@
+import re
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+# {% static 'css/style.css' %}, references built from variables can not be checked
+STATIC_TAG = re.compile(r"""{%\s*static\s+(['"])(?P<name>[^'"]+)\1""")
+
+
+class Command(BaseCommand):
+    help = "Checks that every {% static %} reference of the templates resolves to a hashed file of the manifest (run after collectstatic)"
+
+    def _references(self):
+        for engine in engines.all():
+            for directory in engine.template_dirs:
+                for path in sorted(Path(directory).rglob("*.html")):
+                    for match in STATIC_TAG.finditer(path.read_text(encoding="utf-8", errors="replace")):
+                        yield path, match["name"]
+
+    def handle(self, *args, **options):
+        if not isinstance(staticfiles_storage, ManifestFilesMixin):
+            self.stdout.write("Skipped, the static files storage does not hash names (STATIC_MANIFEST=False)")
+            return
+
+        missing = []
+        checked = 0
+        for path, name in self._references():
+            checked += 1
+            hashed = staticfiles_storage.hashed_files.get(staticfiles_storage.clean_name(name))
+            if hashed is None or hashed == name or not staticfiles_storage.exists(hashed):
+                missing.append(f"{path}: {name}")
+
+        if missing:
+            raise CommandError("Static references without a hashed file (run collectstatic):\n" + "\n".join(missing))
+        self.stdout.write(self.style.SUCCESS(f"{checked} static references resolve to hashed files"))
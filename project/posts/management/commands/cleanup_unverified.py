@@ -0,0 +1,63 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from posts.models import Post, PostUnverified, Reaction, User
+from posts.services.verification import TOKEN_MAX_AGE
+
+
+class Command(BaseCommand):
+    help = "Deletes unverified posts whose verification link expired and inactive users left without any post"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--older-than", type=int, default=TOKEN_MAX_AGE,
+                            help="seconds, defaults to the lifetime of the verification links")
+        parser.add_argument("--sleep", type=float, default=0.0, help="seconds to wait between batches")
+        parser.add_argument("--dry-run", action="store_true", help="only count the rows")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options["older_than"])
+
+        posts = PostUnverified.objects.filter(created_at__lt=cutoff)
+        # abandoned registrations and Anon_ guest placeholders, a guest whose post was verified keeps the user.
+        # Never verified users never logged in, an account deactivated by an admin did and is kept,
+        # so are users with reactions (deleting them would not decrement the post counters)
+        users = User.objects.filter(
+            is_active=False, is_staff=False, is_superuser=False, date_joined__lt=cutoff, last_login__isnull=True,
+        ).exclude(
+            Exists(Reaction.objects.filter(user=OuterRef("pk")))
+        ).exclude(
+            Exists(Post.objects.filter(author=OuterRef("pk")))
+        ).exclude(
+            Exists(PostUnverified.objects.filter(author=OuterRef("pk")))
+        )
+
+        # posts first, their users become deletable
+        posts_deleted = self._delete(posts, "unverified posts", options)
+        users_deleted = self._delete(users, "inactive users", options)
+        verb = "Would delete" if options["dry_run"] else "Done, deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {posts_deleted} unverified posts and {users_deleted} inactive users"))
+
+    def _delete(self, queryset, name, options):
+        if options["dry_run"]:
+            return queryset.count()
+
+        # walk the primary key so every batch is a short transaction holding few row locks
+        label = queryset.model._meta.label
+        last_id = 0
+        deleted = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            # the filter is applied again, rows changed since they were read (a new registration) are kept
+            deleted += queryset.filter(id__in=ids).delete()[1].get(label, 0)
+            last_id = ids[-1]
+            self.stdout.write(f"Deleted {deleted} {name} (last id {last_id})")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+        return deleted
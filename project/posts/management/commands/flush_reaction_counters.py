@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.services import reaction_buffer
+
+
+class Command(BaseCommand):
+    help = "Writes buffered like/dislike counters (REACTION_COUNTER_BUFFER) to the posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="keep flushing every --interval seconds")
+        parser.add_argument("--interval", type=float, default=2.0)
+        parser.add_argument("--reconcile", action="store_true",
+                            help="recompute the counters of every post from the reactions, run after editing them by hand")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        if options["reconcile"]:
+            total = reaction_buffer.reconcile(batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Reconciled {total} posts"))
+            return
+
+        while True:
+            flushed = reaction_buffer.flush(batch_size)
+            if flushed:
+                self.stdout.write(f"Flushed {flushed} posts")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
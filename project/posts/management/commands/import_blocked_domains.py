@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.models import BlockedEmailDomain
+from posts.services.blocked_email_domains import clear_blocked_domains_cache, normalize_domain
+
+
+class Command(BaseCommand):
+    help = "Adds blocked email domains from a list with one domain per line (# comments allowed), e.g. a public disposable domain list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="file with the domains, - reads stdin")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--replace", action="store_true", help="also delete blocked domains missing from the list")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        lines = sys.stdin if options["path"] == "-" else open(options["path"], encoding="utf-8")
+        with lines:
+            domains = {normalize_domain(line.split("#", 1)[0]) for line in lines}
+        domains.discard("")
+
+        existing = set(BlockedEmailDomain.objects.values_list("domain", flat=True).iterator(chunk_size=10000))
+        new = sorted(domains - existing)
+        # one INSERT per batch, conflicts with rows added meanwhile are skipped
+        for start in range(0, len(new), batch_size):
+            BlockedEmailDomain.objects.bulk_create(
+                [BlockedEmailDomain(domain=domain) for domain in new[start:start + batch_size]],
+                ignore_conflicts=True,
+            )
+            self.stdout.write(f"Added {min(start + batch_size, len(new))}/{len(new)} domains")
+
+        deleted = 0
+        if options["replace"]:
+            stale = sorted(existing - domains)
+            for start in range(0, len(stale), batch_size):
+                deleted += BlockedEmailDomain.objects.filter(domain__in=stale[start:start + batch_size]).delete()[0]
+
+        # bulk_create sends no signals, a new generation tells every process to reload
+        clear_blocked_domains_cache()
+        self.stdout.write(self.style.SUCCESS(f"Done, {len(new)} domains added, {deleted} deleted"))
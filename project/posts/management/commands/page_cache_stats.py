@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.services import page_cache
+
+
+class Command(BaseCommand):
+    help = "Shows the hit rate of the shared feed/search fragment cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        hits, misses = page_cache.get_stats()
+        total = hits + misses
+        rate = hits / total * 100 if total else 0
+        self.stdout.write(f"hits={hits} misses={misses} hit_rate={rate:.1f}%")
+        if options["reset"]:
+            page_cache.reset_stats()
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.services import rankings
+
+
+class Command(BaseCommand):
+    help = "Refreshes the top of the week / month rankings, --backfill computes the scores of older posts first"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="keep refreshing every --interval seconds")
+        parser.add_argument("--interval", type=float, default=300.0)
+        parser.add_argument("--backfill", action="store_true",
+                            help="recompute the score columns of every post, run once after the rankings migration")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            total = rankings.backfill_scores(
+                options["batch_size"],
+                lambda updated, last_id: self.stdout.write(f"Updated {updated} posts (last id {last_id})"),
+            )
+            self.stdout.write(self.style.SUCCESS(f"Done, {total} posts updated"))
+
+        while True:
+            started = time.monotonic()
+            rankings.refresh_period_rankings()
+            self.stdout.write(f"Refreshed the rankings in {time.monotonic() - started:.2f} s")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
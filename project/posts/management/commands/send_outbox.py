@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.services import outbox
+
+
+class Command(BaseCommand):
+    help = "Sends the queued verification emails (OutboxEmail)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--loop", action="store_true", help="keep sending every --interval seconds")
+        parser.add_argument("--interval", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        while True:
+            # drain every due email before sleeping
+            while True:
+                sent, failed = outbox.send_pending(options["batch_size"])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} emails, {failed} failed")
+                if sent + failed < options["batch_size"] or not sent:
+                    break
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
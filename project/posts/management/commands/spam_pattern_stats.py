@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.services import spam_detection
+
+
+class Command(BaseCommand):
+    help = "Shows spam check timeouts and the slowest spam patterns"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--profile", action="store_true",
+                            help="first time every pattern against the posts whose check was slow")
+        parser.add_argument("--reset", action="store_true", help="reset the stats after printing them")
+
+    def handle(self, *args, **options):
+        if options["profile"]:
+            profiled = spam_detection.profile_patterns()
+            self.stdout.write(f"profiled {profiled} slow checks")
+        timeouts, rows = spam_detection.get_stats()
+        self.stdout.write(f"timeouts={timeouts}")
+        for pattern, count, total_ms, max_ms in rows[:options["limit"]]:
+            self.stdout.write(f"max={max_ms:.1f}ms avg={total_ms / count:.1f}ms count={count} {pattern}")
+        if options["reset"]:
+            spam_detection.reset_stats()
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.14 on 2026-10-18 09:55
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the index is built concurrently so existing tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('posts', '0009_remove_postunverified_verification_token_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['-publish_date', '-id'], name='post_publish_date_id_idx'),
+        ),
+    ]
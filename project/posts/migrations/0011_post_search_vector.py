@@ -0,0 +1,51 @@
+# Generated by Django 5.1.14 on 2026-10-18 09:57
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+# keep in sync with Post.weighted_search_vector()
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION posts_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.post_title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(NEW.post_text, '')), 'B') ||
+        setweight(to_tsvector(COALESCE(NEW.post_example, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER posts_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF post_title, post_text, post_example ON posts_post
+    FOR EACH ROW EXECUTE FUNCTION posts_post_search_vector_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS posts_post_search_vector_trigger ON posts_post;
+DROP FUNCTION IF EXISTS posts_post_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+    # the GIN index is built concurrently so existing tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('posts', '0010_post_publish_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        AddIndexConcurrently(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.14 on 2026-10-18 10:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension, UnaccentExtension
+from django.db import migrations, models
+
+
+# keep in sync with Post.weighted_search_vector() and services.typeahead.normalize_title()
+UPDATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION posts_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.post_title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(NEW.post_text, '')), 'B') ||
+        setweight(to_tsvector(COALESCE(NEW.post_example, '')), 'C');
+    NEW.title_normalized := lower(unaccent(NEW.post_title));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+RESTORE_TRIGGER = """
+CREATE OR REPLACE FUNCTION posts_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.post_title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(NEW.post_text, '')), 'B') ||
+        setweight(to_tsvector(COALESCE(NEW.post_example, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+    # the trigram index is built concurrently so existing tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('posts', '0011_post_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.AddField(
+            model_name='post',
+            name='title_normalized',
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.RunSQL(UPDATE_TRIGGER, RESTORE_TRIGGER),
+        AddIndexConcurrently(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title_normalized'], name='post_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,209 @@
+# Generated by Django 5.1.14 on 2026-10-18 10:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import Case, Value, When
+
+# Converts Reaction.type from varchar to smallint and makes (user, post) unique.
+# Written for large live tables: the new column is added without a default (no rewrite),
+# kept in sync with the writes of the old code by a trigger and filled in short batches,
+# NOT NULL is proven by a NOT VALID check that is validated without blocking writes,
+# and the unique index is built concurrently.
+
+BATCH_SIZE = 10000
+
+# reactions inserted or switched by the old code while the migration runs, same values as backfill_type_code
+CREATE_SYNC_TRIGGER = """
+CREATE OR REPLACE FUNCTION posts_reaction_type_code_update() RETURNS trigger AS $$
+BEGIN
+    NEW.type_code := CASE WHEN NEW.type = 'like' THEN 1 ELSE 2 END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER posts_reaction_type_code_trigger
+    BEFORE INSERT OR UPDATE OF type ON posts_reaction
+    FOR EACH ROW EXECUTE FUNCTION posts_reaction_type_code_update();
+"""
+
+DROP_SYNC_TRIGGER = """
+DROP TRIGGER IF EXISTS posts_reaction_type_code_trigger ON posts_reaction;
+DROP FUNCTION IF EXISTS posts_reaction_type_code_update();
+"""
+
+
+def _batches(Reaction):
+    last_id = 0
+    while True:
+        ids = list(Reaction.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        yield ids[0], ids[-1]
+        last_id = ids[-1]
+
+
+def backfill_type_code(apps, schema_editor):
+    Reaction = apps.get_model('posts', 'Reaction')
+    for first, last in _batches(Reaction):
+        with transaction.atomic():
+            Reaction.objects.filter(id__range=(first, last)).update(
+                type_code=Case(When(type='like', then=Value(1)), default=Value(2))
+            )
+
+
+def restore_type(apps, schema_editor):
+    Reaction = apps.get_model('posts', 'Reaction')
+    for first, last in _batches(Reaction):
+        with transaction.atomic():
+            Reaction.objects.filter(id__range=(first, last)).update(
+                type=Case(When(type_code=1, then=Value('like')), default=Value('dislike'))
+            )
+
+
+def replace_type_column(apps, schema_editor):
+    """Drops the sync trigger and the varchar column and renames type_code in one transaction, no write falls in between"""
+    with transaction.atomic(), schema_editor.connection.cursor() as cursor:
+        cursor.execute(DROP_SYNC_TRIGGER)
+        cursor.execute("ALTER TABLE posts_reaction DROP COLUMN type;")
+        cursor.execute("ALTER TABLE posts_reaction RENAME COLUMN type_code TO type;")
+
+
+def restore_type_column(apps, schema_editor):
+    with transaction.atomic(), schema_editor.connection.cursor() as cursor:
+        cursor.execute("ALTER TABLE posts_reaction RENAME COLUMN type TO type_code;")
+        cursor.execute("ALTER TABLE posts_reaction ADD COLUMN type varchar(8) NULL;")
+
+
+def _dedupe(cursor, type_column):
+    cursor.execute("""
+        DELETE FROM posts_reaction r
+        USING posts_reaction newer
+        WHERE r.user_id = newer.user_id AND r.post_id = newer.post_id AND r.id < newer.id
+        RETURNING r.post_id
+    """)
+    post_ids = list({row[0] for row in cursor.fetchall()})
+    if post_ids:
+        cursor.execute(f"""
+            UPDATE posts_post p SET
+                like_count = (SELECT count(*) FROM posts_reaction r WHERE r.post_id = p.id AND r.{type_column} = 1),
+                dislike_count = (SELECT count(*) FROM posts_reaction r WHERE r.post_id = p.id AND r.{type_column} = 2)
+            WHERE p.id = ANY(%s)
+        """, [post_ids])
+
+
+def dedupe_reactions(apps, schema_editor):
+    """Keeps the newest reaction of every (user, post) pair and recounts the affected posts"""
+    with transaction.atomic(), schema_editor.connection.cursor() as cursor:
+        _dedupe(cursor, 'type_code')
+
+
+def _drop_invalid_index(cursor):
+    # a failed concurrent build leaves an INVALID index behind, IF NOT EXISTS would keep it
+    cursor.execute("""
+        SELECT 1 FROM pg_index WHERE indexrelid = to_regclass('reaction_user_post_uniq') AND NOT indisvalid
+    """)
+    if cursor.fetchone():
+        cursor.execute("DROP INDEX CONCURRENTLY reaction_user_post_uniq;")
+
+
+def create_unique_index(apps, schema_editor):
+    """
+    Builds reaction_user_post_uniq concurrently. Duplicates clicked in since dedupe_reactions
+    are removed right before the build, a duplicate landing during the build fails it,
+    the invalid index is dropped and running the migration again retries.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        _drop_invalid_index(cursor)
+        with transaction.atomic():
+            _dedupe(cursor, 'type')
+        try:
+            cursor.execute(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS reaction_user_post_uniq "
+                "ON posts_reaction (user_id, post_id) INCLUDE (type);"
+            )
+        except Exception:
+            _drop_invalid_index(cursor)
+            raise
+
+
+def drop_unique_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS reaction_user_post_uniq;")
+
+
+SET_NOT_NULL = """
+ALTER TABLE posts_reaction ADD CONSTRAINT posts_reaction_type_not_null CHECK (type IS NOT NULL) NOT VALID;
+ALTER TABLE posts_reaction VALIDATE CONSTRAINT posts_reaction_type_not_null;
+ALTER TABLE posts_reaction ALTER COLUMN type SET NOT NULL;
+ALTER TABLE posts_reaction DROP CONSTRAINT posts_reaction_type_not_null;
+"""
+
+DROP_NOT_NULL = "ALTER TABLE posts_reaction ALTER COLUMN type DROP NOT NULL;"
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0012_post_title_normalized'),
+    ]
+
+    operations = [
+        # nullable first, so unapplying can re-add the varchar column before restore_type fills it
+        migrations.AlterField(
+            model_name='reaction',
+            name='type',
+            field=models.CharField(max_length=8, null=True, choices=[('like', 'Like'), ('dislike', 'Dislike')]),
+        ),
+        migrations.AddField(
+            model_name='reaction',
+            name='type_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        # before the backfill, so no row written in the meantime keeps a NULL or stale type_code
+        migrations.RunSQL(CREATE_SYNC_TRIGGER, DROP_SYNC_TRIGGER),
+        migrations.RunPython(backfill_type_code, restore_type),
+        migrations.RunPython(dedupe_reactions, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(replace_type_column, restore_type_column)],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='reaction',
+                    name='type',
+                ),
+                migrations.RenameField(
+                    model_name='reaction',
+                    old_name='type_code',
+                    new_name='type',
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(SET_NOT_NULL, DROP_NOT_NULL)],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='reaction',
+                    name='type',
+                    field=models.PositiveSmallIntegerField(choices=[(1, 'like'), (2, 'dislike')]),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_unique_index, drop_unique_index),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='reaction',
+                    constraint=models.UniqueConstraint(fields=('user', 'post'), include=('type',), name='reaction_user_post_uniq'),
+                ),
+            ],
+        ),
+        # dropped only after the unique index exists, so user lookups always have an index
+        migrations.AlterField(
+            model_name='reaction',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.14 on 2026-10-18 10:44
+
+import django.utils.timezone
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the indexes are built concurrently so existing tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('posts', '0016_outboxemail'),
+    ]
+
+    operations = [
+        # existing rows count as created now and expire with the next cleanup after the token lifetime
+        migrations.AddField(
+            model_name='postunverified',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        AddIndexConcurrently(
+            model_name='postunverified',
+            index=models.Index(fields=['created_at'], name='postunverified_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['date_joined'], name='user_inactive_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.1.14 on 2026-10-18 11:47
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+# keep in sync with the comments of Post.score, hot_score and controversy_score
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION posts_post_ranking_update() RETURNS trigger AS $$
+BEGIN
+    NEW.score := NEW.like_count - NEW.dislike_count;
+    NEW.hot_score := sign(NEW.score) * log(greatest(abs(NEW.score), 1))
+        + extract(epoch FROM NEW.publish_date)::double precision / 45000;
+    NEW.controversy_score := CASE WHEN NEW.like_count > 0 AND NEW.dislike_count > 0
+        THEN power((NEW.like_count + NEW.dislike_count)::double precision,
+                   least(NEW.like_count, NEW.dislike_count)::double precision
+                   / greatest(NEW.like_count, NEW.dislike_count))
+        ELSE 0 END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER posts_post_ranking_trigger
+    BEFORE INSERT OR UPDATE OF like_count, dislike_count, publish_date ON posts_post
+    FOR EACH ROW EXECUTE FUNCTION posts_post_ranking_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS posts_post_ranking_trigger ON posts_post;
+DROP FUNCTION IF EXISTS posts_post_ranking_update();
+"""
+
+# the unique indexes let refresh_rankings use REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE_VIEWS = """
+CREATE MATERIALIZED VIEW posts_top_week AS
+    SELECT id AS post_id, score FROM posts_post WHERE publish_date >= now() - interval '7 days';
+CREATE UNIQUE INDEX posts_top_week_post_idx ON posts_top_week (post_id);
+CREATE INDEX posts_top_week_score_idx ON posts_top_week (score DESC, post_id DESC);
+
+CREATE MATERIALIZED VIEW posts_top_month AS
+    SELECT id AS post_id, score FROM posts_post WHERE publish_date >= now() - interval '30 days';
+CREATE UNIQUE INDEX posts_top_month_post_idx ON posts_top_month (post_id);
+CREATE INDEX posts_top_month_score_idx ON posts_top_month (score DESC, post_id DESC);
+"""
+
+DROP_VIEWS = """
+DROP MATERIALIZED VIEW IF EXISTS posts_top_week;
+DROP MATERIALIZED VIEW IF EXISTS posts_top_month;
+"""
+
+
+class Migration(migrations.Migration):
+    # the indexes are built concurrently so existing tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('posts', '0019_cachenamespace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopPostMonth',
+            fields=[
+                ('post', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='top_month', serialize=False, to='posts.post')),
+                ('score', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'posts_top_month',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TopPostWeek',
+            fields=[
+                ('post', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='top_week', serialize=False, to='posts.post')),
+                ('score', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'posts_top_week',
+                'managed': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='controversy_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='score',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.RunSQL(CREATE_VIEWS, DROP_VIEWS),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='post_hot_score_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['-score', '-id'], name='post_score_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(condition=models.Q(('controversy_score__gt', 0)), fields=['-controversy_score', '-id'], name='post_controversy_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.14 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cachenamespace',
+            name='changed_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.14 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_cachenamespace_changed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingReactionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField()),
+                ('like_delta', models.SmallIntegerField()),
+                ('dislike_delta', models.SmallIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['post_id'], name='pendingreaction_post_idx')],
+            },
+        ),
+    ]
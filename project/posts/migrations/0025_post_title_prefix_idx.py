@@ -0,0 +1,21 @@
+# Generated by Django 5.1.14 on 2026-10-18 13:15
+
+import django.db.models.functions.comparison
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the index is built concurrently so existing tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('posts', '0024_outboxemail_expires_at'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(django.db.models.functions.comparison.Collate('title_normalized', 'C'), name='post_title_prefix_idx'),
+        ),
+    ]
@@ -1,7 +1,20 @@
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models.functions import Collate
 
 class User(AbstractUser):
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # abandoned registrations and guest placeholders for cleanup_unverified
+            models.Index(fields=['date_joined'], condition=models.Q(is_active=False), name='user_inactive_joined_idx'),
+            # register, verify_user, guest posts and verify_post look users up by email
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -11,28 +24,135 @@ class Post(models.Model):
     post_text = models.CharField(max_length = 1000)
     post_example = models.CharField(max_length = 1000)
     publish_date = models.DateTimeField("date published")
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # set by every save() (edits in the admin), not by reactions, the sitemap lastmod;
+    # null for posts last saved before the column existed, those use publish_date
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+    # indexed by post_author_publish_date_idx
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
 
     like_count = models.PositiveIntegerField(default=0)
     dislike_count = models.PositiveIntegerField(default=0)
 
+    # maintained by the posts_post_search_vector_trigger database trigger (see migration 0011),
+    # rows created before the trigger existed are filled by the backfill_search_vector command
+    search_vector = SearchVectorField(null=True, editable=False)
+    # lower(unaccent(post_title)) for the trigram typeahead, maintained by the same trigger
+    title_normalized = models.CharField(max_length=255, null=True, editable=False)
+
+    # ranking scores, maintained from the counters and publish_date by the posts_post_ranking_trigger
+    # database trigger (see migration 0020), rows created before it existed are filled by refresh_rankings --backfill
+    # likes - dislikes, the 'top' listings
+    score = models.IntegerField(default=0, editable=False)
+    # score on a log scale plus publish_date in units of 12.5 hours, ten times the votes are worth
+    # being 12.5 hours newer, so the order changes only with the votes and never needs a periodic decay
+    hot_score = models.FloatField(default=0, editable=False)
+    # (likes + dislikes) ** (min / max), 0 unless the post has both likes and dislikes
+    controversy_score = models.FloatField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the feed seeks on (publish_date, id)
+            models.Index(fields=['-publish_date', '-id'], name='post_publish_date_id_idx'),
+            # user_posts: WHERE author_id = ? ORDER BY publish_date DESC, id DESC, also serves the author foreign key
+            models.Index(fields=['author', '-publish_date', '-id'], name='post_author_publish_date_idx'),
+            GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+            GinIndex(fields=['title_normalized'], name='post_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            # typeahead prefix lookup, LIKE 'query%' and ORDER BY read in index order whatever the database collation
+            models.Index(Collate('title_normalized', 'C'), name='post_title_prefix_idx'),
+            # keyset pagination of the ranked listings (services.rankings)
+            models.Index(fields=['-hot_score', '-id'], name='post_hot_score_id_idx'),
+            models.Index(fields=['-score', '-id'], name='post_score_id_idx'),
+            models.Index(fields=['-controversy_score', '-id'], condition=models.Q(controversy_score__gt=0),
+                         name='post_controversy_id_idx'),
+        ]
+
+    @staticmethod
+    def weighted_search_vector():
+        """
+        Same expression as the database trigger: title hits rank above text hits above example hits
+        """
+        return (SearchVector('post_title', weight='A')
+                + SearchVector('post_text', weight='B')
+                + SearchVector('post_example', weight='C'))
+
+    def get_absolute_url(self):
+        return reverse('post_detail', args=[self.id])
+
     def __str__(self):
         return self.post_title
     
 class Reaction(models.Model):
-    class ReactionType(models.TextChoices):
-        LIKE = "like"
-        DISLIKE = "dislike"
+    class ReactionType(models.IntegerChoices):
+        LIKE = 1, "like"
+        DISLIKE = 2, "dislike"
+
+        @classmethod
+        def from_label(cls, label):
+            """Returns the type for the 'like' / 'dislike' names used by the templates and the JSON API"""
+            return next((t for t in cls if t.label == label), None)
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # user_id is the leading column of the unique index below, a separate index would be redundant
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='votes')
-    type = models.CharField(max_length=8, choices=ReactionType.choices)
+    type = models.PositiveSmallIntegerField(choices=ReactionType.choices)
+
+    class Meta:
+        constraints = [
+            # one reaction per user and post, INCLUDE (type) lets the feed overlay
+            # (user_id = ? AND post_id IN (...)) run as an index only scan
+            models.UniqueConstraint(fields=['user', 'post'], include=['type'], name='reaction_user_post_uniq'),
+        ]
+
+class PendingReactionCount(models.Model):
+    """
+    Counter change of one click not yet written to the post (settings.REACTION_COUNTER_BUFFER),
+    appended by the toggle, summed for display and deleted by python manage.py flush_reaction_counters
+    """
+    # no foreign key, appending never waits on the post row, rows of a deleted post are dropped by the next flush
+    post_id = models.BigIntegerField()
+    like_delta = models.SmallIntegerField()
+    dislike_delta = models.SmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post_id'], name='pendingreaction_post_idx'),
+        ]
+
+class TopPostWeek(models.Model):
+    """
+    Row of the posts_top_week materialized view: a post published in the last 7 days and its
+    score at the last refresh (python manage.py refresh_rankings), indexed on (score, post_id)
+    """
+    post = models.OneToOneField(Post, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False,
+                                related_name='top_week')
+    score = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_top_week'
+
+class TopPostMonth(models.Model):
+    """Same as TopPostWeek for the posts published in the last 30 days (posts_top_month)"""
+    post = models.OneToOneField(Post, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False,
+                                related_name='top_month')
+    score = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_top_month'
 
 class PostUnverified(models.Model):
     post_title = models.CharField(max_length = 255)
     post_text = models.CharField(max_length = 1000)
     post_example = models.CharField(max_length = 1000)
     author = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # expired rows for cleanup_unverified
+            models.Index(fields=['created_at'], name='postunverified_created_idx'),
+        ]
 
 class BlockedEmailDomain(models.Model):
     domain = models.CharField(max_length=255, unique=True)
@@ -49,4 +169,41 @@ class SpamRegEx(models.Model):
         verbose_name_plural = "Blocked patterns"
 
     def __str__(self):
-        return self.pattern
\ No newline at end of file
+        return self.pattern
+
+
+class OutboxEmail(models.Model):
+    """Email written in the same transaction as the data it belongs to, sent by manage.py send_outbox"""
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    recipient = models.EmailField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # the links in the message stop working then (verification TOKEN_MAX_AGE), it is not sent later
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker only reads unsent rows that are due
+            models.Index(fields=['next_attempt_at'], condition=models.Q(sent_at__isnull=True), name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject}"
+
+
+class CacheNamespace(models.Model):
+    """Generation counter and summed hit/miss counts of a posts.services.tiered_cache namespace"""
+    namespace = models.CharField(max_length=100, primary_key=True)
+    generation = models.BigIntegerField()
+    # when the generation started, Last-Modified of the conditional GETs (services.conditional_get)
+    changed_at = models.DateTimeField(null=True)
+    l1_hits = models.BigIntegerField(default=0)
+    l2_hits = models.BigIntegerField(default=0)
+    misses = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return self.namespace
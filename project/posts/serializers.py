@@ -0,0 +1,27 @@
+from rest_framework import serializers
+
+from posts.models import Post
+
+
+class PostSerializer(serializers.ModelSerializer):
+    """Compact read only representation of a post for the JSON API"""
+    title = serializers.CharField(source='post_title')
+    text = serializers.CharField(source='post_text')
+    example = serializers.CharField(source='post_example')
+    author = serializers.CharField(source='author.username')
+    published = serializers.DateTimeField(source='publish_date')
+    likes = serializers.IntegerField(source='like_count')
+    dislikes = serializers.IntegerField(source='dislike_count')
+
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'text', 'example', 'author', 'published', 'likes', 'dislikes']
+        read_only_fields = fields
+
+    # the columns the fields above read, the querysets load nothing else (no search_vector)
+    queryset_fields = ('id', 'post_title', 'post_text', 'post_example', 'publish_date', 'like_count',
+                       'dislike_count', 'author__username')
+
+    @classmethod
+    def queryset(cls):
+        return Post.objects.select_related('author').only(*cls.queryset_fields)
@@ -1,35 +1,53 @@
-from django.core.cache import cache
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from ..models import BlockedEmailDomain
+from .tiered_cache import TieredCache
 
-CACHE_KEY = "blocked_email_domains"
+# The set lives in process memory only (L1), public disposable domain lists have 100k+
+# entries and a shared cache would unpickle all of them on every read. Changes made by
+# other workers or by import_blocked_domains arrive through the generation of the shared
+# cache (services.tiered_cache).
+_cache = TieredCache("blocked_email_domains")
 
-def _normalize_domain(d: str) -> str:
-    return (d or "").strip().lower()
+def normalize_domain(d: str) -> str:
+    return (d or "").strip().lower().lstrip("@.").rstrip(".")
 
 def _fetch_from_db():
-    domains_qs = BlockedEmailDomain.objects.values_list('domain', flat=True)
+    domains_qs = BlockedEmailDomain.objects.values_list('domain', flat=True).iterator(chunk_size=10000)
     # Normalize once here
-    return [ _normalize_domain(d) for d in domains_qs if d ]
+    return frozenset(normalize_domain(d) for d in domains_qs if d)
 
 def get_blocked_domains():
     """
-    Returns a list of normalized blocked domain strings.
-    It will use Django cache; on cache miss it fetches from DB and populates cache.
+    Returns a frozenset of normalized blocked domain strings.
+    It is kept in process memory and reloaded from the DB after a change in any worker.
     """
-    domains = cache.get(CACHE_KEY)
-    if domains is None:
-        domains = _fetch_from_db()
-        cache.set(CACHE_KEY, domains)
-    return domains
+    return _cache.get_or_set("domains", _fetch_from_db, shared=False)
 
 def clear_blocked_domains_cache():
-    cache.delete(CACHE_KEY)
+    _cache.invalidate()
 
-# Connect signals so any change to BlockedEmailDomain clears the cache immediately.
+# Connect signals so any change to BlockedEmailDomain reaches every worker.
 @receiver(post_save, sender=BlockedEmailDomain)
 @receiver(post_delete, sender=BlockedEmailDomain)
 def _blocked_domain_changed(sender, instance, **kwargs):
     clear_blocked_domains_cache()
+
+
+def is_blocked_email(email: str) -> bool:
+    """Check if the domain of the email, or any domain above it, is blocked.
+
+    a@b.example.com is looked up as b.example.com, example.com and com, one set lookup
+    per label, so mail.com blocks x.mail.com but not gmail.com.
+
+    Returns:
+        bool: True if the email belongs to a blocked domain, False otherwise.
+    """
+    blocked = get_blocked_domains()
+    domain = normalize_domain(email.rpartition("@")[2])
+    while domain:
+        if domain in blocked:
+            return True
+        domain = domain.partition(".")[2]
+    return False
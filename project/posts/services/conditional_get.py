@@ -0,0 +1,96 @@
+from functools import wraps
+from hashlib import md5
+
+from asgiref.sync import iscoroutinefunction
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import page_cache
+from .tiered_cache import TieredCache
+
+# Conditional GET of the listing pages. The validators come from the generation of the listing
+# cache (services.page_cache), which changes with every new, edited or deleted post and every
+# reaction and is read from process memory, so If-None-Match / If-Modified-Since are answered
+# with 304 before the view touches its queryset or template. The ETag is exact, Last-Modified
+# has a resolution of one second (clients sending both are judged by the ETag).
+# Answers are counted in the conditional_get namespace, 304 as hits and full pages as misses
+# (python manage.py cache_stats conditional_get).
+_stats = TieredCache("conditional_get")
+
+
+def _validators(request, generation, changed_at, viewer):
+    # the page differs between anonymous and logged in visitors (header, reaction overlay),
+    # per user listings pass the user id as viewer
+    etag = md5(f"{generation}:{viewer}:{request.get_full_path()}".encode("utf-8")).hexdigest()
+    return quote_etag(etag), int(changed_at.timestamp()) if changed_at else None
+
+
+def _not_modified(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        _stats.count("l1_hits")
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _finish(response, etag, last_modified):
+    if response.status_code == 200:
+        _stats.count("misses")
+        response.headers.setdefault("ETag", etag)
+        if last_modified is not None:
+            response.headers.setdefault("Last-Modified", http_date(last_modified))
+    # kept by the browser but always revalidated, the page changes with any reaction
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _viewer(user, per_user):
+    return user.pk if per_user else user.is_authenticated
+
+
+def conditional_listing(per_user=False):
+    """
+    Decorator of the listing views (sync or async), answers conditional GETs with 304 while
+    the listings are unchanged. per_user=True for pages listing the visitor's own posts.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                # also flushes the counts once per check interval
+                await _stats.ageneration()
+                generation, changed_at = await page_cache.aget_validator()
+                etag, last_modified = _validators(request, generation, changed_at,
+                                                  _viewer(await request.auser(), per_user))
+                response = _not_modified(request, etag, last_modified)
+                if response is None:
+                    response = _finish(await view(request, *args, **kwargs), etag, last_modified)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            _stats.generation()
+            generation, changed_at = page_cache.get_validator()
+            etag, last_modified = _validators(request, generation, changed_at, _viewer(request.user, per_user))
+            response = _not_modified(request, etag, last_modified)
+            if response is None:
+                response = _finish(view(request, *args, **kwargs), etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def get_stats():
+    """Returns (not_modified, full) answers of the listing views, summed over all workers"""
+    stats = _stats.get_stats()
+    return stats["l1_hits"], stats["misses"]
+
+
+def reset_stats():
+    _stats.reset_stats()
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import OutboxEmail
+
+# Emails are not sent inside the request: queue_mail() writes them to the OutboxEmail table
+# in the caller's transaction and the send_outbox worker delivers them, so an SMTP outage
+# only delays emails instead of failing signups.
+
+MAX_ATTEMPTS = 8
+# retry after 30 s, 1 min, 2 min, ... at most an hour
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+EXPIRED_ERROR = "Expired before it could be sent"
+
+def queue_mail(subject: str, message: str, recipient_list, expires_at=None):
+    """
+    Stores the email in the outbox, call it in the transaction that creates the data the email is about.
+    An email still unsent at expires_at is given up, e.g. when its verification link has expired.
+    """
+    return OutboxEmail.objects.bulk_create(
+        [OutboxEmail(subject=subject, message=message, recipient=recipient, expires_at=expires_at)
+         for recipient in recipient_list]
+    )
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+def _failed(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.next_attempt_at = now + _backoff(email.attempts)
+
+def send_pending(batch_size=100):
+    """
+    Sends one batch of due outbox emails over a single SMTP connection.
+    Rows are locked with SKIP LOCKED, several workers never send the same email.
+    Failed emails are retried with exponential backoff until MAX_ATTEMPTS or until they expire,
+    expired emails are given up without sending them.
+
+    Returns:
+        tuple[int, int]: number of sent and failed emails
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(sent_at__isnull=True, next_attempt_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if not emails:
+            return 0, 0
+
+        sent = failed = 0
+        to_send = []
+        for email in emails:
+            if email.expires_at is not None and email.expires_at <= now:
+                email.attempts = MAX_ATTEMPTS
+                email.last_error = EXPIRED_ERROR
+                failed += 1
+            else:
+                to_send.append(email)
+
+        connection = get_connection(username=settings.EMAIL_HOST_USER, password=settings.EMAIL_HOST_PASSWORD)
+        try:
+            if to_send:
+                connection.open()
+        except Exception as e:
+            for email in to_send:
+                _failed(email, e, now)
+            failed += len(to_send)
+        else:
+            try:
+                for email in to_send:
+                    try:
+                        EmailMessage(email.subject, email.message, settings.EMAIL_HOST_USER, [email.recipient],
+                                     connection=connection).send()
+                    except Exception as e:
+                        _failed(email, e, now)
+                        failed += 1
+                    else:
+                        email.sent_at = timezone.now()
+                        sent += 1
+            finally:
+                connection.close()
+
+        OutboxEmail.objects.bulk_update(emails, ['attempts', 'last_error', 'next_attempt_at', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,82 @@
+from hashlib import md5
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+
+from ..models import Post
+from .tiered_cache import TieredCache
+
+# Rendered, user independent listing fragments (feed_posts.html) shared by all visitors and
+# workers (services.tiered_cache). Every change of posts or reaction counters starts a new
+# generation, so stale fragments are never read again and simply expire. Reactions start it
+# at most once per generation check interval (bump_version_soon), the counters in the listings
+# may lag by that long, the reaction overlay shows the current ones.
+CACHE_TIMEOUT = 300
+
+# fragments are large, keep fewer of them in process memory
+_pages = TieredCache("page", l1_max_entries=200)
+# the {% cache post_card %} fragments are keyed by their own generation, only post edits change it
+_cards = TieredCache("post_card")
+
+def get_version():
+    return _pages.generation()
+
+def get_validator():
+    """Returns (generation, changed_at) of the listings, both change whenever a listing may have changed"""
+    return _pages.state()
+
+async def aget_validator():
+    """get_validator for async views, read from process memory between the generation checks"""
+    return await _pages.astate()
+
+def bump_version():
+    _pages.invalidate()
+
+def bump_version_soon():
+    """bump_version without a query, for the reaction toggles"""
+    _pages.invalidate_soon()
+
+def card_version():
+    """Generation of the {% cache post_card %} fragments (feed_posts.html)"""
+    return _cards.generation()
+
+def get_stats():
+    """Returns (hits, misses) of the fragment cache, summed over all workers"""
+    stats = _pages.get_stats()
+    return stats["l1_hits"] + stats["l2_hits"], stats["misses"]
+
+def reset_stats():
+    _pages.reset_stats()
+
+def _key(name, params):
+    query = urlencode(sorted((key, params.getlist(key)) for key in params), doseq=True)
+    return f"{name}:{md5(query.encode('utf-8')).hexdigest()}"
+
+def get_or_load(name: str, params, load):
+    """
+    Returns the cached value for the listing name and its query parameters,
+    on a miss load() is called and its result cached
+    """
+    return _pages.get_or_set(_key(name, params), load, CACHE_TIMEOUT)
+
+def get_or_render(name: str, params, render):
+    """get_or_load for rendered fragments, marked safe for the templates"""
+    return mark_safe(get_or_load(name, params, render))
+
+async def aget_or_render(name: str, params, render):
+    """
+    get_or_render for async views, a hit in process memory never leaves the event loop,
+    on a miss the sync render() runs in a worker thread (it queries the DB)
+    """
+    return mark_safe(await _pages.aget_or_set(_key(name, params), render, CACHE_TIMEOUT))
+
+# Connect signals so any change to a post invalidates the cached listings in every worker.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def _post_changed(sender, instance, **kwargs):
+    if kwargs.get('created') is False:
+        # an edited post, new and deleted posts have no card to refresh
+        _cards.invalidate()
+    bump_version()
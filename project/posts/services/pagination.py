@@ -0,0 +1,247 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from math import ceil
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+# below this many estimated rows the exact COUNT(*) is cheap enough and keeps the page numbers accurate
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset) -> int:
+    """
+    Returns the number of rows of the queryset. Unfiltered querysets use the planner
+    statistics from pg_class instead of a full COUNT(*) scan.
+    """
+    if queryset.query.where:
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+
+    # reltuples is -1 for tables that were never analyzed
+    estimate = row[0] if row else -1
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+def _json_value(value):
+    # full isoformat, DjangoJSONEncoder would truncate microseconds and break ties between seek keys
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(direction: str, values, number: int) -> str:
+    if values is not None:
+        values = [_json_value(v) for v in values]
+    payload = json.dumps([direction, values, number], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str):
+    """
+    Returns (direction, values, number) or None when the token is not a valid cursor
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, values, number = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+    if direction not in ("next", "prev", "last") or not isinstance(number, int):
+        return None
+    if direction != "last" and not isinstance(values, list):
+        return None
+    return direction, values, max(number, 1)
+
+
+class InvalidCursor(ValueError):
+    """The cursor token was not issued by the paginator or its values were tampered with"""
+
+
+class KeysetPage:
+    """
+    One page of a KeysetPaginator, exposes the same interface as django.core.paginator.Page
+    that is used by the templates plus opaque cursors for the neighbouring pages
+    """
+    def __init__(self, object_list, number, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor("prev", self.paginator.key_values(self.object_list[0]), self.number - 1)
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor("next", self.paginator.key_values(self.object_list[-1]), self.number + 1)
+
+    @property
+    def last_cursor(self):
+        return encode_cursor("last", None, self.paginator.num_pages)
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset in descending order of the key fields using seek conditions
+    (WHERE (publish_date, id) < (...)) instead of OFFSET, so every page costs the same
+    regardless of its depth. The number of pages is computed from estimate_count().
+    """
+    def __init__(self, queryset, per_page, keys=("publish_date", "id")):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = keys
+        self._count = None
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = estimate_count(self.queryset)
+        return self._count
+
+    @property
+    def num_pages(self):
+        return max(1, ceil(self.count / self.per_page))
+
+    def key_values(self, obj):
+        return [getattr(obj, key) for key in self.keys]
+
+    def _field(self, key):
+        annotation = self.queryset.query.annotations.get(key)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(key)
+
+    def _parse_cursor(self, cursor):
+        """
+        Returns (direction, values, number) of the cursor token with the values converted
+        by the fields of the keys, raises InvalidCursor for anything the seek could not run with
+        """
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            raise InvalidCursor(cursor)
+        direction, values, number = decoded
+        if direction == "last":
+            return decoded
+        if len(values) != len(self.keys):
+            raise InvalidCursor(cursor)
+
+        parsed = []
+        for key, value in zip(self.keys, values):
+            # the key columns are NOT NULL, clean() also checks the range of integer columns
+            if value is None or isinstance(value, (list, dict)):
+                raise InvalidCursor(cursor)
+            try:
+                parsed.append(self._field(key).clean(value, None))
+            except (ValidationError, TypeError, ValueError, OverflowError):
+                raise InvalidCursor(cursor)
+        return direction, parsed, number
+
+    def _seek(self, values, lookup):
+        # (k1, k2) < (v1, v2)  <=>  k1 < v1 OR (k1 = v1 AND k2 < v2)
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            term = Q(**{f"{key}__{lookup}": values[i]})
+            for prev_key, prev_value in zip(self.keys[:i], values[:i]):
+                term &= Q(**{prev_key: prev_value})
+            condition |= term
+        # redundant k1 <= v1, Postgres cannot start the index scan at an OR, only at this bound,
+        # without it every page filters all the rows before it
+        return Q(**{f"{self.keys[0]}__{lookup}e": values[0]}) & condition
+
+    def _descending(self):
+        return self.queryset.order_by(*[f"-{key}" for key in self.keys])
+
+    def _ascending(self):
+        return self.queryset.order_by(*self.keys)
+
+    def get_page(self, cursor=None, page=None, strict=False):
+        """
+        Returns the page for the given cursor token. Without a cursor the legacy
+        ?page=N parameter is honoured (page 1 needs no offset at all).
+        An invalid cursor falls back to that page too, with strict=True it raises InvalidCursor.
+        """
+        decoded = None
+        if cursor:
+            try:
+                decoded = self._parse_cursor(cursor)
+            except InvalidCursor:
+                if strict:
+                    raise
+
+        if decoded is None:
+            try:
+                number = max(int(page), 1)
+            except (TypeError, ValueError):
+                number = 1
+            return self._offset_page(number)
+
+        direction, values, number = decoded
+        if direction == "next":
+            rows = list(self._descending().filter(self._seek(values, "lt"))[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            return KeysetPage(rows[:self.per_page], number, self, True, has_next)
+
+        if direction == "prev":
+            rows = list(self._ascending().filter(self._seek(values, "gt"))[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return KeysetPage(rows, number if has_previous else 1, self, has_previous, True)
+
+        # last page: read from the other end of the index so it is as cheap as the first one
+        number = self.num_pages
+        size = self.count - (number - 1) * self.per_page
+        if size <= 0:
+            size = self.per_page
+        rows = list(self._ascending()[:size + 1])
+        has_previous = len(rows) > size
+        rows = rows[:size]
+        rows.reverse()
+        return KeysetPage(rows, number, self, has_previous, False)
+
+    def _offset_page(self, number):
+        offset = (number - 1) * self.per_page
+        rows = list(self._descending()[offset:offset + self.per_page + 1])
+        if not rows and number > 1:
+            return self.get_page(encode_cursor("last", None, self.num_pages))
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], number, self, number > 1, has_next)
@@ -0,0 +1,73 @@
+from array import array
+from random import choice
+
+from asgiref.sync import sync_to_async
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ..models import Post
+from .tiered_cache import TieredCache
+
+# The ids live in process memory only (L1), they are reloaded from the DB once per worker
+# after a post was created or deleted in any worker (services.tiered_cache).
+_cache = TieredCache("post_ids")
+
+def _fetch_from_db():
+    # dense array of 64-bit ids, 8 bytes per post instead of a list of int objects
+    return array('q', Post.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=10000))
+
+def get_post_ids():
+    """
+    Returns a dense array of all post ids.
+    It is kept in process memory and reloaded from the DB after a post was created or deleted in any worker.
+    """
+    return _cache.get_or_set("ids", _fetch_from_db, shared=False)
+
+async def aget_post_ids():
+    """get_post_ids for async views, a load runs in a worker thread"""
+    return await _cache.aget_or_set("ids", _fetch_from_db, shared=False)
+
+def clear_post_ids_cache():
+    _cache.invalidate()
+
+# Connect signals so creating or deleting a post reaches every worker.
+@receiver(post_save, sender=Post)
+def _post_saved(sender, instance, created, **kwargs):
+    if created:
+        clear_post_ids_cache()
+
+@receiver(post_delete, sender=Post)
+def _post_deleted(sender, instance, **kwargs):
+    clear_post_ids_cache()
+
+
+def get_random_post():
+    """Picks a post uniformly at random.
+
+    Returns:
+        Post | None: None when there are no posts. Costs one query on a warm cache and
+        at most three when the cached ids are stale (refresh and retry once).
+    """
+    for _ in range(2):
+        ids = get_post_ids()
+        if not ids:
+            return None
+        post = Post.objects.select_related('author').filter(id=choice(ids)).first()
+        if post is not None:
+            return post
+        # post was deleted in a way that did not reach this cache
+        clear_post_ids_cache()
+    return None
+
+
+async def aget_random_post():
+    """get_random_post for async views, same cost and retry"""
+    for _ in range(2):
+        ids = await aget_post_ids()
+        if not ids:
+            return None
+        post = await Post.objects.select_related('author').filter(id=choice(ids)).afirst()
+        if post is not None:
+            return post
+        await sync_to_async(clear_post_ids_cache)()
+    return None
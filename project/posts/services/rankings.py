@@ -0,0 +1,72 @@
+from django.db import connection
+from django.db.models import F
+
+from ..models import Post, TopPostMonth, TopPostWeek
+from . import page_cache
+
+# Ranked listings. Every ranking is read in the order of an index, so a page costs the same
+# keyset seek as the chronological feed and no request ever scores the posts:
+#   hot, top (all time) and controversial order by the Post score columns, which the database
+#   trigger recomputes whenever a post's counters change (every reaction, every buffered flush)
+#   top of the week / month join a materialized view of the posts published in that window,
+#   the view (membership and order) is refreshed on a schedule by python manage.py refresh_rankings,
+#   the counters shown are always the current ones
+PERIOD_VIEWS = {
+    'week': TopPostWeek,
+    'month': TopPostMonth,
+}
+PERIODS = ('all', *PERIOD_VIEWS)
+
+
+def hot_posts():
+    """Returns (queryset, keyset keys) of the hot listing"""
+    return Post.objects.select_related('author'), ('hot_score', 'id')
+
+
+def controversial_posts():
+    """Returns (queryset, keyset keys) of the posts with both likes and dislikes, the most even first"""
+    # controversy_score > 0 matches the condition of the partial post_controversy_id_idx
+    return Post.objects.select_related('author').filter(controversy_score__gt=0), ('controversy_score', 'id')
+
+
+def top_posts(period='all'):
+    """Returns (queryset, keyset keys) of the best scored posts of the period ('all', 'week' or 'month')"""
+    if period == 'all':
+        return Post.objects.select_related('author'), ('score', 'id')
+
+    related_name = PERIOD_VIEWS[period]._meta.get_field('post').remote_field.related_name
+    # the seek on (period_score, id) follows the (score, post_id) index of the view
+    posts = Post.objects.select_related('author')\
+        .filter(**{f'{related_name}__isnull': False})\
+        .annotate(period_score=F(f'{related_name}__score'))
+    return posts, ('period_score', 'id')
+
+
+def refresh_period_rankings(concurrently=True):
+    """
+    Recomputes the top of the week / month views. CONCURRENTLY keeps them readable during the
+    refresh, it needs a view that was populated before (always true after the migration).
+    """
+    with connection.cursor() as cursor:
+        for view in PERIOD_VIEWS.values():
+            table = connection.ops.quote_name(view._meta.db_table)
+            cursor.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{table}")
+    page_cache.bump_version()
+
+
+def backfill_scores(batch_size=1000, on_batch=None):
+    """
+    Lets the trigger compute the scores of every post in primary key batches (rows created before
+    the trigger existed), returns the number of posts updated. on_batch(updated, last_id) reports progress.
+    """
+    last_id = 0
+    updated = 0
+    while True:
+        ids = list(Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return updated
+        # assigning a counter to itself is enough to fire the trigger
+        updated += Post.objects.filter(id__in=ids).update(like_count=F('like_count'))
+        last_id = ids[-1]
+        if on_batch:
+            on_batch(updated, last_id)
@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from ..models import PendingReactionCount, Post, Reaction
+from . import page_cache
+
+# Write-behind buffer for Post.like_count / dislike_count (settings.REACTION_COUNTER_BUFFER).
+# Reaction rows stay the source of truth and are written synchronously, the counter change
+# of every click is appended to the PendingReactionCount table in the same statement
+# (services.reactions), so every worker and the flush command see the same pending changes
+# and appending never waits on a lock. A flush deletes the pending rows of a batch of posts
+# and recomputes their counters from the Reaction table in one transaction, a failed or
+# killed flush rolls back and leaves the rows for the next one.
+
+
+def get_pending(post_ids):
+    """Returns {post_id: (like_delta, dislike_delta)} for posts with pending changes"""
+    rows = PendingReactionCount.objects.filter(post_id__in=list(post_ids))\
+        .order_by().values('post_id')\
+        .annotate(likes=Sum('like_delta'), dislikes=Sum('dislike_delta'))\
+        .values_list('post_id', 'likes', 'dislikes')
+    return {post_id: (likes, dislikes) for post_id, likes, dislikes in rows}
+
+
+def apply_pending(posts):
+    """Adds pending deltas to the counters of the given Post objects in place"""
+    pending = get_pending([post.id for post in posts])
+    for post in posts:
+        like_delta, dislike_delta = pending.get(post.id, (0, 0))
+        post.like_count += like_delta
+        post.dislike_count += dislike_delta
+
+
+def _recompute_counters(post_ids):
+    def count(type):
+        return Coalesce(Subquery(
+            Reaction.objects.filter(post=OuterRef('pk'), type=type)
+            .order_by().values('post').annotate(n=Count('*')).values('n')
+        ), 0)
+
+    return Post.objects.filter(id__in=post_ids).update(
+        like_count=count(Reaction.ReactionType.LIKE),
+        dislike_count=count(Reaction.ReactionType.DISLIKE),
+    )
+
+
+def _flush_batch(post_ids):
+    with transaction.atomic():
+        PendingReactionCount.objects.filter(post_id__in=post_ids).delete()
+        _recompute_counters(post_ids)
+
+
+def flush(batch_size: int = 500) -> int:
+    """
+    Writes the counters of all posts with pending changes, returns the number of posts flushed.
+    A click committed between deleting the pending rows and the recompute is in the recomputed
+    counter and still pending, it is shown one too high until the next flush, never lost.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(PendingReactionCount.objects.filter(post_id__gt=last_id)
+                     .order_by('post_id').values_list('post_id', flat=True).distinct()[:batch_size])
+        if not batch:
+            return total
+        _flush_batch(batch)
+        total += len(batch)
+        last_id = batch[-1]
+
+
+def reconcile(batch_size: int = 500) -> int:
+    """
+    Recomputes the counters of every post from the Reaction table in primary key batches.
+    Used after the counters were changed by hand or the pending rows were truncated.
+    """
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not batch:
+            page_cache.bump_version()
+            return total
+        _flush_batch(batch)
+        total += len(batch)
+        last_id = batch[-1]
@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from ..models import PendingReactionCount, Post, Reaction
+from . import page_cache, reaction_buffer
+
+# One round trip: remove the user's current reaction, insert the new one unless the
+# click repeated the removed type (toggle off), and move the post counters by the
+# difference. The counters are updated relative to their current value under the
+# post row lock, so concurrent clicks on the same post never lose updates. A concurrent
+# click of the same user that already inserted a row wins, reaction_user_post_uniq
+# turns this one into a no-op instead of a duplicate.
+TOGGLE_SQL = f"""
+WITH old AS (
+    DELETE FROM {Reaction._meta.db_table}
+    WHERE user_id = %(user_id)s AND post_id = %(post_id)s
+    RETURNING type
+), ins AS (
+    INSERT INTO {Reaction._meta.db_table} (user_id, post_id, type)
+    SELECT %(user_id)s, %(post_id)s, %(type)s
+    WHERE NOT EXISTS (SELECT 1 FROM old WHERE type = %(type)s)
+      AND EXISTS (SELECT 1 FROM {Post._meta.db_table} WHERE id = %(post_id)s)
+    ON CONFLICT (user_id, post_id) DO NOTHING
+    RETURNING type
+), counters AS (
+    UPDATE {Post._meta.db_table} SET
+        like_count = like_count
+            - (SELECT count(*) FROM old WHERE type = %(like)s)
+            + (SELECT count(*) FROM ins WHERE type = %(like)s),
+        dislike_count = dislike_count
+            - (SELECT count(*) FROM old WHERE type = %(dislike)s)
+            + (SELECT count(*) FROM ins WHERE type = %(dislike)s)
+    WHERE id = %(post_id)s
+    RETURNING like_count, dislike_count
+)
+SELECT (SELECT type FROM ins), like_count, dislike_count FROM counters
+"""
+
+# Buffered variant: only the Reaction row is written, the post row is read without a lock
+# and the counter change is appended to PendingReactionCount (services.reaction_buffer).
+# The counts returned include the pending changes and this click.
+TOGGLE_BUFFERED_SQL = f"""
+WITH old AS (
+    DELETE FROM {Reaction._meta.db_table}
+    WHERE user_id = %(user_id)s AND post_id = %(post_id)s
+    RETURNING type
+), ins AS (
+    INSERT INTO {Reaction._meta.db_table} (user_id, post_id, type)
+    SELECT %(user_id)s, %(post_id)s, %(type)s
+    WHERE NOT EXISTS (SELECT 1 FROM old WHERE type = %(type)s)
+      AND EXISTS (SELECT 1 FROM {Post._meta.db_table} WHERE id = %(post_id)s)
+    ON CONFLICT (user_id, post_id) DO NOTHING
+    RETURNING type
+), delta AS (
+    SELECT (SELECT count(*) FROM ins WHERE type = %(like)s) - (SELECT count(*) FROM old WHERE type = %(like)s) AS likes,
+           (SELECT count(*) FROM ins WHERE type = %(dislike)s) - (SELECT count(*) FROM old WHERE type = %(dislike)s) AS dislikes
+), pending AS (
+    INSERT INTO {PendingReactionCount._meta.db_table} (post_id, like_delta, dislike_delta)
+    SELECT %(post_id)s, likes, dislikes FROM delta WHERE likes <> 0 OR dislikes <> 0
+)
+SELECT (SELECT type FROM ins),
+       like_count + delta.likes + COALESCE(pending_likes, 0),
+       dislike_count + delta.dislikes + COALESCE(pending_dislikes, 0)
+FROM {Post._meta.db_table}, delta, (
+    SELECT sum(like_delta) AS pending_likes, sum(dislike_delta) AS pending_dislikes
+    FROM {PendingReactionCount._meta.db_table} WHERE post_id = %(post_id)s
+) AS before
+WHERE id = %(post_id)s
+"""
+
+
+def toggle_reaction(user_id: int, post_id: int, type: Reaction.ReactionType):
+    """Applies a like/dislike click of the user to the post in a single statement.
+    With settings.REACTION_COUNTER_BUFFER the post counters are updated later by a flush.
+
+    Returns:
+        tuple | None: (state, likes, dislikes) where state is 'like', 'dislike' or 'none',
+        None when the post does not exist.
+    """
+    params = {
+        "user_id": user_id,
+        "post_id": post_id,
+        "type": int(type),
+        "like": Reaction.ReactionType.LIKE.value,
+        "dislike": Reaction.ReactionType.DISLIKE.value,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(TOGGLE_BUFFERED_SQL if settings.REACTION_COUNTER_BUFFER else TOGGLE_SQL, params)
+        result = cursor.fetchone()
+
+    if result is None:
+        return None
+    page_cache.bump_version_soon()
+    state, likes, dislikes = result
+    return Reaction.ReactionType(state).label if state else 'none', likes, dislikes
+
+
+def get_user_reactions(user, post_ids):
+    """Returns {post_id: 'like' | 'dislike'} for the posts the user reacted to"""
+    if not user.is_authenticated or not post_ids:
+        return {}
+    # covered by reaction_user_post_uniq (user_id, post_id) INCLUDE (type), an index only scan
+    rows = Reaction.objects.filter(post_id__in=post_ids, user=user).values_list('post_id', 'type')
+    return {post_id: Reaction.ReactionType(type).label for post_id, type in rows}
+
+
+def get_reaction_states(user, post_ids):
+    """Returns {post_id: {'state', 'likes', 'dislikes'}} for the existing posts among post_ids
+    with one query for the counters and one for the user's reactions"""
+    counts = {post_id: [likes, dislikes] for post_id, likes, dislikes
+              in Post.objects.filter(id__in=post_ids).values_list('id', 'like_count', 'dislike_count')}
+
+    if settings.REACTION_COUNTER_BUFFER:
+        for post_id, (like_delta, dislike_delta) in reaction_buffer.get_pending(counts).items():
+            counts[post_id][0] += like_delta
+            counts[post_id][1] += dislike_delta
+
+    user_reactions = get_user_reactions(user, list(counts))
+    return {
+        post_id: {'state': user_reactions.get(post_id, 'none'), 'likes': likes, 'dislikes': dislikes}
+        for post_id, (likes, dislikes) in counts.items()
+    }
+
+
+def toggle_reactions(user_id: int, clicks):
+    """Applies several (post_id, type) clicks of the user in one transaction, in order per post.
+
+    Returns:
+        dict: {post_id: {'state', 'likes', 'dislikes'}} after the last click on every existing post
+    """
+    results = {}
+    # sorted by post so concurrent batches lock post rows in the same order, sort is stable
+    # so repeated clicks on one post keep their order
+    with transaction.atomic():
+        for post_id, type in sorted(clicks, key=lambda click: click[0]):
+            result = toggle_reaction(user_id, post_id, type)
+            if result is not None:
+                state, likes, dislikes = result
+                results[post_id] = {'state': state, 'likes': likes, 'dislikes': dislikes}
+    return results
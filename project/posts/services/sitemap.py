@@ -0,0 +1,93 @@
+import gzip
+import io
+
+from django.db.models import CharField, Func, Max
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.html import escape
+
+from ..models import Post
+from .tiered_cache import TieredCache
+
+# Sitemap of the posts in chunks of the primary key: chunk n lists the posts with
+# n * CHUNK_SIZE <= id < (n + 1) * CHUNK_SIZE, never more than the 50 000 URLs a sitemap file
+# may hold. A chunk is rendered by streaming its rows and kept gzipped in the two tier cache
+# under a namespace of its own, saving or deleting a post starts a new generation of its chunk
+# only, so crawlers read cached files and the table is read again just for chunks that changed.
+CHUNK_SIZE = 50000
+CACHE_TIMEOUT = 24 * 60 * 60
+ITERATOR_CHUNK_SIZE = 2000
+# stands for the id in the one reverse() of a chunk, the post URLs differ only in the id
+_ID_PLACEHOLDER = 987654321987654321
+
+# W3C datetime formatted by the database, converting 50 000 timestamps in Python costs more than the rest
+LASTMOD = Func(
+    Coalesce('updated_at', 'publish_date'),
+    template="""to_char(%(expressions)s AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"')""",
+    output_field=CharField(),
+)
+
+URLSET_START = b'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_END = b'</urlset>\n'
+
+# the number of chunks, changes only when a post opens a new one
+_index = TieredCache("sitemap_index")
+# chunk number -> TieredCache, created on first use
+_chunks = {}
+
+
+def _chunk_cache(number):
+    tier = _chunks.get(number)
+    if tier is None:
+        tier = _chunks.setdefault(number, TieredCache(f"sitemap_posts:{number}", l1_max_entries=4))
+    return tier
+
+
+def _count_chunks():
+    # MAX(id) is read from the end of the primary key index
+    max_id = Post.objects.aggregate(max_id=Max('id'))['max_id']
+    return 0 if max_id is None else max_id // CHUNK_SIZE + 1
+
+
+def chunk_count():
+    """Returns the number of sitemap chunks of the posts"""
+    return _index.get_or_set("count", _count_chunks, CACHE_TIMEOUT)
+
+
+def _render_chunk(base_url, number):
+    rows = Post.objects\
+        .filter(id__gte=number * CHUNK_SIZE, id__lt=(number + 1) * CHUNK_SIZE)\
+        .order_by('id')\
+        .values_list('id', LASTMOD)\
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+    location = escape(base_url + reverse('post_detail', args=[_ID_PLACEHOLDER])).replace(str(_ID_PLACEHOLDER), '{}')
+    buffer = io.BytesIO()
+    # mtime=0 keeps the bytes, and so the ETag of the response, the same for the same rows
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as out:
+        out.write(URLSET_START)
+        for post_id, lastmod in rows:
+            out.write(f"<url><loc>{location.format(post_id)}</loc><lastmod>{lastmod}</lastmod></url>\n".encode('utf-8'))
+        out.write(URLSET_END)
+    return buffer.getvalue()
+
+
+def get_chunk(base_url: str, number: int):
+    """
+    Returns the gzipped sitemap of the chunk with its URLs starting with base_url
+    ('https://domain'), None for a chunk past the last post
+    """
+    if number >= chunk_count():
+        return None
+    return _chunk_cache(number).get_or_set(base_url, lambda: _render_chunk(base_url, number), CACHE_TIMEOUT)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def _post_changed(sender, instance, **kwargs):
+    number = instance.id // CHUNK_SIZE
+    _chunk_cache(number).invalidate()
+    if number >= chunk_count():
+        _index.invalidate()
@@ -1,45 +1,306 @@
-from django.core.cache import cache
+from django.conf import settings
+from django.core.cache import caches
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 import re
+import regex
+import time
 
 from ..models import SpamRegEx
+from .tiered_cache import TieredCache
+
+# The compiled matcher lives in process memory only (L1), a shared cache would recompile
+# the patterns on every read. Changes reach the other workers through the generation of
+# the shared cache (services.tiered_cache). The stats are kept in the shared cache.
+_cache = TieredCache("spam_patterns")
+STATS_KEY = "spam_pattern_stats"
+TIMEOUTS_KEY = "spam_check_timeouts"
+# fields of the latest slow checks, profiled by python manage.py spam_pattern_stats --profile
+SLOW_CHECKS_KEY = "spam_slow_checks"
+MAX_SLOW_CHECKS = 20
+# patterns faster than this are not recorded by the profile
+SLOW_PATTERN_MS = 1.0
+
+# The patterns run on the regex module (re compatible), its searches take a timeout and
+# stop a backtracking pattern in any thread, signals (SIGALRM) only work in the main thread
+# and the views run in threads under the ASGI worker. The helper regexes below and the
+# literal prefilter can not backtrack and stay on re.
+
+# Joins the post fields so the prefilter scans them in one pass. A prefix hit is only a
+# candidate, the pattern behind it is checked on every field on its own.
+FIELD_SEPARATOR = "\n\x00\n"
+
+# Patterns without any regex syntax, escaped characters like "\." included.
+_LITERAL_RE = re.compile(r'(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])+')
+# Backreferences, named groups and inline flags break when merged into one alternation.
+_ISOLATED_RE = re.compile(r'\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]')
+# Shorter prefixes hit too often to be worth checking the patterns behind them.
+MIN_PREFIX = 3
+
+
+def _remaining(deadline):
+    """Returns the timeout of the next search, None without a deadline"""
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("regex timed out")
+    return remaining
+
+
+def _trie_regex(literals):
+    """
+    Returns one regex matching any of the literals, shaped as a trie (common prefixes
+    merged) so the engine walks it like an Aho-Corasick automaton instead of trying
+    every literal at every position.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not end:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if end else '')
+
+    return build(trie)
+
+
+def literal_prefix(pattern):
+    """Returns the lowercased literal text every match of the pattern starts with"""
+    depth, in_class, escaped = 0, False, False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char in '()':
+            depth += 1 if char == '(' else -1
+        elif char == '|' and depth == 0:
+            return ''
+
+    pattern = re.sub(r'^(?:\^|\\A)', '', pattern)
+    prefix = _LITERAL_RE.match(pattern)
+    if prefix is None:
+        return ''
+    literal = re.sub(r'\\(.)', r'\1', prefix.group())
+    if pattern[prefix.end():prefix.end() + 1] in ('*', '?', '{'):
+        # the last character is optional
+        literal = literal[:-1]
+    return literal.lower()
+
+
+class _Alternation:
+    """
+    Patterns merged into one alternation. Scans without groups (a group per branch makes
+    the regex engine several times slower) and names the pattern that fired with a
+    named group alternation matched only at the hit.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.scan_re = regex.compile('|'.join(f'(?:{pattern})' for pattern in patterns), regex.IGNORECASE)
+        self.rule_re = regex.compile('|'.join(f'(?P<p{index}>{pattern})' for index, pattern in enumerate(patterns)), regex.IGNORECASE)
+
+    def search(self, text, deadline=None):
+        found = self.scan_re.search(text, timeout=_remaining(deadline))
+        if found is None:
+            return None
+        rule = self.rule_re.match(text, found.start(), timeout=_remaining(deadline))
+        return self.patterns[int(rule.lastgroup[1:])]
+
+
+class SpamMatcher:
+    """
+    All SpamRegEx patterns compiled for a single scan of a post.
+
+    Literal patterns, and the literal prefixes of the other patterns, are merged into one
+    trie regex (the prefilter); a prefix hit only checks the patterns starting with it.
+    Patterns without a literal prefix are merged into one alternation, run on every field
+    on its own so anchors see the field boundaries and patterns like \\W{3} can not match
+    across two fields. Patterns that can not be merged (backreferences, own named groups,
+    inline flags) are kept on their own.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        # every pattern on its own, for profiling
+        self.compiled = []
+        # prefix -> the pattern when the pattern is the literal itself, else list of compiled patterns
+        self.prefixes = {}
+        unprefixed, self.isolated = [], []
+
+        for pattern in self.patterns:
+            # validates the pattern, same as compiling it on its own
+            compiled = regex.compile(pattern, regex.IGNORECASE)
+            self.compiled.append((pattern, compiled))
+            if _ISOLATED_RE.search(pattern):
+                self.isolated.append((pattern, compiled))
+            elif _LITERAL_RE.fullmatch(pattern):
+                literal = re.sub(r'\\(.)', r'\1', pattern).lower()
+                self.prefixes[literal] = pattern
+            elif len(prefix := literal_prefix(pattern)) >= MIN_PREFIX:
+                candidates = self.prefixes.setdefault(prefix, [])
+                if isinstance(candidates, list):
+                    candidates.append((pattern, compiled))
+            else:
+                unprefixed.append(pattern)
+
+        self.prefix_re = re.compile(_trie_regex(self.prefixes), re.IGNORECASE) if self.prefixes else None
+        self.unprefixed = _Alternation(unprefixed) if unprefixed else None
+
+    def _prefilter(self, text, fields, deadline):
+        position = 0
+        # the trie of literals can not backtrack, it runs on re and the deadline is checked per hit
+        while (found := self.prefix_re.search(text, position)) is not None:
+            _remaining(deadline)
+            hit = found.group().lower()
+            # shorter prefixes ending inside the hit start at the same position
+            for end in range(len(hit), 0, -1):
+                candidates = self.prefixes.get(hit[:end])
+                if isinstance(candidates, str):
+                    return candidates
+                for pattern, compiled in candidates or ():
+                    if any(compiled.search(field, timeout=_remaining(deadline)) for field in fields):
+                        return pattern
+            # restart right after the hit start, prefixes may overlap
+            position = found.start() + 1
+        return None
+
+    def match(self, *fields, timeout=None):
+        """
+        Returns the pattern matching any of the fields, None when there is none.
+        Raises TimeoutError when the searches take longer than timeout seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        fields = [field or '' for field in fields]
+        text = FIELD_SEPARATOR.join(fields)
+
+        if self.prefix_re is not None and (pattern := self._prefilter(text, fields, deadline)):
+            return pattern
+        for field in fields:
+            if self.unprefixed is not None and (pattern := self.unprefixed.search(field, deadline)):
+                return pattern
+            for pattern, compiled in self.isolated:
+                if compiled.search(field, timeout=_remaining(deadline)):
+                    return pattern
+        return None
 
-CACHE_KEY = "spam_regex_patterns"
 
 def _fetch_from_db():
     return SpamRegEx.objects.values_list('pattern', flat=True)
 
 def get_spam_patterns():
     """
-    Returns a list of normalized spam regex patterns.
-    It will use Django cache; on cache miss it fetches from DB and populates cache.
+    Returns the SpamMatcher of all spam regex patterns.
+    It is kept in process memory and rebuilt from the DB after a change in any worker.
     """
-    patterns = cache.get(CACHE_KEY)
-    if patterns is None:
-        patterns = _fetch_from_db()
-        patterns = [re.compile(rf'{pattern}', re.IGNORECASE) for pattern in patterns]
-        cache.set(CACHE_KEY, patterns)
-    return patterns
+    return _cache.get_or_set("matcher", lambda: SpamMatcher(_fetch_from_db()), shared=False)
 
 def clear_spam_patterns_cache():
-    cache.delete(CACHE_KEY)
+    _cache.invalidate()
 
-# Connect signals so any change to SpamRegEx clears the cache immediately.
+# Connect signals so any change to SpamRegEx reaches every worker.
 @receiver(post_save, sender=SpamRegEx)
 @receiver(post_delete, sender=SpamRegEx)
 def _spam_pattern_changed(sender, instance, **kwargs):
     clear_spam_patterns_cache()
 
 
+class SpamCheckTimeout(Exception):
+    pass
+
+def _budget():
+    return settings.SPAM_CHECK_TIMEOUT_MS / 1000
+
+def _queue_slow_check(fields):
+    # the latest checks are enough to find the slow patterns, a lost race loses one sample
+    shared = caches["shared"]
+    slow_checks = shared.get(SLOW_CHECKS_KEY, [])
+    shared.set(SLOW_CHECKS_KEY, [tuple(fields), *slow_checks][:MAX_SLOW_CHECKS], None)
+
+def profile_patterns():
+    """
+    Times every pattern on its own against the fields of the queued slow checks and adds
+    the slow ones to the stats, returns the number of checks profiled. Runs outside of the
+    requests (spam_pattern_stats --profile), every pattern gets the check's time budget.
+    """
+    shared = caches["shared"]
+    slow_checks = shared.get(SLOW_CHECKS_KEY, [])
+    shared.delete(SLOW_CHECKS_KEY)
+    if not slow_checks:
+        return 0
+
+    stats = shared.get(STATS_KEY, {})
+    for pattern, compiled in get_spam_patterns().compiled:
+        for fields in slow_checks:
+            start = time.perf_counter()
+            deadline = time.monotonic() + _budget()
+            try:
+                for field in fields:
+                    compiled.search(field or '', timeout=_remaining(deadline))
+            except TimeoutError:
+                pass
+            ms = (time.perf_counter() - start) * 1000
+            if ms >= SLOW_PATTERN_MS:
+                count, total_ms, max_ms = stats.get(pattern, (0, 0.0, 0.0))
+                stats[pattern] = (count + 1, total_ms + ms, max(max_ms, ms))
+    shared.set(STATS_KEY, stats, None)
+    return len(slow_checks)
+
+def get_stats():
+    """Returns (timeouts, [(pattern, count, total_ms, max_ms)] slowest first)"""
+    shared = caches["shared"]
+    stats = shared.get(STATS_KEY, {})
+    rows = sorted(((pattern, *values) for pattern, values in stats.items()), key=lambda row: -row[3])
+    return shared.get(TIMEOUTS_KEY, 0), rows
+
+def reset_stats():
+    caches["shared"].delete_many([STATS_KEY, TIMEOUTS_KEY, SLOW_CHECKS_KEY])
+
+
+def find_spam_pattern(title: str, text: str, example: str):
+    """Returns the spam pattern matching any of the given text fields.
+
+    Raises:
+        SpamCheckTimeout: the check took longer than SPAM_CHECK_TIMEOUT_MS.
+
+    Returns:
+        str | None: the SpamRegEx pattern that fired, None if the fields are clean.
+    """
+    matcher = get_spam_patterns()
+    fields = (title, text, example)
+    start = time.perf_counter()
+    try:
+        return matcher.match(*fields, timeout=_budget())
+    except TimeoutError:
+        caches["shared"].add(TIMEOUTS_KEY, 0, None)
+        caches["shared"].incr(TIMEOUTS_KEY)
+        raise SpamCheckTimeout()
+    finally:
+        if time.perf_counter() - start > _budget() / 2:
+            _queue_slow_check(fields)
+
+
 def is_spam_text(title: str, text: str, example: str) -> bool:
     """Check if any of the given text fields match spam patterns defined in the database.
 
     Returns:
-        bool: True if any of the fields match a spam pattern, False otherwise.
+        bool: True if any of the fields match a spam pattern, False otherwise. When the
+        check runs out of time SPAM_CHECK_FAIL_CLOSED decides.
     """
-    spam_patterns = get_spam_patterns()
-    for pattern in spam_patterns:
-        if pattern.search(title) or pattern.search(text) or pattern.search(example):
-            return True
-    return False
\ No newline at end of file
+    try:
+        return find_spam_pattern(title, text, example) is not None
+    except SpamCheckTimeout:
+        return settings.SPAM_CHECK_FAIL_CLOSED
@@ -0,0 +1,78 @@
+import json
+import re
+import regex
+import subprocess
+import sys
+
+from .spam_detection import literal_prefix
+
+# Checks new SpamRegEx patterns for catastrophic backtracking (ReDoS) before they are
+# saved. The pattern is timed against inputs built to make it backtrack, in a child
+# process so a pattern that never finishes can be killed.
+
+# longest field of a post (Post.post_text / post_example)
+INPUT_LENGTH = 1000
+# slowest accepted search of one adversarial input
+MAX_SEARCH_MS = 20
+# the child process is killed after this, the pattern is rejected
+CHECK_TIMEOUT = 2.0
+
+# Nested quantifiers like (a+)+ or (\w*)* backtrack exponentially on a near match.
+_NESTED_QUANTIFIER_RE = re.compile(r'\((?:[^()\\]|\\.)*[+*}](?:[^()\\]|\\.)*\)(?:[+*]|\{\d*,)')
+
+_CHILD = """
+import json, regex, sys, time
+job = json.load(sys.stdin)
+pattern = regex.compile(job["pattern"], regex.IGNORECASE)
+slowest, worst = 0.0, 0
+for index, text in enumerate(job["inputs"]):
+    start = time.perf_counter()
+    pattern.search(text)
+    ms = (time.perf_counter() - start) * 1000
+    if ms > slowest:
+        slowest, worst = ms, index
+json.dump([slowest, worst], sys.stdout)
+"""
+
+
+def adversarial_inputs(pattern, length=INPUT_LENGTH):
+    """
+    Returns texts that make backtracking patterns slow: long runs of every character the
+    pattern can match, and of pairs of them, ended by a character it does not expect,
+    each also after the literal prefix of the pattern.
+    """
+    chars = sorted({char for char in pattern if char.isprintable() and char not in '\\()[]{}|*+?^$'} | set('a1 .'))
+    runs = [char * length for char in chars]
+    runs += [(first + second) * (length // 2) for first in chars[:6] for second in chars[:6] if first < second]
+    prefix = literal_prefix(pattern)
+    inputs = [run + '\x00' for run in runs]
+    if prefix:
+        inputs += [prefix + run + '\x00' for run in runs]
+    return inputs
+
+
+def check_pattern(pattern):
+    """Returns why the pattern can not be used as a spam pattern, None when it is safe"""
+    try:
+        # the engine of the spam check (services.spam_detection)
+        regex.compile(pattern, regex.IGNORECASE)
+    except regex.error as e:
+        return f"Invalid regular expression: {e}"
+
+    if _NESTED_QUANTIFIER_RE.search(pattern):
+        return "Nested quantifiers like (a+)+ can backtrack catastrophically."
+
+    inputs = adversarial_inputs(pattern)
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", _CHILD],
+            input=json.dumps({"pattern": pattern, "inputs": inputs}),
+            capture_output=True, text=True, timeout=CHECK_TIMEOUT, check=True,
+        )
+    except subprocess.TimeoutExpired:
+        return f"The pattern did not finish within {CHECK_TIMEOUT:.0f} s on adversarial input."
+    slowest, worst = json.loads(result.stdout)
+    if slowest > MAX_SEARCH_MS:
+        return (f"The pattern needs {slowest:.0f} ms on adversarial input "
+                f"({inputs[worst][:20]!r}...), at most {MAX_SEARCH_MS} ms is allowed.")
+    return None
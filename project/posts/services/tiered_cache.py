@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from asgiref.sync import sync_to_async
+
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from ..models import CacheNamespace
+
+# Two cache tiers. L1 is a small LRU in process memory, it keeps the objects themselves (no
+# pickling, compiled regexes and large sets stay usable). L2 is the 'shared' cache (CACHES in
+# settings) seen by every worker and management command. Every namespace has a generation
+# counter (CacheNamespace) that is part of its L2 keys, invalidate() increments it: the other
+# processes notice it at most GENERATION_CHECK_INTERVAL seconds later, drop their L1 and never
+# read the old L2 entries again, those simply expire. Frequent changes (reactions) use
+# invalidate_soon(), which never writes the namespace row itself: this process starts the new
+# generation at its next check, so every process bumps at most once per interval.
+GENERATION_CHECK_INTERVAL = 1.0
+L1_MAX_ENTRIES = 500
+DEFAULT_TIMEOUT = 300
+STATS = ("l1_hits", "l2_hits", "misses")
+
+_TABLE = CacheNamespace._meta.db_table
+# A new namespace starts at a random generation, a row lost with a rolled back transaction or
+# a restored database never comes back to a generation some process still holds.
+_INSERT = f"""
+INSERT INTO {_TABLE} (namespace, generation, changed_at, l1_hits, l2_hits, misses)
+VALUES (%(namespace)s, (random() * 281474976710656)::bigint, now(), %(l1_hits)s, %(l2_hits)s, %(misses)s)
+"""
+# one statement, concurrent bumps and flushes of other processes are never lost
+BUMP_SQL = _INSERT + f"""
+ON CONFLICT (namespace) DO UPDATE SET generation = {_TABLE}.generation + 1, changed_at = now()
+RETURNING generation, changed_at
+"""
+FLUSH_SQL = _INSERT + f"""
+ON CONFLICT (namespace) DO UPDATE SET
+    generation = {_TABLE}.generation + %(bump)s,
+    changed_at = CASE WHEN %(bump)s > 0 THEN now() ELSE {_TABLE}.changed_at END,
+    l1_hits = {_TABLE}.l1_hits + EXCLUDED.l1_hits,
+    l2_hits = {_TABLE}.l2_hits + EXCLUDED.l2_hits,
+    misses = {_TABLE}.misses + EXCLUDED.misses
+RETURNING generation, changed_at
+"""
+
+_MISSING = object()
+
+
+class TieredCache:
+    """
+    L1 + L2 cache of one namespace, one module level instance per namespace.
+    Hit/miss counts are kept in process memory and added to CacheNamespace at every
+    generation check.
+    """
+
+    # namespace -> instance, for the cache_stats command
+    instances = {}
+
+    def __init__(self, namespace, check_interval=GENERATION_CHECK_INTERVAL, l1_max_entries=L1_MAX_ENTRIES):
+        self.namespace = namespace
+        self.check_interval = check_interval
+        self.l1_max_entries = l1_max_entries
+        # key -> (generation, value)
+        self._l1 = OrderedDict()
+        self._generation = None
+        self._changed_at = None
+        self._checked_at = 0.0
+        self._stats = Counter()
+        # invalidate_soon() was called since the last check
+        self._changed = False
+        self._lock = threading.Lock()
+        TieredCache.instances.setdefault(namespace, self)
+
+    @property
+    def _shared(self):
+        return caches["shared"]
+
+    def _shared_key(self, key, generation):
+        return f"{self.namespace}:{generation}:{key}"
+
+    def _is_checked(self):
+        return self._generation is not None and time.monotonic() - self._checked_at < self.check_interval
+
+    def generation(self):
+        """Returns the current generation, read from the database at most once per check interval"""
+        if not self._is_checked():
+            self._refresh()
+        return self._generation
+
+    async def ageneration(self):
+        """generation() for async code, only a due check leaves the event loop"""
+        if not self._is_checked():
+            await sync_to_async(self._refresh)()
+        return self._generation
+
+    def state(self):
+        """Returns (generation, changed_at), the current generation and when it started"""
+        generation = self.generation()
+        return generation, self._changed_at
+
+    async def astate(self):
+        """state() for async code"""
+        generation = await self.ageneration()
+        return generation, self._changed_at
+
+    def _execute(self, sql, stats, bump=0):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {"namespace": self.namespace, "bump": bump, **{stat: stats[stat] for stat in STATS}})
+            return cursor.fetchone()
+
+    def _refresh(self):
+        with self._lock:
+            stats, self._stats = self._stats, Counter()
+            changed, self._changed = self._changed, False
+        if changed or any(stats.values()):
+            row = self._execute(FLUSH_SQL, stats, bump=int(changed))
+        else:
+            row = CacheNamespace.objects.filter(namespace=self.namespace).values_list("generation", "changed_at").first()
+            if row is None:
+                row = self._execute(FLUSH_SQL, stats)
+        self._set_generation(*row)
+
+    def _set_generation(self, generation, changed_at, clear=False):
+        with self._lock:
+            if clear or generation != self._generation:
+                self._l1.clear()
+                self._generation = generation
+            self._changed_at = changed_at
+            self._checked_at = time.monotonic()
+
+    def _bump(self):
+        self._set_generation(*self._execute(BUMP_SQL, Counter()), clear=True)
+
+    def invalidate(self):
+        """
+        Starts a new generation, this process drops its L1 at once, the others within the
+        check interval. Inside a transaction the generation is bumped again on commit, other
+        processes may have loaded the old rows in between.
+        """
+        self._bump()
+        if connection.in_atomic_block:
+            transaction.on_commit(self._bump)
+
+    def invalidate_soon(self):
+        """
+        Starts a new generation at the next generation check of this process, at most the check
+        interval later, together with the hit/miss counts. No query, several calls in one interval
+        bump once. Inside a transaction it is marked again on commit, like invalidate().
+        """
+        self._mark_changed()
+        if connection.in_atomic_block:
+            transaction.on_commit(self._mark_changed)
+
+    def _mark_changed(self):
+        with self._lock:
+            self._changed = True
+
+    def get_stats(self):
+        """Returns {stat: count} of STATS summed over all processes"""
+        self._refresh()
+        row = CacheNamespace.objects.filter(namespace=self.namespace).values(*STATS).first()
+        return row or dict.fromkeys(STATS, 0)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+        CacheNamespace.objects.filter(namespace=self.namespace).update(**dict.fromkeys(STATS, 0))
+
+    def clear_local(self):
+        """Forgets L1, the generation and the pending counts of this process (tests)"""
+        with self._lock:
+            self._l1.clear()
+            self._generation = None
+            self._stats.clear()
+            self._changed = False
+
+    def count(self, stat):
+        """Adds one to a stat (STATS) of this process, also for callers counting their own hits"""
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _l1_get(self, key, generation):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None or entry[0] != generation:
+                return _MISSING
+            self._l1.move_to_end(key)
+            return entry[1]
+
+    def _l1_set(self, key, value, generation):
+        with self._lock:
+            self._l1[key] = (generation, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, shared=True):
+        """
+        Returns the value of the key from L1, else from L2, else calls default() and stores
+        its result. timeout (seconds) only applies to L2, L1 entries live until the next
+        generation or until pushed out. shared=False keeps the value in L1 only.
+        """
+        # read before loading, a value loaded during an invalidation lands in the old generation
+        generation = self.generation()
+        value = self._l1_get(key, generation)
+        if value is not _MISSING:
+            self.count("l1_hits")
+            return value
+
+        shared_key = self._shared_key(key, generation)
+        if shared and (value := self._shared.get(shared_key, _MISSING)) is not _MISSING:
+            self.count("l2_hits")
+        else:
+            self.count("misses")
+            value = default()
+            if shared:
+                self._shared.set(shared_key, value, timeout)
+        self._l1_set(key, value, generation)
+        return value
+
+    async def aget_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, shared=True):
+        """get_or_set() for async code, an L1 hit never leaves the event loop, default() runs in a thread"""
+        generation = await self.ageneration()
+        value = self._l1_get(key, generation)
+        if value is not _MISSING:
+            self.count("l1_hits")
+            return value
+
+        shared_key = self._shared_key(key, generation)
+        if shared and (value := await self._shared.aget(shared_key, _MISSING)) is not _MISSING:
+            self.count("l2_hits")
+        else:
+            self.count("misses")
+            value = await sync_to_async(default)()
+            if shared:
+                await self._shared.aset(shared_key, value, timeout)
+        self._l1_set(key, value, generation)
+        return value
@@ -0,0 +1,70 @@
+import unicodedata
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.db.models.functions import Collate
+
+from ..models import Post
+
+CACHE_KEY_PREFIX = "typeahead"
+CACHE_TIMEOUT = 60          # seconds, new posts show up in suggestions within a minute
+MIN_QUERY_LENGTH = 2
+MAX_LIMIT = 20
+
+
+def normalize_title(text: str) -> str:
+    """
+    Python equivalent of lower(unaccent(...)) used for Post.title_normalized,
+    so the lookup value is a constant and the trigram index can be used
+    """
+    decomposed = unicodedata.normalize("NFKD", (text or "").strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _add_titles(titles, candidates, limit):
+    # the same word can have many definitions, over-fetch and keep the first occurrence of every title
+    for title in candidates[:limit * 3]:
+        if len(titles) == limit:
+            break
+        if title not in titles:
+            titles.append(title)
+
+
+def _prefix_matches(query: str):
+    # read in the order of post_title_prefix_idx, the LIMIT stops the scan
+    return Post.objects.annotate(title_c=Collate("title_normalized", "C"))\
+        .filter(title_c__startswith=query)\
+        .order_by("title_c")\
+        .values_list("post_title", flat=True)
+
+
+def _fetch_from_db(query: str, limit: int):
+    # prefix matches first
+    titles = []
+    _add_titles(titles, _prefix_matches(query), limit)
+    if len(titles) < limit:
+        # then typos ordered by trigram similarity, this query scores all candidates, only run when needed
+        typos = Post.objects.filter(title_normalized__trigram_similar=query)\
+            .annotate(similarity=TrigramSimilarity("title_normalized", query))\
+            .order_by("-similarity", "post_title")\
+            .values_list("post_title", flat=True)
+        _add_titles(titles, typos, limit)
+    return titles
+
+
+def suggest_titles(text: str, limit: int = 10):
+    """
+    Returns up to limit post titles matching the typed text by prefix or trigram similarity.
+    Results are cached per normalized prefix for CACHE_TIMEOUT seconds.
+    """
+    query = normalize_title(text)
+    limit = max(1, min(limit, MAX_LIMIT))
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+
+    key = f"{CACHE_KEY_PREFIX}:{limit}:{query}"
+    titles = cache.get(key)
+    if titles is None:
+        titles = _fetch_from_db(query, limit)
+        cache.set(key, titles, CACHE_TIMEOUT)
+    return titles
@@ -1,7 +1,12 @@
+from datetime import timedelta
+
 from django.core import signing
 from django.conf import settings
 from django.utils import timezone
 
+# lifetime of the verification links, unverified users and posts are deleted after it (manage.py cleanup_unverified)
+TOKEN_MAX_AGE = 600
+
 # Purpose is user verification or post verification, can be extended to other use cases as needed
 def generate_signed_token(user_id: int, purpose: str) -> str:
     payload = {
@@ -14,7 +19,12 @@ def generate_signed_token(user_id: int, purpose: str) -> str:
     return signed
 
 
-def verify_signed_token(token: str, expected_purpose: str, max_age_seconds: int = 600) -> int:
+def token_expires_at():
+    """When a token generated now stops working, its verification email is not sent after it"""
+    return timezone.now() + timedelta(seconds=TOKEN_MAX_AGE)
+
+
+def verify_signed_token(token: str, expected_purpose: str, max_age_seconds: int = TOKEN_MAX_AGE) -> int:
     signer = signing.TimestampSigner(salt="posts-signed-tokens")
     try:
         payload = signer.unsign_object(token, max_age=max_age_seconds)
@@ -1,4 +1,14 @@
+import gzip
+
 from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import SitemapIndexItem
+from django.contrib.sites.shortcuts import get_current_site
+from django.http import Http404, HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from .services import sitemap as posts_sitemap
     
 class StaticViewSitemap(Sitemap):
     changefreq = "never"
@@ -27,4 +37,34 @@ class DynamicViewSitemap(Sitemap):
 sitemaps = {
     'static': StaticViewSitemap,
     'dynamic': DynamicViewSitemap,
-}
\ No newline at end of file
+}
+
+
+def _base_url(request):
+    return f"https://{get_current_site(request).domain}"
+
+def index(request):
+    """sitemap.xml, the sections above and the chunks of the posts sitemap"""
+    base_url = _base_url(request)
+    items = [SitemapIndexItem(base_url + reverse('django.contrib.sitemaps.views.sitemap', kwargs={'section': section}), None)
+             for section in sitemaps]
+    items += [SitemapIndexItem(base_url + reverse('sitemap_posts', args=[number]), None)
+              for number in range(posts_sitemap.chunk_count())]
+    response = TemplateResponse(request, 'sitemap_index.xml', {'sitemaps': items}, content_type='application/xml')
+    response.headers['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    return response
+
+def posts(request, chunk):
+    """One chunk of the posts sitemap, sent gzipped to the clients accepting it"""
+    body = posts_sitemap.get_chunk(_base_url(request), chunk)
+    if body is None:
+        raise Http404
+
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(body, content_type='application/xml')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(body), content_type='application/xml')
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response.headers['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    return response
@@ -0,0 +1,44 @@
+import gzip
+
+import brotli
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+# text assets worth compressing, images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.json', '.svg', '.txt', '.xml')
+# below this many bytes the compressed file is not smaller than the headers it saves
+MIN_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content hashed static file names (css/style.3f2a1b9c0d4e.css, cached forever by nginx)
+    plus .gz and .br siblings of the hashed text files, served by nginx gzip_static / brotli_static
+    instead of compressing every response on the fly
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                yield from self._compress(name)
+
+    def _compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_SIZE:
+            return
+
+        for suffix, compress in (('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+                                 ('.br', lambda data: brotli.compress(data, quality=11))):
+            compressed_name = name + suffix
+            # hashed names are content addressed, an existing sibling already has this content
+            if self.exists(compressed_name):
+                continue
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                self._save(compressed_name, ContentFile(compressed))
+                yield name, compressed_name, True
@@ -5,6 +5,10 @@ from . import views
 
 urlpatterns = [
     path('', views.feed, name = 'feed'),
+    path('hot/', views.hot, name = 'hot'),
+    path('top/', views.top, name = 'top'),
+    path('top/<str:period>/', views.top, name = 'top_period'),
+    path('controversial/', views.controversial, name = 'controversial'),
     path('random_post/', views.random_post, name = 'random_post'),
     path('create_post/', views.create_post, name = 'create_post'),
     path('verify_post/<str:token>/', views.verify_post, name = 'verify_post'),
@@ -16,5 +20,9 @@ urlpatterns = [
     path('change_password/', views.change_password, name = 'change_password'),
     path('user_posts/', views.user_posts, name = 'user_posts'),
     path('search/', views.search, name = 'search'),
-    path('<int:post_id>/react/', views.toggle_reaction, name='toggle_reaction')
+    path('autocomplete/', views.autocomplete, name = 'autocomplete'),
+    path('<int:post_id>/', views.post_detail, name='post_detail'),
+    path('<int:post_id>/react/', views.toggle_reaction, name='toggle_reaction'),
+    path('reactions/', views.reaction_states, name='reaction_states'),
+    path('reactions/batch/', views.toggle_reactions, name='toggle_reactions'),
 ]
\ No newline at end of file
@@ -1,79 +1,155 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, HttpResponseNotAllowed, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.http import Http404, HttpResponseNotAllowed, HttpResponseBadRequest, JsonResponse
 from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout, update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
-from django.core.mail import send_mail
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.conf import settings
 from django.db import transaction, models
 
 import json
 
 from uuid import uuid4
-from random import randint
+
+from asgiref.sync import sync_to_async
 
 from posts.forms import *
 from posts.models import *
 
-from .services.verification import generate_signed_token, verify_signed_token
+from .services.verification import generate_signed_token, token_expires_at, verify_signed_token
+from .services.pagination import KeysetPaginator
+from .services.typeahead import suggest_titles
+from .services.random_post import aget_random_post
+from .services import reactions, reaction_buffer, page_cache, rankings
+from .services.outbox import queue_mail
+from .services.conditional_get import conditional_listing
 
 POSTS_PER_PAGE = 10
+DEFAULT_KEYS = ("publish_date", "id")
 
 
 #TODO:
 #likes
 
-def _display_posts_paginated(request, posts):
+def _posts_renderer(request, posts, keyset, context, keys=DEFAULT_KEYS):
+    """
+    Returns the function rendering the requested page of posts (feed_posts.html),
+    it stores the page in context['page_obj']
+    """
+    def render_posts():
+        if keyset:
+            paginator = KeysetPaginator(posts, POSTS_PER_PAGE, keys)
+            page_obj = paginator.get_page(request.GET.get("cursor"), request.GET.get("page"))
+        else:
+            paginator = Paginator(posts, POSTS_PER_PAGE)                    #paginator objects that handles serving objects on multiple pages
+            page_num = request.GET.get("page")
+            page_obj = paginator.get_page(page_num)             #retrieves only the posts for the given page
+
+        if settings.REACTION_COUNTER_BUFFER:
+            reaction_buffer.apply_pending(page_obj.object_list)
+
+        context['page_obj'] = page_obj
+        return render_to_string('feed_posts.html', {'page_obj': page_obj}, request)
+
+    return render_posts
+
+def _display_posts_paginated(request, posts, keyset=False, cache_as=None, keys=DEFAULT_KEYS):
     """
     Helper function to display posts with pagination
+    keyset=True pages by cursors over keys (publish_date, id by default) instead of COUNT + OFFSET,
+    posts must have an index in that descending order
+    cache_as names the listing in the shared fragment cache (services.page_cache), the rendered posts are
+    the same for every visitor, the user's reactions are filled in by reaction.js from reaction_states
     """
-    paginator = Paginator(posts, POSTS_PER_PAGE)                    #paginator objects that handles serving objects on multiple pages
-    page_num = request.GET.get("page")
-    page_obj = paginator.get_page(page_num)             #retrieves only the posts for the given page
+    context = {}
+    render_posts = _posts_renderer(request, posts, keyset, context, keys)
 
-    # handle user reactions to posts for both logged in and anonymous users
-    user_reactions = {}
+    if cache_as:
+        posts_html = page_cache.get_or_render(cache_as, request.GET, render_posts)
+    else:
+        posts_html = mark_safe(render_posts())
 
-    if request.user.is_authenticated:
-        post_ids = [p.id for p in page_obj.object_list]
-        for reaction in Reaction.objects.filter(post_id__in=post_ids, user=request.user):
-            user_reactions[reaction.post_id] = reaction.type #like, dislake or none
+    return render(request, 'feed.html', {'posts_html': posts_html, **context})
 
-    for post in page_obj.object_list:
-        post.user_reaction = user_reactions.get(post.id, 'none')
- 
-    return render(request, 'feed.html', {'page_obj': page_obj})
+async def _adisplay_posts_paginated(request, posts, keyset=False, cache_as=None, keys=DEFAULT_KEYS):
+    """
+    _display_posts_paginated for async views, a cached page is looked up on the event loop,
+    querying and rendering run in worker threads (session, user and messages are sync only)
+    """
+    context = {}
+    render_posts = _posts_renderer(request, posts, keyset, context, keys)
+
+    if cache_as:
+        posts_html = await page_cache.aget_or_render(cache_as, request.GET, render_posts)
+    else:
+        posts_html = mark_safe(await sync_to_async(render_posts)())
+
+    return await sync_to_async(render)(request, 'feed.html', {'posts_html': posts_html, **context})
 
 
 def redirect_home():
     return redirect('/posts/?page=1')
 
 
-def feed(request):
-    posts = Post.objects.all().order_by('-publish_date')
-    return _display_posts_paginated(request, posts)
+# feed, the ranked listings, post_detail, random_post, search and toggle_reaction are async views
+# (served by the ASGI worker, see runserver.sh), the account and posting views stay sync and run
+# in worker threads
+
+@conditional_listing()
+async def feed(request):
+    posts = Post.objects.select_related('author').order_by('-publish_date', '-id')
+    return await _adisplay_posts_paginated(request, posts, keyset=True, cache_as='feed')
+
+
+# ranked listings, ordered by precomputed scores (services.rankings)
+
+@conditional_listing()
+async def hot(request):
+    posts, keys = rankings.hot_posts()
+    return await _adisplay_posts_paginated(request, posts, keyset=True, cache_as='hot', keys=keys)
 
 
-def random_post(request):
+@conditional_listing()
+async def top(request, period='all'):
+    if period not in rankings.PERIODS:
+        raise Http404
+    posts, keys = rankings.top_posts(period)
+    return await _adisplay_posts_paginated(request, posts, keyset=True, cache_as=f'top_{period}', keys=keys)
+
+
+@conditional_listing()
+async def controversial(request):
+    posts, keys = rankings.controversial_posts()
+    return await _adisplay_posts_paginated(request, posts, keyset=True, cache_as='controversial', keys=keys)
+
+
+async def _arender_post(request, post):
+    """Renders a single post, its counters include the pending reaction changes like the listings"""
+    if settings.REACTION_COUNTER_BUFFER:
+        await sync_to_async(reaction_buffer.apply_pending)([post])
+    return await sync_to_async(render)(request, 'feed.html', {'page_obj': [post]})
+
+
+async def post_detail(request, post_id):
+    post = await Post.objects.select_related('author').filter(id=post_id).afirst()
+    if post is None:
+        raise Http404
+    return await _arender_post(request, post)
+
+
+async def random_post(request):
+    post = await aget_random_post()
 
     #edge case when there are no posts
-    if Post.objects.all().exists():
-        max_id = Post.objects.latest('id').id
-    else:
+    if post is None:
         return redirect_home()
 
-    random_id = randint(1,max_id)
-    random_post = Post.objects.filter(id=random_id)
-    #check in case of deleted items
-    while not random_post.exists() and random_id < max_id:
-        random_id += 1
-        random_post = Post.objects.filter(id=random_id)
-
-    return render(request, 'feed.html', {'page_obj': random_post})
+    return await _arender_post(request, post)
 
 
 
@@ -136,10 +212,11 @@ def change_password(request):
 
 
 @login_required
+@conditional_listing(per_user=True)
 def user_posts(request):
     user = request.user
-    posts = Post.objects.filter(author = user)
-    return _display_posts_paginated(request, posts)
+    posts = Post.objects.select_related('author').filter(author = user).order_by('-publish_date', '-id')
+    return _display_posts_paginated(request, posts, keyset=True)
 
 
 def register(request):
@@ -147,24 +224,18 @@ def register(request):
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
             
-            #send verification mail
             user_email = form.cleaned_data['email']
             verification_token = generate_signed_token(user_id=user_email, purpose="email_verify")
             verification_url = f"{request.build_absolute_uri('/posts/verify_user/')}{verification_token}/"
-            email_sent = send_mail(subject='Overenie registrácie - Urban Dictionary',
-                message=f'Pre overenie účtu kliknite na link: {verification_url}',
-                from_email=settings.EMAIL_HOST_USER,
-                auth_user=settings.EMAIL_HOST_USER,
-                auth_password=settings.EMAIL_HOST_PASSWORD,
-                recipient_list=[user_email],
-                fail_silently=False,
-            )
 
-            if email_sent:
+            # the verification mail is queued with the user, send_outbox delivers it
+            with transaction.atomic():
                 user = User.objects.filter(email=user_email).first()
-                # update the username for user that was created previously
+                # update the username for user that was created previously,
+                # it is registering again now (cleanup_unverified keeps it for the new link)
                 if user:
                     user.username = form.cleaned_data['username']
+                    user.date_joined = timezone.now()
                 # create inactive user
                 else:
                     user = form.save(commit=False)
@@ -172,9 +243,15 @@ def register(request):
 
                 user.set_password(form.cleaned_data['password'])
                 user.save()
-                    
-                messages.success(request, "Email pre overenie bol poslany.")
-                return redirect('login')
+
+                queue_mail(subject='Overenie registrácie - Urban Dictionary',
+                    message=f'Pre overenie účtu kliknite na link: {verification_url}',
+                    recipient_list=[user_email],
+                    expires_at=token_expires_at(),
+                )
+
+            messages.success(request, "Email pre overenie bol poslany.")
+            return redirect('login')
 
     elif request.method == "GET":
         form = UserRegistrationForm()
@@ -231,20 +308,13 @@ def _create_post_guest(request):
     if request.method == "POST":
         form = CreatePostFormGuest(request.POST)
         if form.is_valid():
-            #send verification mail
             guest_email =form.cleaned_data['email_for_verification']
             verification_token = generate_signed_token(user_id=guest_email, purpose="post_verify")
             verification_url = f"{request.build_absolute_uri('/posts/verify_post/')}{verification_token}/"
-            email_sent = send_mail(subject='Vytvorenie príspevku - Urban Dictionary',
-                message=f'Vytvorte príspevok kliknutím na link: {verification_url}',
-                from_email=settings.EMAIL_HOST_USER,
-                auth_user=settings.EMAIL_HOST_USER,
-                auth_password=settings.EMAIL_HOST_PASSWORD,
-                recipient_list=[guest_email],
-                fail_silently=False,
-            )
 
-            if email_sent:
+            # atomic operation to avoid race condition in case of multiple posts from the same email at the same time,
+            # the verification mail is queued with the post, send_outbox delivers it
+            with transaction.atomic():
                 #remove any unverified posts connected to the user email
                 user = User.objects.filter(email=guest_email).first()
                 if user:
@@ -255,23 +325,24 @@ def _create_post_guest(request):
                 #create inactive user with the mail and assigns temporary username, then generates automatic username from PK
                 # Anon_ is used to avoid conflict as this username cannot be created by user in normal flow
                 else:
-                    #atomic operation to avoid race condition in case of multiple posts from the same email at the same time
-                    with transaction.atomic():
-                        user = User.objects.create(username='Anon_', email=guest_email, is_active=False)
-                        user.username = f'Anon_{user.pk}'
-                        user.save()
+                    user = User.objects.create(username='Anon_', email=guest_email, is_active=False)
+                    user.username = f'Anon_{user.pk}'
+                    user.save()
 
                 #create a post (separate table from verified posts)
                 post = form.save(commit=False)
                 post.author = user          #connects the email to the post
                 post.save()
 
-                messages.success(request, "Email pre overenie bol poslaný.")
-                return redirect_home()
-            
-            else:
-                return HttpResponse("Nepodarilo sa poslat email pre overenie.", status=503)    
-    
+                queue_mail(subject='Vytvorenie príspevku - Urban Dictionary',
+                    message=f'Vytvorte príspevok kliknutím na link: {verification_url}',
+                    recipient_list=[guest_email],
+                    expires_at=token_expires_at(),
+                )
+
+            messages.success(request, "Email pre overenie bol poslaný.")
+            return redirect_home()
+
     elif request.method == "GET":
         form = CreatePostFormGuest()
     else:
@@ -316,80 +387,110 @@ def verify_post(request, token: str):
         return HttpResponseBadRequest("Neplatny odkaz")
 
 
-def search(request):
+@conditional_listing()
+async def search(request):
     if request.method == "GET":
         search_text = request.GET.get('search')
-        vector = SearchVector("post_title", "post_text", "post_example")
         query = SearchQuery(search_text)
+        #search_vector is stored and GIN indexed, the @@ filter uses the index and only matches are ranked
         search_results = Post.objects\
-            .annotate(rank=SearchRank(vector, query))\
-            .filter(rank__gt=0)\
-            .order_by("-rank")
-        return _display_posts_paginated(request, search_results)
+            .select_related("author")\
+            .filter(search_vector=query)\
+            .annotate(rank=SearchRank(models.F("search_vector"), query))\
+            .order_by("-rank", "-id")
+        return await _adisplay_posts_paginated(request, search_results, cache_as='search')
     else:
         return HttpResponseNotAllowed(['GET'])
 
+def autocomplete(request):
+    """
+    JSON typeahead, returns post titles matching the typed text (prefix or typo tolerant)
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid limit.')
+
+    return JsonResponse({'results': suggest_titles(request.GET.get('q', ''), limit)})
+
 @login_required(login_url='/posts/login/')
-def toggle_reaction(request, post_id):
+async def toggle_reaction(request, post_id):
     if request.method != 'POST':
         return HttpResponseNotAllowed(['POST'])
     
-    post = get_object_or_404(Post, id=post_id)
     try:
         payload = json.loads(request.body.decode("utf-8"))
     except json.JSONDecodeError:
         return HttpResponseBadRequest('Invalid JSON')
-    type = payload.get('type')     #like or dislike
-    if type not in (Reaction.ReactionType.LIKE, Reaction.ReactionType.DISLIKE):
+    type = Reaction.ReactionType.from_label(payload.get('type'))     #like or dislike
+    if type is None:
         return HttpResponseBadRequest('Invalid reaction type.')
+    if post_id > MAX_POST_ID:
+        raise Http404("Post does not exist")
     
-    with transaction.atomic():
-        # user reaction to the post already exists
-        try:
-            reaction = Reaction.objects.select_for_update().get(user=request.user, post=post)
-
-            # case for removing an existing reaction (e.g. clicking a like on liked post)
-            if reaction.type == type:
-                reaction.delete()
-                # update post reaction counter
-                if type == Reaction.ReactionType.LIKE:
-                    post.like_count -= 1
-                else:
-                    post.dislike_count -= 1
-                state = 'none'  # user has no reaction to the post
-            
-            # switching from like to dislike or vice versa case
-            else:
-                reaction.type = type
-                reaction.save(update_fields=['type'])
-                if type == Reaction.ReactionType.LIKE:
-                    post.like_count += 1
-                    post.dislike_count -= 1
-                else:
-                    post.dislike_count += 1
-                    post.like_count -= 1
-                state = type
-            
-        except Reaction.DoesNotExist:
-            Reaction.objects.create(user=request.user, post=post, type=type)
-            if type == Reaction.ReactionType.LIKE:
-                post.like_count += 1
-            else:
-                post.dislike_count += 1
-            state = type
-
-        finally:
-            post.save()
+    # reaction row and post counters are changed in one statement, see services.reactions
+    user = await request.auser()
+    result = await sync_to_async(reactions.toggle_reaction)(user.id, post_id, type)
+    if result is None:
+        raise Http404("Post does not exist")
+    state, likes, dislikes = result
 
-    post.refresh_from_db(fields=['like_count', 'dislike_count'])
     return JsonResponse({
         'state': state,     # 'like', 'dislike', 'none'
-        'likes': post.like_count,
-        'dislikes': post.dislike_count,
+        'likes': likes,
+        'dislikes': dislikes,
         'post_id': post_id
     })
 
 
+MAX_REACTION_BATCH = 100
+# Post ids are bigint, a larger id would fail in the database instead of matching no post
+MAX_POST_ID = 2 ** 63 - 1
+
+def _post_id(value):
+    post_id = int(value)
+    if not 0 < post_id <= MAX_POST_ID:
+        raise ValueError(f'Post id out of range: {value}')
+    return post_id
 
+def _parse_post_ids(raw):
+    try:
+        return [_post_id(post_id) for post_id in raw.split(',') if post_id]
+    except ValueError:
+        return None
+
+def reaction_states(request):
+    """
+    Reaction state and counters of several posts, e.g. /posts/reactions/?ids=1,2,3
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    post_ids = _parse_post_ids(request.GET.get('ids', ''))
+    if post_ids is None or len(post_ids) > MAX_REACTION_BATCH:
+        return HttpResponseBadRequest('Invalid post ids.')
+
+    return JsonResponse(reactions.get_reaction_states(request.user, post_ids))
+
+@login_required(login_url='/posts/login/')
+def toggle_reactions(request):
+    """
+    Applies queued reaction clicks in one transaction
+    body: {"reactions": [{"post_id": 1, "type": "like"}, ...]}, clicks on deleted posts are skipped
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        payload = json.loads(request.body.decode("utf-8"))
+        clicks = [(_post_id(click['post_id']), Reaction.ReactionType.from_label(click['type']))
+                  for click in payload['reactions']]
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError, OverflowError):
+        return HttpResponseBadRequest('Invalid JSON')
+    if not clicks or len(clicks) > MAX_REACTION_BATCH or any(type is None for _, type in clicks):
+        return HttpResponseBadRequest('Invalid reactions.')
 
-    
\ No newline at end of file
+    return JsonResponse(reactions.toggle_reactions(request.user.id, clicks))
@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.sites',
     'django.contrib.sitemaps',
+    'rest_framework',
 ]
 
 MIDDLEWARE = [
@@ -82,6 +83,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.post_cards',
             ],
         },
     },
@@ -117,6 +119,59 @@ else:
         }
     }
 
+# Connection pool (psycopg 3), one pool per worker process shared by its threads.
+# DB_POOL=True, DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE are per process, DB_POOL_TIMEOUT is how
+# long (seconds) a request waits for a free connection. Without the pool DB_CONN_MAX_AGE
+# keeps a connection per thread open between requests (seconds, 0 connects on every
+# request), not suitable for the ASGI worker which runs the queries in many threads.
+# DB_SERVER_SIDE_BINDING=True sends the parameters separately from the query and prepares
+# queries repeated DB_PREPARE_THRESHOLD times on a connection, not usable behind pgbouncer
+# in transaction mode.
+if config.get("DB_POOL", "False") == "True":
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(config.get("DB_POOL_MIN_SIZE", "2")),
+            'max_size': int(config.get("DB_POOL_MAX_SIZE", "10")),
+            'timeout': float(config.get("DB_POOL_TIMEOUT", "10")),
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(config.get("DB_CONN_MAX_AGE", "0"))
+# checks pooled connections before they are handed out, persistent ones before reuse
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+if config.get("DB_SERVER_SIDE_BINDING", "False") == "True":
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'server_side_binding': True,
+        'prepare_threshold': int(config.get("DB_PREPARE_THRESHOLD", "5")),
+    })
+
+
+# Caches
+# default lives in process memory (L1), shared is seen by every worker and management
+# command (L2, a table created by python manage.py createcachetable). Data that has to be
+# the same in all workers goes through posts.services.tiered_cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': config.get("SHARED_CACHE_BACKEND", 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config.get("SHARED_CACHE_LOCATION", 'cache_table'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+
+# JSON API (posts/api.py), read only and anonymous: no session or user is loaded
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'UNAUTHENTICATED_USER': None,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -158,13 +213,41 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic writes content hashed names (nginx caches /static/ as immutable) with .gz and .br
+# siblings for gzip_static, python manage.py check_static_references verifies the templates
+# against the manifest afterwards. STATIC_MANIFEST=False (the default with DEBUG) keeps the
+# plain names, served without running collectstatic.
+STATIC_MANIFEST = config.get("STATIC_MANIFEST", str(not DEBUG)) == "True"
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'posts.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+                   else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Reactions
+# True records reactions immediately but writes Post like/dislike counters in batches
+# (python manage.py flush_reaction_counters --loop), use when single posts get hot
+REACTION_COUNTER_BUFFER = config.get("REACTION_COUNTER_BUFFER", "False") == "True"
+
+# Spam patterns
+# Hard time limit of the spam check of one post. When it runs out the post is rejected
+# with SPAM_CHECK_FAIL_CLOSED=True and let through otherwise (python manage.py spam_pattern_stats)
+SPAM_CHECK_TIMEOUT_MS = int(config.get("SPAM_CHECK_TIMEOUT_MS", "200"))
+SPAM_CHECK_FAIL_CLOSED = config.get("SPAM_CHECK_FAIL_CLOSED", "False") == "True"
+
 #email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# emails are queued in OutboxEmail and sent by python manage.py send_outbox --loop,
+# django.core.mail.backends.console.EmailBackend prints them instead (development)
+EMAIL_BACKEND = config.get("EMAIL_BACKEND", 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config['EMAIL_HOST']
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
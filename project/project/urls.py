@@ -19,13 +19,18 @@ from django.urls import include,path
 from project.settings import ADMIN_PATH
 from django.contrib.sitemaps.views import sitemap
 
+from posts import sitemaps as posts_sitemaps
 from posts.sitemaps import sitemaps
 
 urlpatterns = [
     path("posts/", include("posts.urls")),
+    path("api/v1/", include("posts.api_urls")),
     path(ADMIN_PATH, admin.site.urls),
+    path("sitemap.xml", posts_sitemaps.index, name="sitemap_index"),
+    # before the sections, <section> would match posts-<chunk> too
+    path("sitemap-posts-<int:chunk>.xml", posts_sitemaps.posts, name="sitemap_posts"),
     path(
-    "sitemap.xml",
+    "sitemap-<section>.xml",
     sitemap,
     {"sitemaps": sitemaps},
     name="django.contrib.sitemaps.views.sitemap",
@@ -5,6 +5,11 @@ T="${RESPONSE_TIMEOUT:-30}"
 
 uv run python manage.py migrate
 
+uv run python manage.py createcachetable
+
 uv run python manage.py collectstatic --noinput
 
-exec uv run gunicorn project.wsgi:application --keep-alive $T --timeout $T --graceful-timeout $T --bind 0.0.0.0:8000
+# every template must link a hashed file, an unhashed name would stay cached for a year
+uv run python manage.py check_static_references || exit 1
+
+exec uv run gunicorn project.asgi:application -k uvicorn_worker.UvicornWorker --keep-alive $T --timeout $T --graceful-timeout $T --bind 0.0.0.0:8000
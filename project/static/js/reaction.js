@@ -6,6 +6,78 @@ function getCookie(name) {
 }
 const csrftoken = getCookie('csrftoken');
 
+// clicks made while offline are kept here and sent in one request when the connection is back
+const QUEUE_KEY = 'pendingReactions';
+
+function loadQueue() {
+    try {
+        return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+    } catch (err) {
+        return [];
+    }
+}
+
+function applyState(postId, data) {
+    const article = document.querySelector(`article.post-card[data-post-id="${postId}"]`);
+    if (!article) return;
+    article.querySelector('.like-button').setAttribute('aria-pressed', data.state === 'like' ? 'true' : 'false');
+    article.querySelector('.dislike-button').setAttribute('aria-pressed', data.state === 'dislike' ? 'true' : 'false');
+    article.querySelector('.like-count').textContent = data.likes;
+    article.querySelector('.dislike-count').textContent = data.dislikes;
+}
+
+async function flushQueue() {
+    const queue = loadQueue();
+    if (!queue.length || !navigator.onLine) return;
+    try {
+        const resp = await fetch('/posts/reactions/batch/', {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': csrftoken,
+                'X-Requested-With': 'XMLHttpRequest',
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ reactions: queue })
+        });
+        if (resp.redirected || resp.status === 400) {
+            // logged out in the meantime or clicks no longer valid, nothing to retry
+            localStorage.removeItem(QUEUE_KEY);
+            return;
+        }
+        if (!resp.ok) return;
+        localStorage.removeItem(QUEUE_KEY);
+        const results = await resp.json();
+        for (const [postId, data] of Object.entries(results)) {
+            applyState(postId, data);
+        }
+    } catch (err) {
+        console.error(err);
+    }
+}
+
+// the listing HTML is shared by all visitors, fill in the logged in user's reactions
+async function loadReactionStates() {
+    const overlay = document.getElementById('reaction-overlay');
+    if (!overlay) return;
+    const ids = [...document.querySelectorAll('article.post-card')].map((article) => article.dataset.postId);
+    if (!ids.length) return;
+    try {
+        const resp = await fetch(`${overlay.dataset.url}?ids=${ids.join(',')}`);
+        if (!resp.ok) return;
+        const states = await resp.json();
+        for (const [postId, data] of Object.entries(states)) {
+            applyState(postId, data);
+        }
+    } catch (err) {
+        console.error(err);
+    }
+}
+
+window.addEventListener('online', flushQueue);
+document.addEventListener('DOMContentLoaded', () => {
+    flushQueue().then(loadReactionStates);
+});
+
 document.addEventListener('click', async (e) => {
     const btn = e.target.closest('.reaction-button');
     if (!btn) return;
@@ -61,7 +133,13 @@ document.addEventListener('click', async (e) => {
     }   
     catch (err) {
         console.error(err);
-        alert('Network error.');
+        if (!navigator.onLine) {
+            const queue = loadQueue();
+            queue.push({ post_id: Number(postId), type });
+            localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+        } else {
+            alert('Network error.');
+        }
     }   
     finally {
         btn.disabled = false;
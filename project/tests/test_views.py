@@ -1,13 +1,14 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.core import mail
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.messages import get_messages
+from django.contrib.postgres.search import SearchQuery
 from unittest.mock import patch, MagicMock
 import json
 
-from posts.models import BlockedEmailDomain, Post, PostUnverified, User, SpamRegEx
+from posts.models import BlockedEmailDomain, Post, PostUnverified, Reaction, User, SpamRegEx
 from posts.forms import UserLoginForm, UserRegistrationForm, CreatePostForm, CreatePostFormGuest
 
 from posts.services.verification import generate_signed_token, verify_signed_token
@@ -69,6 +70,61 @@ class PostViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.context['page_obj'].has_previous())
 
+    def test_feed_view_cursor_pagination(self):
+        """Test feed pages can be walked forward and back with cursor tokens"""
+        for i in range(15):
+            Post.objects.create(
+                post_title=f'Post {i}',
+                post_text=f'Content {i}',
+                post_example=f'Example {i}',
+                author=self.user,
+                publish_date=timezone.now()
+            )
+        first = self.client.get('/posts/').context['page_obj']
+        self.assertEqual(first.number, 1)
+        self.assertEqual(first.paginator.num_pages, 2)
+        self.assertTrue(first.has_next())
+
+        second = self.client.get(f'/posts/?cursor={first.next_cursor}').context['page_obj']
+        self.assertEqual(second.number, 2)
+        self.assertFalse(second.has_next())
+        self.assertEqual(len(second), 7)
+        self.assertFalse({p.id for p in first} & {p.id for p in second})
+
+        back = self.client.get(f'/posts/?cursor={second.previous_cursor}').context['page_obj']
+        self.assertEqual([p.id for p in back], [p.id for p in first])
+        self.assertFalse(back.has_previous())
+
+        last = self.client.get(f'/posts/?cursor={first.last_cursor}').context['page_obj']
+        self.assertEqual([p.id for p in last], [p.id for p in second])
+
+    def test_feed_view_invalid_cursor(self):
+        """Test an invalid cursor falls back to the first page"""
+        response = self.client.get('/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_feed_view_tampered_cursor(self):
+        """Test cursors with values the keys cannot hold fall back to the first page"""
+        from posts.services.pagination import encode_cursor
+        for values in (['not-a-date', 1], [{'a': 1}, 1], [None, 1], [timezone.now(), 10 ** 20]):
+            with self.subTest(values=values):
+                response = self.client.get('/posts/', {'cursor': encode_cursor('next', values, 2)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
+        response = self.client.get('/posts/hot/', {'cursor': encode_cursor('next', ['hot', 1], 2)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_view_cursor_skips_count_query(self):
+        """Test cursor pages do not use OFFSET"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        first = self.client.get('/posts/').context['page_obj']
+        cursor = first.last_cursor
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/posts/?cursor={cursor}')
+        self.assertFalse(any('OFFSET' in q['sql'] for q in ctx.captured_queries))
+
     def test_random_post_view_with_posts(self):
         """Test random post view when posts exist"""
         response = self.client.get('/posts/random_post/')
@@ -175,10 +231,10 @@ class PostViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('form', response.context)
 
-    @patch('posts.views.send_mail')
-    def test_register_view_post_valid_new_user(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_register_view_post_valid_new_user(self, mock_queue_mail):
         """Test register view with valid data for new user"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         response = self.client.post('/posts/register/', {
             'username': 'newuser',
@@ -191,12 +247,12 @@ class PostViewsTestCase(TestCase):
         self.assertTrue(User.objects.filter(username='newuser').exists())
         user = User.objects.get(username='newuser')
         self.assertFalse(user.is_active)
-        mock_send_mail.assert_called_once()
+        mock_queue_mail.assert_called_once()
 
-    @patch('posts.views.send_mail')
-    def test_register_view_post_invalid_email(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_register_view_post_invalid_email(self, mock_queue_mail):
         BlockedEmailDomain.objects.create(domain='invalid.com')
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         response = self.client.post('/posts/register/', {
             'username': 'not_existing_user',
@@ -208,7 +264,7 @@ class PostViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Nepovolený email")
         self.assertFalse(User.objects.filter(username='newuser').exists())
-        mock_send_mail.assert_not_called()
+        mock_queue_mail.assert_not_called()
 
     def test_verify_user_valid_token(self):
         """Test user verification with valid token"""
@@ -250,10 +306,10 @@ class PostViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.context['form'], CreatePostFormGuest)
 
-    @patch('posts.views.send_mail')
-    def test_create_post_guest_post_valid(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_create_post_guest_post_valid(self, mock_queue_mail):
         """Test create post POST request for guest user"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         response = self.client.post('/posts/create_post/', {
             'post_title': 'Guest Post',
@@ -264,12 +320,12 @@ class PostViewsTestCase(TestCase):
         
         self.assertRedirects(response, '/posts/?page=1')
         self.assertTrue(PostUnverified.objects.filter(post_title='Guest Post').exists())
-        mock_send_mail.assert_called_once()
+        mock_queue_mail.assert_called_once()
 
-    @patch('posts.views.send_mail')
-    def test_create_post_guest_post_invalid_email(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_create_post_guest_post_invalid_email(self, mock_queue_mail):
         BlockedEmailDomain.objects.create(domain='invalid.com')
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         response = self.client.post('/posts/create_post/', {
             'post_title': 'Guest Post',
             'post_text': 'Guest content',
@@ -279,12 +335,12 @@ class PostViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Nepovolený email')
         self.assertFalse(PostUnverified.objects.filter(post_title='Guest Post').exists())
-        mock_send_mail.assert_not_called()
+        mock_queue_mail.assert_not_called()
 
-    @patch('posts.views.send_mail')
-    def test_create_post_guest_post_valid_email(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_create_post_guest_post_valid_email(self, mock_queue_mail):
         BlockedEmailDomain.objects.create(domain='invalid.com')
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         response = self.client.post('/posts/create_post/', {
             'post_title': 'Guest Post',
             'post_text': 'Guest content',
@@ -293,7 +349,7 @@ class PostViewsTestCase(TestCase):
         })
         self.assertRedirects(response, '/posts/?page=1')
         self.assertTrue(PostUnverified.objects.filter(post_title='Guest Post').exists())
-        mock_send_mail.assert_called()
+        mock_queue_mail.assert_called()
 
 
     def test_verify_post_valid_token(self):
@@ -317,6 +373,25 @@ class PostViewsTestCase(TestCase):
         
         self.assertTrue(Post.objects.filter(post_title='Unverified Post').exists())
 
+    def test_verify_post_indexes_search_vector(self):
+        """Test posts copied by verify_post are searchable"""
+        guest_user = User.objects.create(
+            username='guest_user',
+            email='guest@example.com',
+            is_active=False
+        )
+        PostUnverified.objects.create(
+            post_title='Unverified Post',
+            post_text='Unverified content',
+            post_example='Unverified example',
+            author=guest_user,
+        )
+        token = generate_signed_token(user_id=guest_user.email, purpose="post_verify")
+        self.client.get(f'/posts/verify_post/{token}/')
+
+        response = self.client.get('/posts/search/?search=Unverified')
+        self.assertContains(response, 'Unverified Post')
+
     def test_verify_post_invalid_token(self):
         """Test post verification with invalid token"""
         response = self.client.get('/posts/verify_post/invalid-token/')
@@ -339,6 +414,42 @@ class PostViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         # Note: This test might need adjustment based on your search implementation
 
+    def test_search_view_ranks_title_above_example(self):
+        """Test title matches rank above example matches"""
+        Post.objects.create(
+            post_title='Other',
+            post_text='Content',
+            post_example='brutal in example',
+            author=self.user,
+            publish_date=timezone.now()
+        )
+        Post.objects.create(
+            post_title='brutal',
+            post_text='Content',
+            post_example='Example',
+            author=self.user,
+            publish_date=timezone.now()
+        )
+        response = self.client.get('/posts/search/?search=brutal')
+        titles = [p.post_title for p in response.context['page_obj']]
+        self.assertEqual(titles, ['brutal', 'Other'])
+
+    def test_search_vector_updated_on_edit(self):
+        """Test the stored search vector follows edits of the post"""
+        self.post1.post_title = 'renamed'
+        self.post1.save()
+        self.assertTrue(Post.objects.filter(search_vector=SearchQuery('renamed')).exists())
+
+    def test_backfill_search_vector_command(self):
+        """Test backfill command fills empty search vectors"""
+        from django.core.management import call_command
+        from io import StringIO
+        Post.objects.update(search_vector=None, title_normalized=None)
+        call_command('backfill_search_vector', '--batch-size', '1', stdout=StringIO())
+        self.assertFalse(Post.objects.filter(search_vector__isnull=True).exists())
+        self.assertEqual(Post.objects.get(id=self.post1.id).title_normalized, 'test post 1')
+        self.assertTrue(Post.objects.filter(search_vector=SearchQuery('Test')).exists())
+
     def test_redirect_home_function(self):
         """Test redirect_home helper function"""
         from posts.views import redirect_home
@@ -377,6 +488,12 @@ class PostViewsTestCase(TestCase):
             content_type='application/json'
         )
         self.assertEqual(response.status_code, 404)
+        response = self.client.post(
+            '/posts/99999999999999999999/react/',
+            data=json.dumps({'type': 'like'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
 
     def test_toggle_reaction_view_invalid_reaction_type(self):
         """Test toggle reaction view with invalid reaction type"""
@@ -415,6 +532,96 @@ class PostViewsTestCase(TestCase):
         self.assertEqual(data['dislikes'], 1)
 
 
+    def test_toggle_reaction_view_switch_and_remove(self):
+        """Test switching like to dislike and clicking the same reaction again"""
+        self.client.login(username='testuser', password='testpass123')
+        url = f'/posts/{self.post1.id}/react/'
+        self.client.post(url, data=json.dumps({'type': 'like'}), content_type='application/json')
+
+        data = self.client.post(url, data=json.dumps({'type': 'dislike'}), content_type='application/json').json()
+        self.assertEqual((data['state'], data['likes'], data['dislikes']), ('dislike', 0, 1))
+        self.assertEqual(Reaction.objects.get(user=self.user, post=self.post1).type, Reaction.ReactionType.DISLIKE)
+
+        data = self.client.post(url, data=json.dumps({'type': 'dislike'}), content_type='application/json').json()
+        self.assertEqual((data['state'], data['likes'], data['dislikes']), ('none', 0, 0))
+        self.assertFalse(Reaction.objects.filter(user=self.user, post=self.post1).exists())
+
+    def test_toggle_reaction_single_statement(self):
+        """Test the toggle is one database round trip and does not touch other columns"""
+        from posts.services.reactions import toggle_reaction
+        Post.objects.filter(id=self.post1.id).update(like_count=5)
+        with self.assertNumQueries(1):
+            state, likes, dislikes = toggle_reaction(self.inactive_user.id, self.post1.id, Reaction.ReactionType.LIKE)
+        self.assertEqual((state, likes, dislikes), ('like', 6, 0))
+        self.assertEqual(Post.objects.get(id=self.post1.id).post_title, 'Test Post 1')
+        self.assertIsNone(toggle_reaction(self.user.id, 9999, Reaction.ReactionType.LIKE))
+        self.assertFalse(Reaction.objects.filter(post_id=9999).exists())
+
+    def test_reaction_unique_per_user_and_post(self):
+        """Test the database rejects a second reaction of the same user to the same post"""
+        from django.db import IntegrityError
+        Reaction.objects.create(user=self.user, post=self.post1, type=Reaction.ReactionType.LIKE)
+        with self.assertRaises(IntegrityError):
+            Reaction.objects.create(user=self.user, post=self.post1, type=Reaction.ReactionType.DISLIKE)
+
+    def test_feed_leaves_user_reaction_to_client(self):
+        """Test the feed renders no user specific state and points the script to reaction_states"""
+        Reaction.objects.create(user=self.user, post=self.post1, type=Reaction.ReactionType.DISLIKE)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get('/posts/')
+        self.assertNotContains(response, 'aria-pressed="true"')
+        self.assertContains(response, 'id="reaction-overlay" data-url="/posts/reactions/"')
+
+    def test_reaction_states_view(self):
+        """Test bulk reaction states for anonymous and logged in users"""
+        Reaction.objects.create(user=self.user, post=self.post1, type=Reaction.ReactionType.LIKE)
+        Post.objects.filter(id=self.post1.id).update(like_count=1)
+        url = f'/posts/reactions/?ids={self.post1.id},{self.post2.id},9999'
+
+        with self.assertNumQueries(1):
+            data = self.client.get(url).json()
+        self.assertEqual(data[str(self.post1.id)], {'state': 'none', 'likes': 1, 'dislikes': 0})
+        self.assertNotIn('9999', data)
+
+        self.client.login(username='testuser', password='testpass123')
+        data = self.client.get(url).json()
+        self.assertEqual(data[str(self.post1.id)]['state'], 'like')
+        self.assertEqual(data[str(self.post2.id)]['state'], 'none')
+
+    def test_reaction_states_view_invalid(self):
+        """Test bulk reaction states rejects bad ids"""
+        self.assertEqual(self.client.get('/posts/reactions/?ids=1,x').status_code, 400)
+        self.assertEqual(self.client.get('/posts/reactions/?ids=1,99999999999999999999').status_code, 400)
+        self.assertEqual(self.client.post('/posts/reactions/?ids=1').status_code, 405)
+
+    def test_toggle_reactions_batch(self):
+        """Test queued clicks are applied in order in one request"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post('/posts/reactions/batch/', data=json.dumps({'reactions': [
+            {'post_id': self.post1.id, 'type': 'like'},
+            {'post_id': self.post2.id, 'type': 'like'},
+            {'post_id': self.post1.id, 'type': 'dislike'},
+            {'post_id': 9999, 'type': 'like'},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data[str(self.post1.id)], {'state': 'dislike', 'likes': 0, 'dislikes': 1})
+        self.assertEqual(data[str(self.post2.id)], {'state': 'like', 'likes': 1, 'dislikes': 0})
+        self.assertNotIn('9999', data)
+        self.assertEqual(Reaction.objects.filter(user=self.user).count(), 2)
+
+    def test_toggle_reactions_batch_invalid(self):
+        """Test the batch is rejected as a whole when a click is invalid"""
+        self.client.login(username='testuser', password='testpass123')
+        for body in ('not json', json.dumps({'reactions': []}),
+                     json.dumps({'reactions': [{'post_id': self.post1.id, 'type': 'love'}]}),
+                     '{"reactions": [{"post_id": 99999999999999999999, "type": "like"}]}',
+                     '{"reactions": [{"post_id": 1e400, "type": "like"}]}'):
+            response = self.client.post('/posts/reactions/batch/', data=body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/posts/reactions/batch/').status_code, 405)
+        self.assertFalse(Reaction.objects.exists())
+
 class EdgeCaseTestCase(TestCase):
     """Test edge cases and error conditions"""
     
@@ -450,20 +657,137 @@ class EdgeCaseTestCase(TestCase):
         response = self.client.get('/posts/random_post/')
         self.assertEqual(response.status_code, 200)
 
-    @patch('posts.views.send_mail')
-    def test_register_email_send_failure(self, mock_send_mail):
-        """Test registration when email sending fails"""
-        mock_send_mail.return_value = False
-        
+    def test_random_post_query_budget(self):
+        """Test random post costs a single query on a warm cache, however sparse the ids are"""
+        from posts.services import random_post
+        from posts.services.random_post import get_random_post
+        random_post._cache.clear_local()
+        posts = [
+            Post.objects.create(
+                post_title=f'Post {i}',
+                post_text=f'Content {i}',
+                post_example=f'Example {i}',
+                author=self.user,
+                publish_date=timezone.now()
+            )
+            for i in range(100)
+        ]
+        for post in posts[:-1]:
+            post.delete()
+
+        get_random_post()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_random_post(), posts[-1])
+
+    def test_random_post_distribution(self):
+        """Test random post picks every post about equally often, regardless of gaps before it"""
+        from collections import Counter
+        from posts.services import random_post
+        from posts.services.random_post import get_random_post, get_post_ids
+        random_post._cache.clear_local()
+        posts = []
+        for i in range(20):
+            post = Post.objects.create(
+                post_title=f'Post {i}',
+                post_text=f'Content {i}',
+                post_example=f'Example {i}',
+                author=self.user,
+                publish_date=timezone.now()
+            )
+            posts.append(post)
+        # leave a large gap in front of the last post
+        for post in posts[3:-1]:
+            post.delete()
+        survivors = {posts[0].id, posts[1].id, posts[2].id, posts[-1].id}
+        self.assertEqual(set(get_post_ids()), survivors)
+
+        counts = Counter(get_random_post().id for _ in range(2000))
+        self.assertEqual(set(counts), survivors)
+        for count in counts.values():
+            self.assertAlmostEqual(count / 2000, 0.25, delta=0.06)
+
+    def test_random_post_stale_cache(self):
+        """Test ids deleted behind the cache's back are refreshed"""
+        from django.db import connection
+        from posts.services import random_post
+        from posts.services.random_post import get_random_post, get_post_ids
+        random_post._cache.clear_local()
+        post1 = Post.objects.create(
+            post_title='Post 1',
+            post_text='Content 1',
+            post_example='Example 1',
+            author=self.user,
+            publish_date=timezone.now()
+        )
+        self.assertEqual(list(get_post_ids()), [post1.id])
+        # a raw delete sends no post_delete signal
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM posts_post WHERE id = %s", [post1.id])
+        self.assertIsNone(get_random_post())
+        self.assertEqual(list(get_post_ids()), [])
+
+    def test_random_post_ids_reach_other_workers(self):
+        """Test a post created in one worker is offered by another within the generation check interval"""
+        from posts.services.random_post import get_post_ids
+        from posts.services.tiered_cache import TieredCache
+        post1 = Post.objects.create(post_title='Post 1', post_text='Content 1', post_example='Example 1',
+                                    author=self.user, publish_date=timezone.now())
+        worker2 = TieredCache("post_ids", check_interval=0)
+        with patch('posts.services.random_post._cache', worker2):
+            self.assertEqual(list(get_post_ids()), [post1.id])
+        # created in this worker, whose signal handler bumps the generation
+        post2 = Post.objects.create(post_title='Post 2', post_text='Content 2', post_example='Example 2',
+                                    author=self.user, publish_date=timezone.now())
+        with patch('posts.services.random_post._cache', worker2):
+            self.assertEqual(list(get_post_ids()), [post1.id, post2.id])
+
+    def test_register_email_send_failure(self):
+        """Test registration does not depend on the SMTP server, failed emails are retried later"""
+        from smtplib import SMTPException
+        from posts.models import OutboxEmail
+        from posts.services.outbox import send_pending
+
         response = self.client.post('/posts/register/', {
             'username': 'newuser',
             'email': 'newuser@example.com',
             'password': 'newpass123',
             'confirm_password': 'newpass123'
         })
-        
-        # Should still render the form since email failed
-        self.assertEqual(response.status_code, 200)
+        self.assertRedirects(response, reverse('login'))
+        self.assertTrue(User.objects.filter(username='newuser', is_active=False).exists())
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException('down')):
+            self.assertEqual(send_pending(), (0, 1))
+        email = OutboxEmail.objects.get(recipient='newuser@example.com')
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('down', email.last_error)
+        self.assertIsNone(email.sent_at)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        # not due yet
+        self.assertEqual(send_pending(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_expired_verification_email_not_sent(self):
+        """Test a verification email still unsent when its link expires is given up instead of retried"""
+        from posts.models import OutboxEmail
+        from posts.services.outbox import EXPIRED_ERROR, MAX_ATTEMPTS, send_pending
+        from posts.services.verification import TOKEN_MAX_AGE
+
+        self.client.post('/posts/register/', {
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'password': 'newpass123',
+            'confirm_password': 'newpass123'
+        })
+        email = OutboxEmail.objects.get(recipient='newuser@example.com')
+        self.assertAlmostEqual((email.expires_at - email.created_at).total_seconds(), TOKEN_MAX_AGE, delta=5)
+
+        OutboxEmail.objects.filter(id=email.id).update(expires_at=timezone.now())
+        self.assertEqual(send_pending(), (0, 1))
+        self.assertEqual(len(mail.outbox), 0)
+        email.refresh_from_db()
+        self.assertEqual((email.attempts, email.last_error), (MAX_ATTEMPTS, EXPIRED_ERROR))
+        self.assertEqual(send_pending(), (0, 0))
 
     def test_login_invalid_form_data(self):
         """Test login with invalid form data"""
@@ -474,10 +798,10 @@ class EdgeCaseTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'This field is required.')
 
-    @patch('posts.views.send_mail')
-    def test_register_existing_user(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_register_existing_user(self, mock_queue_mail):
         """Test registration for user that already exists"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         User.objects.create_user(
             username='existinguser',
@@ -492,13 +816,13 @@ class EdgeCaseTestCase(TestCase):
         })
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Tento email je už použitý.')
-        mock_send_mail.assert_not_called()
+        mock_queue_mail.assert_not_called()
 
     #test creating unverified post with email used by existing user
-    @patch('posts.views.send_mail')
-    def test_create_post_guest_email_used_by_registered_user(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_create_post_guest_email_used_by_registered_user(self, mock_queue_mail):
         """Test creating guest post with email that belongs to existing user"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         response = self.client.post('/posts/create_post/', {
             'post_title': 'Guest Post',
@@ -509,12 +833,12 @@ class EdgeCaseTestCase(TestCase):
         self.assertRedirects(response, '/posts/?page=1')
         # check that post is unverified
         self.assertTrue(PostUnverified.objects.filter(post_title='Guest Post').exists())
-        mock_send_mail.assert_called_once()
+        mock_queue_mail.assert_called_once()
 
-    @patch('posts.views.send_mail')
-    def test_verify_post_expired_token(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_verify_post_expired_token(self, mock_queue_mail):
         """Test post verification with expired token"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         response = self.client.post('/posts/create_post/', {
             'post_title': 'Guest Post',
@@ -525,8 +849,8 @@ class EdgeCaseTestCase(TestCase):
         self.assertRedirects(response, '/posts/?page=1')
         # check that post is unverified
         self.assertTrue(PostUnverified.objects.filter(post_title='Guest Post').exists())
-        mock_send_mail.assert_called_once()
-        token = mock_send_mail.call_args[1]['message'].split('verify_post/')[1].split('/')[0]
+        mock_queue_mail.assert_called_once()
+        token = mock_queue_mail.call_args[1]['message'].split('verify_post/')[1].split('/')[0]
 
         # Simulate token expiration by mocking time.time to return a time in the future
         with patch('time.time', return_value=timezone.now().timestamp() + 601):
@@ -536,10 +860,10 @@ class EdgeCaseTestCase(TestCase):
         #check that response contains "Token expired" message even if its 400 status
         self.assertIn("Token expired", response.content.decode())
 
-    @patch('posts.views.send_mail')
-    def test_verify_user_expired_token(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_verify_user_expired_token(self, mock_queue_mail):
         """Test user verification with expired token"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
 
         response = self.client.post('/posts/register/', {
             'username': 'newuser',
@@ -548,8 +872,8 @@ class EdgeCaseTestCase(TestCase):
             'confirm_password': 'newpass123'
         })
         self.assertRedirects(response, reverse('login'))
-        mock_send_mail.assert_called_once()
-        token = mock_send_mail.call_args[1]['message'].split('verify_user/')[1].split('/')[0]
+        mock_queue_mail.assert_called_once()
+        token = mock_queue_mail.call_args[1]['message'].split('verify_user/')[1].split('/')[0]
 
         # Simulate token expiration by mocking time.time to return a time in the future
         with patch('time.time', return_value=timezone.now().timestamp() + 601):
@@ -568,10 +892,10 @@ class IntegrationTestCase(TestCase):
     def setUp(self):
         self.client = Client()
 
-    @patch('posts.views.send_mail')
-    def test_complete_user_registration_flow(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_complete_user_registration_flow(self, mock_queue_mail):
         """Test complete user registration and verification flow"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         # Register user
         response = self.client.post('/posts/register/', {
@@ -583,8 +907,8 @@ class IntegrationTestCase(TestCase):
         self.assertRedirects(response, reverse('login'))
         self.assertTrue(User.objects.filter(username='newuser').exists())
         self.assertFalse(User.objects.get(username='newuser').is_active)
-        mock_send_mail.assert_called_once()
-        token = mock_send_mail.call_args[1]['message'].split('verify_user/')[1].split('/')[0]
+        mock_queue_mail.assert_called_once()
+        token = mock_queue_mail.call_args[1]['message'].split('verify_user/')[1].split('/')[0]
         
         response = self.client.get(f'/posts/verify_user/{token}/')
         self.assertRedirects(response, reverse('login'))
@@ -596,10 +920,37 @@ class IntegrationTestCase(TestCase):
         })
         self.assertRedirects(response, '/posts/?page=1')
 
-    @patch('posts.views.send_mail')
-    def test_complete_guest_post_flow(self, mock_send_mail):
+    def test_guest_post_flow_through_outbox(self):
+        """Test the verification mail of a guest post is delivered by send_outbox"""
+        from io import StringIO
+        from django.core.management import call_command
+        from posts.models import OutboxEmail
+
+        response = self.client.post('/posts/create_post/', {
+            'post_title': 'Outbox Post',
+            'post_text': 'Guest content',
+            'post_example': 'Guest example',
+            'email_for_verification': 'outbox@example.com'
+        })
+        self.assertRedirects(response, '/posts/?page=1')
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['outbox@example.com'])
+        self.assertIsNotNone(OutboxEmail.objects.get(recipient='outbox@example.com').sent_at)
+        # sent emails are not sent again
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+        token = mail.outbox[0].body.split('verify_post/')[1].split('/')[0]
+        self.client.get(f'/posts/verify_post/{token}/')
+        self.assertTrue(Post.objects.filter(post_title='Outbox Post').exists())
+
+    @patch('posts.views.queue_mail')
+    def test_complete_guest_post_flow(self, mock_queue_mail):
         """Test complete guest post creation and verification flow"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         # Create post as guest
         response = self.client.post('/posts/create_post/', {
@@ -610,8 +961,8 @@ class IntegrationTestCase(TestCase):
         })
         self.assertRedirects(response, '/posts/?page=1')
         self.assertTrue(PostUnverified.objects.filter(post_title='Guest Post').exists())
-        mock_send_mail.assert_called_once()
-        token = mock_send_mail.call_args[1]['message'].split('verify_post/')[1].split('/')[0]
+        mock_queue_mail.assert_called_once()
+        token = mock_queue_mail.call_args[1]['message'].split('verify_post/')[1].split('/')[0]
         
         response = self.client.get(f'/posts/verify_post/{token}/')
         self.assertRedirects(response, '/posts/?page=1')
@@ -620,8 +971,8 @@ class IntegrationTestCase(TestCase):
         self.assertTrue(Post.objects.filter(post_title='Guest Post').exists())
         self.assertFalse(PostUnverified.objects.filter(post_title='Guest Post').exists())
 
-    @patch('posts.views.send_mail')
-    def test_create_user_with_email_used_by_unverified_user(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_create_user_with_email_used_by_unverified_user(self, mock_queue_mail):
         "Test creating a user with email that belongs to unverified guest user and then verifying the email"
 
         #create guest post
@@ -636,7 +987,7 @@ class IntegrationTestCase(TestCase):
         self.assertRedirects(response, '/posts/?page=1')
         post = PostUnverified.objects.filter(author__email='notused@example.com').first()
         self.assertIsNotNone(post)
-        mock_send_mail.assert_called_once()
+        mock_queue_mail.assert_called_once()
 
         #check that anon user exists
         unverified_user = User.objects.filter(email='notused@example.com').first()
@@ -656,7 +1007,7 @@ class IntegrationTestCase(TestCase):
         unverified_user.refresh_from_db()
         self.assertEqual(unverified_user.username, 'newuser')
 
-        token = mock_send_mail.call_args[1]['message'].split('verify_user/')[1].split('/')[0]
+        token = mock_queue_mail.call_args[1]['message'].split('verify_user/')[1].split('/')[0]
 
         response = self.client.get(f'/posts/verify_user/{token}/')
         self.assertRedirects(response, reverse('login'))
@@ -669,10 +1020,10 @@ class IntegrationTestCase(TestCase):
         post.refresh_from_db()
         self.assertEqual(post.author, unverified_user)
 
-    @patch('posts.views.send_mail')
-    def test_create_post_guest_email_used_by_unverified_user(self, mock_send_mail):
+    @patch('posts.views.queue_mail')
+    def test_create_post_guest_email_used_by_unverified_user(self, mock_queue_mail):
         """Test creating guest post with email that belongs to unverified guest user"""
-        mock_send_mail.return_value = True
+        mock_queue_mail.return_value = True
         
         #register user but dont verify
         response = self.client.post('/posts/register/', {
@@ -684,7 +1035,7 @@ class IntegrationTestCase(TestCase):
         self.assertRedirects(response, reverse('login'))
         self.assertTrue(User.objects.filter(username='newuser').exists())
         self.assertFalse(User.objects.get(username='newuser').is_active)
-        mock_send_mail.assert_called_once()
+        mock_queue_mail.assert_called_once()
 
         # Create guest post to create unverified user
         response = self.client.post('/posts/create_post/', {
@@ -701,7 +1052,7 @@ class IntegrationTestCase(TestCase):
         self.assertTrue(post.author.username == 'newuser')
 
         # verify post
-        token = mock_send_mail.call_args[1]['message'].split('verify_post/')[1].split('/')[0]
+        token = mock_queue_mail.call_args[1]['message'].split('verify_post/')[1].split('/')[0]
         response = self.client.get(f'/posts/verify_post/{token}/')
         self.assertRedirects(response, '/posts/?page=1')
         post = Post.objects.filter(author__email='unverified@example.com').first()
@@ -745,3 +1096,1050 @@ class SpamDetectionTestCase(TestCase):
         self.assertContains(response, 'Neplatný obsah príspevku.')
         self.assertFalse(PostUnverified.objects.filter(post_title='This is a spammy title').exists())
 
+    def test_matcher_reports_pattern(self):
+        """Test the matcher names the pattern that fired, for every kind of pattern"""
+        from posts.services.spam_detection import SpamMatcher
+        matcher = SpamMatcher([r'spammy', r'foo\.com', r'cheap\s+pills', r'[0-9]{5}x', r'^buy', r'(a)\1'])
+        self.assertEqual(matcher.match('title', 'SPAMMY', 'example'), 'spammy')
+        self.assertEqual(matcher.match('visit foo.com', '', ''), r'foo\.com')
+        self.assertEqual(matcher.match('', 'cheap   pills', ''), r'cheap\s+pills')
+        self.assertEqual(matcher.match('', '', 'call 12345X'), r'[0-9]{5}x')
+        self.assertEqual(matcher.match('title', 'buy now', ''), r'^buy')
+        self.assertEqual(matcher.match('', '', 'baa'), r'(a)\1')
+        self.assertIsNone(matcher.match('nobuy', 'cheap', 'pills'))
+        self.assertIsNone(matcher.match(None, 'clean', None))
+
+    def test_matcher_does_not_match_across_fields(self):
+        """Test patterns matching the field separator only fire inside a single field"""
+        from posts.services.spam_detection import SpamMatcher
+        for pattern in (r'\W{3}', r'\W\W', r'.\W+[a-z]', r'o\W+w'):
+            with self.subTest(pattern=pattern):
+                matcher = SpamMatcher([pattern])
+                self.assertIsNone(matcher.match('hello', 'world', 'nice'))
+                self.assertEqual(matcher.match('', 'so !!! wow', ''), pattern)
+
+    def test_matcher_overlapping_literals(self):
+        """Test a literal overlapping a longer prefix is still found"""
+        from posts.services.spam_detection import SpamMatcher
+        matcher = SpamMatcher([r'abcz', r'bcd', r'colou?r'])
+        self.assertEqual(matcher.match('abcd', '', ''), 'bcd')
+        self.assertEqual(matcher.match('color', '', ''), r'colou?r')
+        self.assertIsNone(matcher.match('colr', '', ''))
+
+    def test_matcher_kept_in_process(self):
+        """Test the compiled patterns are reused within the generation check interval"""
+        from posts.services.spam_detection import is_spam_text
+        self.assertTrue(is_spam_text('spammy', '', ''))
+        with self.assertNumQueries(0):
+            self.assertTrue(is_spam_text('spammy', '', ''))
+
+    def test_change_by_other_worker(self):
+        """Test a change saved by another worker is picked up through the shared generation"""
+        from posts.services import spam_detection
+        from posts.services.spam_detection import is_spam_text
+        from posts.services.tiered_cache import TieredCache
+        self.assertTrue(is_spam_text('spammy', '', ''))
+        other_worker = TieredCache('spam_patterns')
+        # bulk queries send no signals here, the other worker's signal bumps the generation
+        SpamRegEx.objects.filter(pattern='spammy').update(pattern='eggs')
+        other_worker.invalidate()
+        with patch.object(spam_detection._cache, 'check_interval', 60):
+            self.assertTrue(is_spam_text('spammy', '', ''))
+        with patch.object(spam_detection._cache, 'check_interval', 0):
+            self.assertFalse(is_spam_text('spammy', '', ''))
+            self.assertTrue(is_spam_text('eggs', '', ''))
+
+
+class BlockedEmailDomainTestCase(TestCase):
+    """Test the blocked email domain lookup and import"""
+
+    def setUp(self):
+        BlockedEmailDomain.objects.create(domain='mail.com')
+
+    def test_parent_domains_are_blocked(self):
+        """Test a blocked domain blocks its subdomains but not other domains ending the same"""
+        from posts.services.blocked_email_domains import is_blocked_email
+        self.assertTrue(is_blocked_email('user@mail.com'))
+        self.assertTrue(is_blocked_email('User@Students.MAIL.com'))
+        self.assertFalse(is_blocked_email('user@gmail.com'))
+        self.assertFalse(is_blocked_email('user@mail.com.sk'))
+
+    def test_gmail_can_register(self):
+        """Test registration with a domain ending in a blocked one is accepted"""
+        form = UserRegistrationForm(data={
+            'username': 'gmailuser',
+            'email': 'gmailuser@gmail.com',
+            'password': 'testpass123',
+            'confirm_password': 'testpass123'
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_import_command(self):
+        """Test importing a domain list with comments, duplicates and --replace"""
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from posts.services.blocked_email_domains import is_blocked_email
+        self.assertFalse(is_blocked_email('user@trash.io'))
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as f:
+            f.write('# disposable domains\ntrash.io\nTRASH.io\n\nspam.net  # old\n')
+            f.flush()
+            call_command('import_blocked_domains', f.name, '--replace', stdout=StringIO())
+
+        self.assertEqual(set(BlockedEmailDomain.objects.values_list('domain', flat=True)), {'trash.io', 'spam.net'})
+        self.assertTrue(is_blocked_email('user@trash.io'))
+        self.assertFalse(is_blocked_email('user@mail.com'))
+
+
+class CleanupUnverifiedTestCase(TestCase):
+    """Test the cleanup_unverified command"""
+
+    def setUp(self):
+        past = timezone.now() - timezone.timedelta(hours=1)
+        # guest whose link expired
+        self.expired_guest = User.objects.create(username='Anon_1', email='expired@example.com', is_active=False)
+        PostUnverified.objects.create(post_title='Expired', post_text='t', post_example='e', author=self.expired_guest)
+        # guest whose link is still valid
+        self.fresh_guest = User.objects.create(username='Anon_2', email='fresh@example.com', is_active=False)
+        PostUnverified.objects.create(post_title='Fresh', post_text='t', post_example='e', author=self.fresh_guest)
+        PostUnverified.objects.filter(post_title='Expired').update(created_at=past)
+        # guest whose post was verified
+        self.verified_guest = User.objects.create(username='Anon_3', email='verified@example.com', is_active=False)
+        Post.objects.create(post_title='Verified', post_text='t', post_example='e', author=self.verified_guest, publish_date=timezone.now())
+        # abandoned registration
+        self.abandoned = User.objects.create_user(username='abandoned', email='abandoned@example.com', password='pass12345', is_active=False)
+        self.active = User.objects.create_user(username='active', email='active@example.com', password='pass12345')
+        # accounts deactivated by an admin, one with a reaction
+        self.deactivated = User.objects.create_user(username='deactivated', email='deactivated@example.com',
+                                                    password='pass12345', is_active=False, last_login=past)
+        self.reacted = User.objects.create_user(username='reacted', email='reacted@example.com', password='pass12345', is_active=False)
+        Reaction.objects.create(user=self.reacted, post=Post.objects.get(post_title='Verified'), type=Reaction.ReactionType.LIKE)
+        User.objects.exclude(username='Anon_2').update(date_joined=past)
+
+    def _run(self, *args):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('cleanup_unverified', '--batch-size', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run(self):
+        """Test --dry-run only counts"""
+        self.assertIn('Would delete 1 unverified posts and 1 inactive users', self._run('--dry-run'))
+        self.assertEqual(PostUnverified.objects.count(), 2)
+
+    def test_deletes_expired(self):
+        """Test expired posts and never verified users left without posts are deleted, deactivated accounts are kept"""
+        out = self._run()
+        self.assertIn('deleted 1 unverified posts and 2 inactive users', out)
+        self.assertEqual(list(PostUnverified.objects.values_list('post_title', flat=True)), ['Fresh'])
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)),
+            {'Anon_2', 'Anon_3', 'active', 'deactivated', 'reacted'}
+        )
+
+    @patch('posts.views.queue_mail')
+    def test_registering_again_keeps_user(self, mock_queue_mail):
+        """Test an abandoned registration started again is not deleted before its new link expires"""
+        self.client.post('/posts/register/', {
+            'username': 'abandoned2',
+            'email': 'abandoned@example.com',
+            'password': 'newpass123',
+            'confirm_password': 'newpass123'
+        })
+        self._run()
+        self.assertTrue(User.objects.filter(username='abandoned2').exists())
+
+
+def seek_plan(index, column):
+    """Pattern of an EXPLAIN scanning the index from a bound on the column, not a Filter over the rows before it"""
+    return rf'Index Scan (Backward )?using {index} on \w+[^\n]*\n\s+Index Cond: \(+{column} [<>]='
+
+
+class IndexAuditTestCase(TestCase):
+    """Test the hot lookups use an index on a seeded dataset (EXPLAIN has no Seq Scan)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO posts_user (password, is_superuser, username, first_name, last_name, email,
+                                        is_staff, is_active, date_joined)
+                SELECT '', false, 'seed' || i, '', '', 'seed' || i || '@example.com', false, i % 10 <> 0, now()
+                FROM generate_series(1, 3000) i
+            """)
+            cursor.execute("""
+                INSERT INTO posts_post (post_title, post_text, post_example, publish_date, author_id, like_count, dislike_count)
+                SELECT 'title ' || i, 'text', 'example', now() - i * interval '1 minute',
+                       (SELECT min(id) FROM posts_user) + i % 3000, 0, 0
+                FROM generate_series(1, 20000) i
+            """)
+            cursor.execute("""
+                INSERT INTO posts_postunverified (post_title, post_text, post_example, author_id, created_at)
+                SELECT 'title', 'text', 'example', (SELECT min(id) FROM posts_user) + i % 3000, now()
+                FROM generate_series(1, 20000) i
+            """)
+            cursor.execute("ANALYZE posts_user, posts_post, posts_postunverified")
+        cls.user = User.objects.get(username='seed42')
+
+    def assertIndexed(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+
+    def test_feed(self):
+        """Test the feed page reads post_publish_date_id_idx"""
+        self.assertIndexed(Post.objects.select_related('author').order_by('-publish_date', '-id')[:11])
+
+    def test_feed_cursor_pages(self):
+        """Test a deep next / prev cursor page starts the index scan at the cursor instead of filtering the rows before it"""
+        from posts.services.pagination import KeysetPaginator
+        paginator = KeysetPaginator(Post.objects.select_related('author'), 10)
+        values = paginator.key_values(Post.objects.order_by('-publish_date', '-id')[15000])
+        for queryset in (paginator._descending().filter(paginator._seek(values, 'lt')),
+                         paginator._ascending().filter(paginator._seek(values, 'gt'))):
+            plan = queryset[:11].explain()
+            self.assertRegex(plan, seek_plan('post_publish_date_id_idx', 'publish_date'), plan)
+
+    def test_typeahead_prefix(self):
+        """Test the typeahead prefix lookup reads post_title_prefix_idx in order and stops at the limit"""
+        from posts.services import typeahead
+        plan = typeahead._prefix_matches('ti')[:30].explain()
+        self.assertIn('Index Cond', plan, plan)
+        self.assertIn('post_title_prefix_idx', plan, plan)
+        self.assertNotIn('Sort', plan, plan)
+
+    def test_user_posts(self):
+        """Test user_posts reads post_author_publish_date_idx"""
+        self.assertIndexed(Post.objects.select_related('author').filter(author=self.user).order_by('-publish_date', '-id')[:11])
+
+    def test_user_by_email(self):
+        """Test user lookups by email read user_email_idx"""
+        # register, verify_user, _create_post_guest and the registration form
+        self.assertIndexed(User.objects.filter(email='seed42@example.com')[:1])
+        self.assertIndexed(User.objects.filter(email='seed42@example.com', is_active=True))
+
+    def test_verify_post(self):
+        """Test verify_post joins through user_email_idx and the author foreign key index"""
+        self.assertIndexed(PostUnverified.objects.filter(author__email='seed50@example.com'))
+
+    def test_login(self):
+        """Test the login lookup reads the unique username index"""
+        self.assertIndexed(User.objects.filter(username='seed42')[:1])
+
+
+class SpamSafetyTestCase(TestCase):
+    """Test rejecting backtracking spam patterns and the time limit of the spam check"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_admin_form_rejects_unsafe_patterns(self):
+        """Test the admin rejects invalid and nested quantifier patterns"""
+        from posts.admin import SpamRegExAdminForm
+        self.assertTrue(SpamRegExAdminForm(data={'pattern': r'cheap\s+pills\d+'}).is_valid())
+        self.assertFalse(SpamRegExAdminForm(data={'pattern': r'(a+)+$'}).is_valid())
+        self.assertFalse(SpamRegExAdminForm(data={'pattern': r'('}).is_valid())
+
+    @patch('posts.services.spam_safety.CHECK_TIMEOUT', 0.5)
+    def test_check_rejects_backtracking_alternation(self):
+        """Test a pattern without nested quantifiers is still caught on adversarial input"""
+        from posts.services.spam_safety import check_pattern
+        self.assertIn('did not finish', check_pattern(r'(a|aa)+$'))
+
+    @override_settings(SPAM_CHECK_TIMEOUT_MS=50)
+    def test_timeout_fails_open(self):
+        """Test a spam check that runs out of time lets the post through and is recorded"""
+        from io import StringIO
+        from django.core.management import call_command
+        from posts.services.spam_detection import get_stats, is_spam_text
+        SpamRegEx.objects.create(pattern=r'(a|aa)+$')
+        SpamRegEx.objects.create(pattern=r'spammy')
+        self.assertFalse(is_spam_text('title', 'a' * 40 + '!', 'example'))
+        # the patterns are profiled by the command, not by the request that timed out
+        self.assertEqual(get_stats()[1], [])
+
+        out = StringIO()
+        call_command('spam_pattern_stats', '--profile', '--reset', stdout=out)
+        self.assertIn('profiled 1 slow checks', out.getvalue())
+        self.assertIn('timeouts=1', out.getvalue())
+        self.assertIn('(a|aa)+$', out.getvalue())
+        self.assertNotIn('spammy', out.getvalue())
+
+    def test_timeout_outside_main_thread(self):
+        """Test the time budget stops a backtracking pattern in a thread, where sync views run under ASGI"""
+        import threading
+        import time
+        from posts.services.spam_detection import SpamMatcher
+        matcher = SpamMatcher([r'(a|aa)+$'])
+        result = {}
+
+        def check():
+            start = time.perf_counter()
+            try:
+                matcher.match('title', 'a' * 40 + '!', 'example', timeout=0.05)
+            except TimeoutError:
+                result['timed_out'] = True
+            result['seconds'] = time.perf_counter() - start
+
+        thread = threading.Thread(target=check)
+        thread.start()
+        thread.join()
+        self.assertTrue(result.get('timed_out'))
+        self.assertLess(result['seconds'], 1)
+
+    @override_settings(SPAM_CHECK_TIMEOUT_MS=50, SPAM_CHECK_FAIL_CLOSED=True)
+    def test_timeout_fails_closed(self):
+        """Test a spam check that runs out of time rejects the post when configured"""
+        from posts.services.spam_detection import is_spam_text
+        SpamRegEx.objects.create(pattern=r'(a|aa)+$')
+        self.assertTrue(is_spam_text('title', 'a' * 40 + '!', 'example'))
+        self.assertFalse(is_spam_text('title', 'text', 'example'))
+
+
+
+class TypeaheadTestCase(TestCase):
+    """Test the autocomplete endpoint"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpass123'
+        )
+        for title in ('Čučoriedka', 'čučkať', 'brutálny', 'brutal', 'brutal'):
+            Post.objects.create(
+                post_title=title,
+                post_text='Content',
+                post_example='Example',
+                author=self.user,
+                publish_date=timezone.now()
+            )
+
+    def test_autocomplete_prefix_ignores_case_and_accents(self):
+        """Test prefix matching on the normalized title"""
+        response = self.client.get('/posts/autocomplete/?q=CUC')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['results']), ['Čučoriedka', 'čučkať'])
+
+    def test_autocomplete_returns_distinct_titles(self):
+        """Test titles with several definitions are listed once"""
+        response = self.client.get('/posts/autocomplete/?q=brut')
+        self.assertEqual(response.json()['results'], ['brutal', 'brutálny'])
+
+    def test_autocomplete_tolerates_typos(self):
+        """Test trigram similarity finds misspelled titles"""
+        response = self.client.get('/posts/autocomplete/?q=brutalny')
+        self.assertIn('brutálny', response.json()['results'])
+        response = self.client.get('/posts/autocomplete/?q=brutlany')
+        self.assertIn('brutálny', response.json()['results'])
+
+    def test_autocomplete_short_query(self):
+        """Test single characters do not hit the database"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/posts/autocomplete/?q=b')
+        self.assertEqual(response.json()['results'], [])
+
+    def test_autocomplete_is_cached(self):
+        """Test repeated prefixes are served from the cache"""
+        self.client.get('/posts/autocomplete/?q=brut')
+        with self.assertNumQueries(0):
+            response = self.client.get('/posts/autocomplete/?q=brut')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_autocomplete_invalid_limit(self):
+        """Test invalid limit and method are rejected"""
+        self.assertEqual(self.client.get('/posts/autocomplete/?q=brut&limit=x').status_code, 400)
+        self.assertEqual(self.client.post('/posts/autocomplete/').status_code, 405)
+
+
+@override_settings(REACTION_COUNTER_BUFFER=True)
+class ReactionBufferTestCase(TestCase):
+    """Test the write-behind reaction counter mode"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpass123'
+        )
+        self.post = Post.objects.create(
+            post_title='Viral',
+            post_text='Content',
+            post_example='Example',
+            author=self.user,
+            publish_date=timezone.now()
+        )
+
+    def react(self, type):
+        return self.client.post(
+            f'/posts/{self.post.id}/react/',
+            data=json.dumps({'type': type}),
+            content_type='application/json'
+        ).json()
+
+    def test_reaction_is_buffered_and_shown_in_feed(self):
+        """Test the post row is untouched until the flush but the feed shows the new counts"""
+        self.client.login(username='testuser', password='testpass123')
+        data = self.react('like')
+        self.assertEqual((data['state'], data['likes'], data['dislikes']), ('like', 1, 0))
+        data = self.react('dislike')
+        self.assertEqual((data['state'], data['likes'], data['dislikes']), ('dislike', 0, 1))
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.dislike_count), (0, 0))
+        self.assertTrue(Reaction.objects.filter(user=self.user, post=self.post, type=Reaction.ReactionType.DISLIKE).exists())
+        feed_post = self.client.get('/posts/').context['page_obj'][0]
+        self.assertEqual((feed_post.like_count, feed_post.dislike_count), (0, 1))
+
+    def test_flush_command_writes_counters(self):
+        """Test the flush writes the counters and clears the pending deltas"""
+        from django.core.management import call_command
+        from io import StringIO
+        from posts.services import reaction_buffer
+        self.client.login(username='testuser', password='testpass123')
+        self.react('like')
+
+        call_command('flush_reaction_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(reaction_buffer.get_pending([self.post.id]), {})
+        self.assertEqual(self.client.get('/posts/').context['page_obj'][0].like_count, 1)
+
+    def test_flush_from_other_process(self):
+        """Test the pending changes are not kept in process memory, a flush with empty caches writes them"""
+        from django.core.cache import cache, caches
+        from django.core.management import call_command
+        from io import StringIO
+        from posts.services import page_cache
+        self.client.login(username='testuser', password='testpass123')
+        self.react('like')
+        cache.clear()
+        caches['shared'].clear()
+        page_cache._pages.clear_local()
+
+        self.assertEqual(self.client.get('/posts/').context['page_obj'][0].like_count, 1)
+        call_command('flush_reaction_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_single_post_shows_pending(self):
+        """Test post_detail and random_post count the pending changes for anonymous visitors too"""
+        self.client.login(username='testuser', password='testpass123')
+        self.react('like')
+        self.client.logout()
+        for url in (f'/posts/{self.post.id}/', '/posts/random_post/'):
+            self.assertEqual(self.client.get(url).context['page_obj'][0].like_count, 1)
+
+    def test_reconcile_after_truncated_pending(self):
+        """Test reconcile rebuilds the counters when the pending changes are gone"""
+        from django.core.management import call_command
+        from io import StringIO
+        from posts.models import PendingReactionCount
+        self.client.login(username='testuser', password='testpass123')
+        self.react('dislike')
+        PendingReactionCount.objects.all().delete()
+
+        call_command('flush_reaction_counters', '--reconcile', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.dislike_count), (0, 1))
+
+    def test_failed_flush_keeps_posts_dirty(self):
+        """Test posts of a failed flush are flushed by the next one"""
+        from posts.services import reaction_buffer
+        self.client.login(username='testuser', password='testpass123')
+        self.react('like')
+        with patch('posts.services.reaction_buffer._recompute_counters', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                reaction_buffer.flush()
+        self.assertEqual(reaction_buffer.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+
+class PageCacheTestCase(TestCase):
+    """Test the shared feed/search fragment cache"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from posts.services import page_cache
+        cache.clear()
+        page_cache._pages.clear_local()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpass123'
+        )
+        self.post = Post.objects.create(
+            post_title='Cached',
+            post_text='Content',
+            post_example='Example',
+            author=self.user,
+            publish_date=timezone.now()
+        )
+
+    def test_anonymous_feed_hit_needs_no_queries(self):
+        """Test a repeated anonymous feed request is served without touching the database"""
+        from posts.services import page_cache
+        self.client.get('/posts/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/posts/')
+        self.assertContains(response, 'Cached')
+        self.assertEqual(page_cache.get_stats(), (1, 1))
+
+    def test_logged_in_users_share_the_fragment(self):
+        """Test logged in users get the cached posts with their own header"""
+        self.client.get('/posts/')
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get('/posts/')
+        self.assertContains(response, 'Cached')
+        self.assertContains(response, 'Logout')
+        self.assertNotIn('page_obj', response.context)
+
+    def test_new_post_invalidates(self):
+        """Test creating a post changes the cached feed"""
+        self.client.get('/posts/')
+        Post.objects.create(
+            post_title='Fresh',
+            post_text='Content',
+            post_example='Example',
+            author=self.user,
+            publish_date=timezone.now()
+        )
+        self.assertContains(self.client.get('/posts/'), 'Fresh')
+
+    def test_reaction_invalidates(self):
+        """Test reaction counters in the cached feed follow clicks after the generation check interval"""
+        from posts.services import page_cache
+        self.client.get('/posts/?page=1')
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(f'/posts/{self.post.id}/react/', data=json.dumps({'type': 'like'}),
+                         content_type='application/json')
+        self.client.logout()
+        with patch.object(page_cache._pages, 'check_interval', 0):
+            response = self.client.get('/posts/?page=1')
+        self.assertEqual(response.context['page_obj'][0].like_count, 1)
+
+    def test_reactions_bump_once_per_interval(self):
+        """Test reactions do not write the generation row, the next check starts one new generation"""
+        from posts.models import CacheNamespace
+        from posts.services import page_cache, reactions
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        generation = page_cache.get_version()
+        with self.assertNumQueries(2):
+            reactions.toggle_reaction(self.user.id, self.post.id, Reaction.ReactionType.LIKE)
+            reactions.toggle_reaction(other.id, self.post.id, Reaction.ReactionType.DISLIKE)
+        self.assertEqual(CacheNamespace.objects.get(namespace='page').generation, generation)
+        with patch.object(page_cache._pages, 'check_interval', 0):
+            self.assertEqual(page_cache.get_version(), generation + 1)
+            self.assertEqual(page_cache.get_version(), generation + 1)
+
+    def test_search_is_cached_per_query(self):
+        """Test different searches do not share a cache entry"""
+        self.assertContains(self.client.get('/posts/search/?search=Cached'), 'Cached')
+        self.assertNotContains(self.client.get('/posts/search/?search=Other'), 'Cached')
+
+    def test_stats_command(self):
+        """Test the hit rate command"""
+        from django.core.management import call_command
+        from io import StringIO
+        self.client.get('/posts/')
+        self.client.get('/posts/')
+        out = StringIO()
+        call_command('page_cache_stats', '--reset', stdout=out)
+        self.assertIn('hits=1 misses=1 hit_rate=50.0%', out.getvalue())
+
+
+class PostCardCacheTestCase(TestCase):
+    """Test the per post card fragments of the listing"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        for i in range(10):
+            author = User.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='testpass123')
+            Post.objects.create(
+                post_title=f'Post {i}',
+                post_text='Content',
+                post_example='Example',
+                author=author,
+                publish_date=timezone.now()
+            )
+
+    def test_feed_page_is_one_query(self):
+        """Test authors are joined instead of loaded per card"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/posts/')
+        self.assertContains(response, 'author9')
+        self.assertFalse(any('FROM "posts_user"' in q['sql'] and 'JOIN' not in q['sql'] for q in ctx.captured_queries))
+
+    def test_card_follows_post_edit(self):
+        """Test an edited post is not served from the old card fragment"""
+        self.client.get('/posts/')
+        post = Post.objects.get(post_title='Post 3')
+        post.post_title = 'Edited'
+        post.save()
+        response = self.client.get('/posts/')
+        self.assertContains(response, 'Edited')
+        self.assertNotContains(response, 'Post 3')
+
+
+class AsyncViewsTestCase(TestCase):
+    """Test the async feed, search, random post and reaction views"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.post = Post.objects.create(
+            post_title='Async Post',
+            post_text='Async content',
+            post_example='Async example',
+            author=self.user,
+            publish_date=timezone.now()
+        )
+
+    async def test_feed_and_search(self):
+        """Test the async listings render through the async client"""
+        response = await self.async_client.get('/posts/')
+        self.assertContains(response, 'Async Post')
+        response = await self.async_client.get('/posts/search/', {'search': 'async'})
+        self.assertContains(response, 'Async Post')
+
+    async def test_random_post(self):
+        """Test random post is loaded with the async ORM"""
+        response = await self.async_client.get('/posts/random_post/')
+        self.assertContains(response, 'Async Post')
+
+    async def test_toggle_reaction(self):
+        """Test the async reaction view checks login and toggles the reaction"""
+        url = f'/posts/{self.post.id}/react/'
+        response = await self.async_client.post(url, json.dumps({'type': 'like'}), content_type='application/json')
+        self.assertEqual(response.status_code, 302)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(url, json.dumps({'type': 'like'}), content_type='application/json')
+        self.assertEqual(json.loads(response.content)['likes'], 1)
+        response = await self.async_client.post('/posts/9999/react/', json.dumps({'type': 'like'}), content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class TieredCacheTestCase(TestCase):
+    """Test the in-process L1 + shared L2 cache and its generations"""
+
+    def setUp(self):
+        from posts.services.tiered_cache import TieredCache
+        # two instances of one namespace stand in for two workers
+        self.worker1 = TieredCache('test')
+        self.worker2 = TieredCache('test')
+
+    def test_invalidation_reaches_other_worker(self):
+        """Test another worker's invalidation is seen after the check interval"""
+        self.assertEqual(self.worker1.get_or_set('key', lambda: 'old', shared=False), 'old')
+        self.worker2.invalidate()
+        self.worker1.check_interval = 60
+        self.assertEqual(self.worker1.get_or_set('key', lambda: 'new', shared=False), 'old')
+        self.worker1.check_interval = 0
+        self.assertEqual(self.worker1.get_or_set('key', lambda: 'new', shared=False), 'new')
+
+    def test_shared_values_and_stats(self):
+        """Test a value loaded by one worker is read from L2 by the other and the counts are summed"""
+        self.assertEqual(self.worker1.get_or_set('key', lambda: 'loaded'), 'loaded')
+        self.assertEqual(self.worker2.get_or_set('key', lambda: 'again'), 'loaded')
+        self.assertEqual(self.worker2.get_or_set('key', lambda: 'again'), 'loaded')
+        self.worker1.get_stats()
+        self.assertEqual(self.worker2.get_stats(), {'l1_hits': 1, 'l2_hits': 1, 'misses': 1})
+        self.worker2.reset_stats()
+        self.assertEqual(self.worker2.get_stats(), {'l1_hits': 0, 'l2_hits': 0, 'misses': 0})
+
+    def test_l1_is_bounded(self):
+        """Test the least recently used entries are dropped from process memory"""
+        self.worker1.l1_max_entries = 2
+        for key in 'abc':
+            self.worker1.get_or_set(key, lambda: key, shared=False)
+        self.assertEqual(list(self.worker1._l1), ['b', 'c'])
+
+    def test_invalidate_again_on_commit(self):
+        """Test an invalidation inside a transaction starts another generation on commit"""
+        generation = self.worker1.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker1.invalidate()
+        self.assertEqual(self.worker1.generation(), generation + 2)
+
+    def test_stats_command(self):
+        """Test the command lists the namespaces and makes every worker reload"""
+        from io import StringIO
+        from django.core.management import call_command, CommandError
+        self.worker1.get_or_set('key', lambda: 'value')
+        self.worker1.get_stats()    # flushes the counts like the worker's next generation check
+        out = StringIO()
+        call_command('cache_stats', 'test', stdout=out)
+        self.assertIn('test l1_hits=0 l2_hits=0 misses=1 hit_rate=0.0%', out.getvalue())
+        generation = self.worker1.generation()
+        call_command('cache_stats', 'test', '--invalidate', stdout=StringIO())
+        self.worker1.check_interval = 0
+        self.assertNotEqual(self.worker1.generation(), generation)
+        with self.assertRaises(CommandError):
+            call_command('cache_stats', 'unknown', stdout=StringIO())
+        call_command('cache_stats', stdout=out)
+        self.assertIn('spam_patterns', out.getvalue())
+
+
+class RankingsTestCase(TestCase):
+    """Test the hot, top and controversial listings and their precomputed scores"""
+
+    def setUp(self):
+        from posts.services import page_cache
+        page_cache._pages.clear_local()
+        self.client = Client()
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='testpass123')
+        self.voters = [User.objects.create_user(username=f'voter{i}', email=f'voter{i}@example.com') for i in range(4)]
+
+    def _post(self, title, days_ago=0):
+        return Post.objects.create(post_title=title, post_text='Content', post_example='Example', author=self.author,
+                                   publish_date=timezone.now() - timezone.timedelta(days=days_ago))
+
+    def _react(self, post, likes=0, dislikes=0):
+        from posts.services import reactions
+        voters = iter(self.voters)
+        for type, count in ((Reaction.ReactionType.LIKE, likes), (Reaction.ReactionType.DISLIKE, dislikes)):
+            for _ in range(count):
+                reactions.toggle_reaction(next(voters).id, post.id, type)
+
+    def _titles(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [post.post_title for post in response.context['page_obj']]
+
+    def test_trigger_computes_scores(self):
+        """Test every reaction updates the score columns of the post"""
+        post = self._post('Scored')
+        self._react(post, likes=3, dislikes=1)
+        post.refresh_from_db()
+        self.assertEqual(post.score, 2)
+        self.assertAlmostEqual(post.hot_score, 0.30103 + post.publish_date.timestamp() / 45000, places=4)
+        self.assertAlmostEqual(post.controversy_score, 4 ** (1 / 3))
+
+    def test_hot_prefers_votes_and_recency(self):
+        """Test votes outweigh hours of age but not days (4 likes are worth 7.5 hours)"""
+        old = self._post('Old', days_ago=3)
+        liked = self._post('Liked', days_ago=0.25)
+        self._post('New')
+        self._react(old, likes=4)
+        self._react(liked, likes=4)
+        self.assertEqual(self._titles('/posts/hot/'), ['Liked', 'New', 'Old'])
+
+    def test_top_periods(self):
+        """Test the week and month rankings only list their window, after a refresh"""
+        from posts.services import rankings
+        month = self._post('Month', days_ago=20)
+        week = self._post('Week', days_ago=2)
+        self._post('Year', days_ago=300)
+        self._react(month, likes=3)
+        self._react(week, likes=1)
+        rankings.refresh_period_rankings()
+        self.assertEqual(self._titles('/posts/top/week/'), ['Week'])
+        self.assertEqual(self._titles('/posts/top/month/'), ['Month', 'Week'])
+        self.assertEqual(self._titles('/posts/top/'), ['Month', 'Week', 'Year'])
+        self.assertEqual(self.client.get('/posts/top/year/').status_code, 404)
+
+    def test_controversial_lists_split_votes(self):
+        """Test only posts with likes and dislikes are listed, the most even first"""
+        split = self._post('Split')
+        leaning = self._post('Leaning')
+        self._post('Quiet')
+        self._react(split, likes=2, dislikes=2)
+        self._react(leaning, likes=3, dislikes=1)
+        self.assertEqual(self._titles('/posts/controversial/'), ['Split', 'Leaning'])
+
+    def test_keyset_pages(self):
+        """Test the cursor of a ranked listing continues in score order and seeks in the ranking's index"""
+        from posts import views
+        posts = [self._post(f'Post {i}', days_ago=i / 10) for i in range(views.POSTS_PER_PAGE + 2)]
+        self._react(posts[-1], likes=2)
+        response = self.client.get('/posts/top/')
+        page = response.context['page_obj']
+        self.assertEqual(page[0].post_title, posts[-1].post_title)
+        second = self.client.get(f'/posts/top/?cursor={page.next_cursor}').context['page_obj']
+        self.assertEqual(len(second), 2)
+        self.assertFalse({post.id for post in page} & {post.id for post in second})
+
+        # a cursor page of every ranking starts the scan of its index at the cursor
+        from django.db import connection
+        from posts.services import rankings
+        from posts.services.pagination import KeysetPaginator
+        post = self._post('Split')
+        self._react(post, likes=2, dislikes=2)
+        post.refresh_from_db()
+        # the table is tiny, without these the planner reads and sorts all of it
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+        for (posts, keys), index in ((rankings.hot_posts(), 'post_hot_score_id_idx'),
+                                     (rankings.top_posts(), 'post_score_id_idx'),
+                                     (rankings.controversial_posts(), 'post_controversy_id_idx')):
+            paginator = KeysetPaginator(posts, 10, keys)
+            plan = paginator._descending().filter(paginator._seek(paginator.key_values(post), 'lt'))[:11].explain()
+            self.assertRegex(plan, seek_plan(index, keys[0]), plan)
+
+    def test_refresh_command_backfills(self):
+        """Test the command recomputes scores the trigger did not set"""
+        from io import StringIO
+        from django.core.management import call_command
+        post = self._post('Backfilled')
+        self._react(post, likes=2)
+        Post.objects.filter(id=post.id).update(score=0)
+        out = StringIO()
+        call_command('refresh_rankings', '--backfill', stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.score, 2)
+        self.assertIn('Done, 1 posts updated', out.getvalue())
+
+
+class SitemapTestCase(TestCase):
+    """Test the chunked, cached sitemap of the posts"""
+
+    def setUp(self):
+        from posts.services import sitemap
+        sitemap._index.clear_local()
+        for tier in sitemap._chunks.values():
+            tier.clear_local()
+        self.client = Client()
+        self.user = User.objects.create_user(username='author', email='author@example.com')
+        self.posts = [
+            Post.objects.create(post_title=f'Post {i}', post_text='Content', post_example='Example',
+                                author=self.user, publish_date=timezone.now())
+            for i in range(3)
+        ]
+
+    def test_post_detail(self):
+        """Test every post has a page of its own"""
+        response = self.client.get(self.posts[0].get_absolute_url())
+        self.assertContains(response, 'Post 0')
+        self.assertEqual(self.client.get('/posts/999999/').status_code, 404)
+
+    def test_index_lists_sections_and_chunks(self):
+        """Test sitemap.xml links the static sections and one file per chunk of ids"""
+        from posts.services import sitemap
+        with patch('posts.services.sitemap.CHUNK_SIZE', self.posts[-1].id):
+            sitemap._index.invalidate()
+            response = self.client.get('/sitemap.xml')
+        self.assertContains(response, '/sitemap-static.xml')
+        self.assertContains(response, '/sitemap-posts-0.xml')
+        self.assertContains(response, '/sitemap-posts-1.xml')
+        self.assertNotContains(response, '/sitemap-posts-2.xml')
+        self.assertEqual(self.client.get('/sitemap-static.xml').status_code, 200)
+
+    def test_chunk_lists_posts(self):
+        """Test a chunk has the URL and lastmod of its posts, gzipped when the client accepts it"""
+        import gzip
+        response = self.client.get('/sitemap-posts-0.xml')
+        for post in self.posts:
+            self.assertContains(response, f'{post.get_absolute_url()}</loc><lastmod>{post.updated_at.date()}')
+        zipped = self.client.get('/sitemap-posts-0.xml', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(zipped.content), response.content)
+        self.assertEqual(self.client.get('/sitemap-posts-1.xml').status_code, 404)
+
+    def test_cached_until_a_post_of_the_chunk_changes(self):
+        """Test a repeated request reads no rows and a deleted post disappears from its chunk"""
+        self.client.get('/sitemap-posts-0.xml')
+        with self.assertNumQueries(0):
+            self.client.get('/sitemap-posts-0.xml')
+        url = self.posts[0].get_absolute_url()
+        self.posts[0].delete()
+        self.assertNotContains(self.client.get('/sitemap-posts-0.xml'), f'{url}</loc>')
+
+
+class ApiTestCase(TestCase):
+    """Test the read only JSON API"""
+
+    def setUp(self):
+        from posts.services import page_cache
+        page_cache._pages.clear_local()
+        self.client = Client()
+        self.user = User.objects.create_user(username='author', email='author@example.com')
+        self.other = User.objects.create_user(username='other', email='other@example.com')
+        self.posts = [
+            Post.objects.create(post_title=f'Slovo {i}', post_text=f'Vysvetlenie {i}', post_example='Priklad',
+                                author=self.user if i % 2 else self.other,
+                                publish_date=timezone.now() - timezone.timedelta(minutes=i))
+            for i in range(25)
+        ]
+
+    def test_feed_cursor_pages(self):
+        """Test the feed is paged by cursor links, newest first, with compact posts"""
+        data = self.client.get('/api/v1/posts/').json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(set(data['results'][0]), {'id', 'title', 'text', 'example', 'author', 'published', 'likes', 'dislikes'})
+        self.assertEqual(data['results'][0]['title'], 'Slovo 0')
+        self.assertIsNone(data['previous'])
+        second = self.client.get(data['next']).json()
+        self.assertEqual([post['title'] for post in second['results']], [f'Slovo {i}' for i in range(20, 25)])
+        self.assertIsNone(second['next'])
+
+    def test_tampered_cursor(self):
+        """Test a cursor that was not issued by the API is rejected with 400"""
+        from posts.services.pagination import encode_cursor
+        for cursor in ('not-a-cursor', encode_cursor('next', ['not-a-date', 1], 2), encode_cursor('next', [None, 1], 2)):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/v1/posts/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+
+    def test_search(self):
+        """Test search keeps its query in the cursor links and requires one"""
+        data = self.client.get('/api/v1/posts/search/', {'q': 'vysvetlenie'}).json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertIn('q=vysvetlenie', data['next'])
+        self.assertEqual(len(self.client.get(data['next']).json()['results']), 5)
+        self.assertEqual(self.client.get('/api/v1/posts/search/').status_code, 400)
+
+    def test_post_and_user_posts(self):
+        """Test a single post and the posts of a user"""
+        post = self.posts[3]
+        data = self.client.get(f'/api/v1/posts/{post.id}/').json()
+        self.assertEqual((data['title'], data['author']), ('Slovo 3', 'author'))
+        self.assertEqual(self.client.get('/api/v1/posts/999999/').status_code, 404)
+        data = self.client.get('/api/v1/users/author/posts/').json()
+        self.assertEqual([post['title'] for post in data['results']], [f'Slovo {i}' for i in range(1, 25, 2)])
+        self.assertEqual(self.client.get('/api/v1/users/nobody/posts/').status_code, 404)
+
+    def test_etag_poll(self):
+        """Test a poll with the ETag is answered 304 without queries until a reaction changes the data"""
+        from posts.services import page_cache, reactions
+        response = self.client.get('/api/v1/posts/')
+        self.assertIn('public', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/posts/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        reactions.toggle_reaction(self.other.id, self.posts[0].id, Reaction.ReactionType.LIKE)
+        with patch.object(page_cache._pages, 'check_interval', 0):
+            response = self.client.get('/api/v1/posts/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['likes'], 1)
+
+
+class ConditionalGetTestCase(TestCase):
+    """Test 304 Not Modified answers of the listing pages"""
+
+    def setUp(self):
+        from posts.services import conditional_get, page_cache
+        page_cache._pages.clear_local()
+        conditional_get._stats.clear_local()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.post = Post.objects.create(post_title='Cached', post_text='Content', post_example='Example',
+                                        author=self.user, publish_date=timezone.now())
+
+    def test_etag_answered_without_queries(self):
+        """Test a repeated anonymous request with the ETag gets 304 without any query"""
+        from posts.services import conditional_get
+        response = self.client.get('/posts/')
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/posts/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.client.get('/posts/?page=2', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(conditional_get.get_stats(), (1, 2))
+
+    def test_changes_invalidate(self):
+        """Test a reaction or a new post makes the next conditional request a full page"""
+        from posts.services import page_cache, reactions
+        etag = self.client.get('/posts/search/?search=Cached')['ETag']
+        reactions.toggle_reaction(self.other.id, self.post.id, Reaction.ReactionType.LIKE)
+        with patch.object(page_cache._pages, 'check_interval', 0):
+            response = self.client.get('/posts/search/?search=Cached', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Post.objects.create(post_title='Fresh', post_text='Content', post_example='Example',
+                            author=self.user, publish_date=timezone.now())
+        self.assertEqual(self.client.get('/posts/search/?search=Cached', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        """Test clients sending only If-Modified-Since get 304 too"""
+        response = self.client.get('/posts/hot/')
+        self.assertEqual(self.client.get('/posts/hot/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_validator_depends_on_the_visitor(self):
+        """Test logging in changes the feed ETag and user_posts differs between users"""
+        etag = self.client.get('/posts/')['ETag']
+        self.client.login(username='testuser', password='testpass123')
+        self.assertEqual(self.client.get('/posts/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        own = self.client.get('/posts/user_posts/')
+        self.assertEqual(self.client.get('/posts/user_posts/', HTTP_IF_NONE_MATCH=own['ETag']).status_code, 304)
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get('/posts/user_posts/', HTTP_IF_NONE_MATCH=own['ETag']).status_code, 200)
+
+
+class StaticFilesTestCase(TestCase):
+    """Test the content hashed, precompressed static files and the template reference check"""
+
+    def setUp(self):
+        import tempfile
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.static_root = static_root.name
+        templates = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [settings.BASE_DIR / 'posts' / 'templates'],
+            'OPTIONS': {'context_processors': settings.TEMPLATES[0]['OPTIONS']['context_processors']},
+        }]
+        # only the project's own files, the admin and API assets would take seconds to compress
+        override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'posts.storage.CompressedManifestStaticFilesStorage'}},
+            TEMPLATES=templates,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _collect(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('collectstatic', '--noinput', verbosity=0, stdout=StringIO())
+
+    def test_hashed_and_compressed(self):
+        """Test collectstatic writes hashed names with .gz and .br siblings the templates link to"""
+        import brotli
+        import gzip
+        from pathlib import Path
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        self._collect()
+        hashed = staticfiles_storage.stored_name('css/style.css')
+        self.assertRegex(hashed, r'^css/style\.[0-9a-f]{12}\.css$')
+        original = (Path(self.static_root) / hashed).read_bytes()
+        self.assertEqual(gzip.decompress((Path(self.static_root) / f'{hashed}.gz').read_bytes()), original)
+        self.assertEqual(brotli.decompress((Path(self.static_root) / f'{hashed}.br').read_bytes()), original)
+        self.assertContains(self.client.get('/posts/login/'), f'/static/{hashed}')
+
+    def test_reference_check(self):
+        """Test the check passes after collectstatic and names a reference without a hashed file"""
+        import tempfile
+        from io import StringIO
+        from pathlib import Path
+        from django.core.management import call_command, CommandError
+        with self.assertRaises(CommandError):
+            call_command('check_static_references', stdout=StringIO())
+        self._collect()
+        out = StringIO()
+        call_command('check_static_references', stdout=out)
+        self.assertIn('3 static references resolve to hashed files', out.getvalue())
+
+        with tempfile.TemporaryDirectory() as directory:
+            (Path(directory) / 'broken.html').write_text("{% load static %}<script src=\"{% static 'js/missing.js' %}\"></script>")
+            templates = [{**settings.TEMPLATES[0], 'DIRS': [*settings.TEMPLATES[0]['DIRS'], directory]}]
+            with override_settings(TEMPLATES=templates), self.assertRaisesMessage(CommandError, 'js/missing.js'):
+                call_command('check_static_references', stdout=StringIO())